@@ -10,11 +10,12 @@ match platform.system().lower():
         pass
 
 from aocc.src.dottedstorage import DottedStorage
+from aocc.src.fileobject import FileObject
 from time import sleep
 from pathlib import Path
 import os
 from yaml import load as yaml_load, Loader as yaml_Loader
-import pickle
+from copy import deepcopy
 
 class Application:
 
@@ -109,8 +110,7 @@ class Application:
 
     def write_sample_config(self) -> None:
         from aocc.templates.config import data
-        with open(file=self.config_file.as_posix(), mode='wb') as writer:
-            writer.write(pickle.dumps(data))
+        FileObject(path=self.config_file.as_posix()).write_object(obj=data)
 
     def exit_function(self) -> None:
         print('set running Flag to False')
@@ -119,12 +119,13 @@ class Application:
     def load_config(self) -> bool:
         try:
             if self.config_file.exists():
+                # Snapshot laden und Journal nachspielen, eine alte pickle-Konfiguration wird dabei
+                # einmalig ins neue Format umgeschrieben; spätere set() hängen nur ans Journal an
                 self.config: DottedStorage = DottedStorage(file=self.config_file.as_posix())
                 return True
             else:
                 from aocc.templates.config import data as config_template_data
-                raw_data: bytes = pickle.dumps(config_template_data)
-                self.config: DottedStorage = DottedStorage(data=raw_data)
+                self.config: DottedStorage = DottedStorage(data=deepcopy(config_template_data))
                 return self.dump_config()
         except Exception as e:
             return False
@@ -13,7 +13,7 @@ class Account:
         _accounts_path: str = f'{os.path.expanduser("~")}/AppData/Local/aocc/accounts'
 
     def __init__(self, id: str | None = None) -> None:
-        self._account_data: DottedStorage = DottedStorage()
+        self._account_data: DottedStorage = DottedStorage(index=True)
         self._id: None = None
         if isinstance(id, str):
             self.set_id(id=id)
@@ -0,0 +1,166 @@
+from aocc.src.fileobject import FileObject
+from array import array
+from hashlib import blake2b
+import zlib
+import mmap
+
+# rsync-artige Block-Signaturen: je Block eine schwache, rollende Prüfsumme (Adler-32, kompatibel zu zlib.adler32)
+# und ein starker Hash (BLAKE2b, 16 Bytes). Ein Delta enthält die Anweisungen
+# ('copy', erster Block, Anzahl Blöcke) und ('data', Bytes).
+
+_ADLER_MOD: int = 65521
+_STRONG_SIZE: int = 16
+
+
+def default_block_size(size: int) -> int:
+    block_size: int = 2048
+    while block_size * block_size < size and block_size < 128 * 1024:
+        block_size *= 2
+    return block_size
+
+
+def strong_hash(data: bytes | memoryview) -> bytes:
+    return blake2b(data, digest_size=_STRONG_SIZE).digest()
+
+
+def roll_checksum(checksum: int, removed: int, added: int, block_size: int) -> int:
+    a: int = checksum & 0xffff
+    b: int = checksum >> 16
+    a = (a - removed + added) % _ADLER_MOD
+    b = (b - block_size * removed + a - 1) % _ADLER_MOD
+    return (b << 16) | a
+
+
+def compute_signature(path: str, block_size: int | None = None) -> dict:
+    file_object: FileObject = FileObject(path=path)
+    size: int = file_object.size()
+    if block_size == None:
+        block_size: int = default_block_size(size=size)
+    weak: array = array('I')
+    strong: list = list()
+    for block in file_object.iter_chunks(size=block_size):
+        weak.append(zlib.adler32(block))
+        strong.append(strong_hash(block))
+    return {
+        'block_size': block_size,
+        'size': size,
+        'weak': weak.tobytes(),
+        'strong': b''.join(strong)
+    }
+
+
+def compute_delta(path: str, signature: dict) -> dict:
+    file_object: FileObject = FileObject(path=path)
+    if not file_object.exists():
+        raise Exception(f'File {path} not found')
+    if file_object.size() == 0:
+        return compute_delta_bytes(data=b'', signature=signature)
+    with open(file=path, mode='rb') as reader:
+        with mmap.mmap(reader.fileno(), length=0, access=mmap.ACCESS_READ) as mapped:
+            return compute_delta_bytes(data=mapped, signature=signature)
+
+
+def compute_delta_bytes(data: bytes | mmap.mmap, signature: dict) -> dict:
+    block_size: int = signature['block_size']
+    table: dict = _build_table(signature=signature)
+    instructions: list = list()
+    length: int = len(data)
+    position: int = 0
+    literal_start: int = 0
+    checksum: int | None = None
+    while position + block_size <= length:
+        if checksum == None:
+            checksum: int = zlib.adler32(data[position:position + block_size])
+        candidates: dict | None = table.get(checksum)
+        if candidates != None:
+            index: int | None = candidates.get(strong_hash(data[position:position + block_size]))
+            if index != None:
+                _append_data(instructions=instructions, data=data[literal_start:position])
+                _append_copy(instructions=instructions, index=index)
+                position += block_size
+                literal_start = position
+                checksum = None
+                continue
+        if position + block_size < length:
+            checksum = roll_checksum(checksum=checksum, removed=data[position], added=data[position + block_size], block_size=block_size)
+        position += 1
+    # der letzte, kürzere Block der Basis passt nur an das Ende der Datei
+    tail_length: int = signature['size'] % block_size
+    tail_start: int = length - tail_length
+    if tail_length and tail_start >= literal_start:
+        tail: bytes = data[tail_start:length]
+        if zlib.adler32(tail) == _weak_checksums(signature=signature)[-1] and strong_hash(tail) == signature['strong'][-_STRONG_SIZE:]:
+            _append_data(instructions=instructions, data=data[literal_start:tail_start])
+            _append_copy(instructions=instructions, index=signature['size'] // block_size)
+            literal_start = length
+    _append_data(instructions=instructions, data=data[literal_start:length])
+    return {
+        'block_size': block_size,
+        'size': length,
+        'instructions': instructions
+    }
+
+
+def apply_delta(basis: str, delta: dict, target: str) -> int:
+    with open(file=target, mode='wb') as writer:
+        return write_delta(basis=basis, delta=delta, writer=writer)
+
+
+def write_delta(basis: str, delta: dict, writer: any) -> int:
+    # wie apply_delta, schreibt aber in ein schon geöffnetes Dateiobjekt
+    block_size: int = delta['block_size']
+    written: int = 0
+    reader = None
+    try:
+        for instruction in delta['instructions']:
+            match instruction[0]:
+                case 'copy':
+                    if reader == None:
+                        reader = open(file=basis, mode='rb')
+                    start, count = instruction[1], instruction[2]
+                    reader.seek(start * block_size)
+                    data: bytes = reader.read(count * block_size)
+                    if len(data) <= (count - 1) * block_size:
+                        raise Exception('Delta references blocks outside of the basis file')
+                    written += writer.write(data)
+                case 'data':
+                    written += writer.write(instruction[1])
+                case _:
+                    raise Exception(f'Unknown delta instruction {instruction[0]}')
+    finally:
+        if reader != None:
+            reader.close()
+    if written != delta['size']:
+        raise Exception(f'Delta produced {written} bytes instead of {delta["size"]}')
+    return written
+
+
+def delta_size(delta: dict) -> int:
+    return sum(len(instruction[1]) for instruction in delta['instructions'] if instruction[0] == 'data')
+
+
+def _weak_checksums(signature: dict) -> array:
+    weak: array = array('I')
+    weak.frombytes(signature['weak'])
+    return weak
+
+
+def _build_table(signature: dict) -> dict:
+    strong: bytes = signature['strong']
+    table: dict = dict()
+    for index, checksum in enumerate(_weak_checksums(signature=signature)):
+        digest: bytes = strong[index * _STRONG_SIZE:(index + 1) * _STRONG_SIZE]
+        table.setdefault(checksum, dict()).setdefault(digest, index)
+    return table
+
+
+def _append_data(instructions: list, data: bytes | memoryview) -> None:
+    if len(data) > 0:
+        instructions.append(('data', bytes(data)))
+
+
+def _append_copy(instructions: list, index: int) -> None:
+    if instructions and instructions[-1][0] == 'copy' and instructions[-1][1] + instructions[-1][2] == index:
+        instructions[-1] = ('copy', instructions[-1][1], instructions[-1][2] + 1)
+    else:
+        instructions.append(('copy', index, 1))
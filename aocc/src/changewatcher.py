@@ -0,0 +1,372 @@
+from threading import Thread, Lock, current_thread
+from struct import Struct
+from time import monotonic
+import ctypes
+import ctypes.util
+import traceback
+import select
+import errno
+import sys
+import os
+
+
+class Inotify:
+
+    IN_ATTRIB: int = 0x00000004
+    IN_CLOSE_WRITE: int = 0x00000008
+    IN_MOVED_FROM: int = 0x00000040
+    IN_MOVED_TO: int = 0x00000080
+    IN_CREATE: int = 0x00000100
+    IN_DELETE: int = 0x00000200
+    IN_DELETE_SELF: int = 0x00000400
+    IN_MOVE_SELF: int = 0x00000800
+    IN_Q_OVERFLOW: int = 0x00004000
+    IN_IGNORED: int = 0x00008000
+    IN_ONLYDIR: int = 0x01000000
+    IN_DONT_FOLLOW: int = 0x02000000
+    IN_EXCL_UNLINK: int = 0x04000000
+    IN_ISDIR: int = 0x40000000
+
+    _event_header: Struct = Struct('iIII')
+    _libc: ctypes.CDLL | None = None
+
+    def __init__(self) -> None:
+        if not sys.platform.startswith('linux'):
+            raise Exception('inotify is only available on Linux')
+        libc: ctypes.CDLL = Inotify._load_libc()
+        self._libc: ctypes.CDLL = libc
+        self._fd: int = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            Inotify._raise_errno()
+
+    @staticmethod
+    def _load_libc() -> ctypes.CDLL:
+        if Inotify._libc == None:
+            libc: ctypes.CDLL = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            libc.inotify_init1.argtypes = [ctypes.c_int]
+            libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+            libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+            Inotify._libc = libc
+        return Inotify._libc
+
+    @staticmethod
+    def _raise_errno() -> None:
+        number: int = ctypes.get_errno()
+        raise OSError(number, os.strerror(number))
+
+    def add_watch(self, path: str, mask: int) -> int:
+        wd: int = self._libc.inotify_add_watch(self._fd, os.fsencode(path), mask)
+        if wd < 0:
+            Inotify._raise_errno()
+        return wd
+
+    def rm_watch(self, wd: int) -> None:
+        # ein bereits entfernter Watch (IN_IGNORED) ist kein Fehler
+        self._libc.inotify_rm_watch(self._fd, wd)
+
+    def read_events(self) -> list:
+        # liefert (wd, mask, cookie, name) bis der Kernel-Puffer leer ist
+        events: list = list()
+        while True:
+            try:
+                data: bytes = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset: int = 0
+            while offset < len(data):
+                wd, mask, cookie, length = Inotify._event_header.unpack_from(data, offset)
+                offset += Inotify._event_header.size
+                name: str = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+                offset += length
+                events.append((wd, mask, cookie, name))
+        return events
+
+    def fileno(self) -> int:
+        return self._fd
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd: int = -1
+
+
+class _PathState:
+
+    # Zustand eines Pfads innerhalb eines Batches: existed gilt vor dem Batch, alles andere danach.
+    # origin ist der Pfad, von dem der Inhalt hierher verschoben wurde, created markiert im Batch neuen Inhalt.
+
+    __slots__ = ('existed', 'exists', 'origin', 'modified', 'created', 'directory')
+
+    def __init__(self, existed: bool) -> None:
+        self.existed: bool = existed
+        self.exists: bool = existed
+        self.origin: str | None = None
+        self.modified: bool = False
+        self.created: bool = False
+        self.directory: bool = False
+
+    def set(self, exists: bool, origin: str | None = None, modified: bool = False, created: bool = False, directory: bool = False) -> None:
+        self.exists = exists
+        self.origin = origin
+        self.modified = modified
+        self.created = created
+        self.directory = directory
+
+
+class ChangeWatcher:
+
+    # Beobachtet einen Verzeichnisbaum mit inotify und fasst Ereignisse zusammen: erst wenn debounce Sekunden
+    # lang nichts passiert (spätestens nach max_delay) wird ein Batch an emit() übergeben. Für jeden Pfad wird
+    # nur der Zustand vor und nach dem Batch verglichen, so wird z.B. schreiben-umbenennen-löschen eines Editors
+    # zu einem einzigen modified. Änderungen haben dasselbe Format wie beim DirectoryScanner; nach einem
+    # Überlauf der Kernel-Queue wird {'type': 'rescan', 'path': root} gemeldet.
+
+    _file_mask: int = Inotify.IN_CLOSE_WRITE | Inotify.IN_ATTRIB | Inotify.IN_CREATE | Inotify.IN_DELETE | Inotify.IN_MOVED_FROM | Inotify.IN_MOVED_TO
+    _watch_mask: int = _file_mask | Inotify.IN_DELETE_SELF | Inotify.IN_MOVE_SELF | Inotify.IN_ONLYDIR | Inotify.IN_DONT_FOLLOW | Inotify.IN_EXCL_UNLINK
+
+    def __init__(self, root: str, emit: callable, debounce: float = 0.2, max_delay: float = 2.0, batch_size: int = 1000) -> None:
+        self._root: str = os.path.abspath(root)
+        self._emit: callable = emit
+        self._debounce: float = debounce
+        self._max_delay: float = max_delay
+        self._batch_size: int = batch_size
+        self._inotify: Inotify | None = None
+        self._watches: dict = dict()
+        self._paths: dict = dict()
+        self._states: dict = dict()
+        self._overflow: bool = False
+        self._first_event: float | None = None
+        self._last_event: float | None = None
+        self._wakeup_reader: int = -1
+        self._wakeup_writer: int = -1
+        self._worker: Thread | None = None
+        self._running: bool = False
+        self._running_lock: Lock = Lock()
+
+    def start(self) -> None:
+        if not os.path.isdir(self._root):
+            raise Exception(f'Directory {self._root} not found')
+        with self._running_lock:
+            if self._running:
+                return None
+            self._running: bool = True
+        self._inotify: Inotify = Inotify()
+        self._wakeup_reader, self._wakeup_writer = os.pipe()
+        self._add_tree(path=self._root, record=False)
+        self._worker: Thread = Thread(target=self._run, daemon=True, name='change_watcher')
+        self._worker.start()
+
+    def stop(self, timeout: float | None = 1.0) -> None:
+        with self._running_lock:
+            if not self._running:
+                return None
+            self._running: bool = False
+        os.write(self._wakeup_writer, b'\0')
+        if self._worker is not current_thread():
+            self._worker.join(timeout=timeout)
+        if not self._worker.is_alive():
+            os.close(self._wakeup_reader)
+            os.close(self._wakeup_writer)
+            self._inotify.close()
+
+    def _run(self) -> None:
+        while self.isRunning:
+            timeout: float | None = self._flush_timeout()
+            readable, _, _ = select.select([self._inotify.fileno(), self._wakeup_reader], [], [], timeout)
+            if self._wakeup_reader in readable:
+                break
+            if readable:
+                self._handle_events(events=self._inotify.read_events())
+            if self._flush_timeout() == 0:
+                try:
+                    self._flush()
+                except Exception:
+                    traceback.print_exc()
+
+    def _flush_timeout(self) -> float | None:
+        if self._first_event == None:
+            return None
+        now: float = monotonic()
+        return max(0.0, min(self._last_event + self._debounce, self._first_event + self._max_delay) - now)
+
+    def _handle_events(self, events: list) -> None:
+        if not events:
+            return None
+        now: float = monotonic()
+        if self._first_event == None:
+            self._first_event: float = now
+        self._last_event: float = now
+        moves: dict = dict()
+        for wd, mask, cookie, name in events:
+            if mask & Inotify.IN_Q_OVERFLOW:
+                self._overflow: bool = True
+                continue
+            if mask & Inotify.IN_IGNORED:
+                self._forget_watch(wd=wd)
+                continue
+            directory: str | None = self._watches.get(wd)
+            if directory == None or mask & (Inotify.IN_DELETE_SELF | Inotify.IN_MOVE_SELF):
+                continue
+            path: str = os.path.join(directory, name)
+            is_dir: bool = bool(mask & Inotify.IN_ISDIR)
+            if mask & Inotify.IN_CREATE:
+                self._created(path=path, is_dir=is_dir)
+                if is_dir:
+                    self._add_tree(path=path, record=True)
+            elif mask & (Inotify.IN_CLOSE_WRITE | Inotify.IN_ATTRIB):
+                if not is_dir:
+                    self._modified(path=path)
+            elif mask & Inotify.IN_DELETE:
+                self._deleted(path=path, is_dir=is_dir)
+            elif mask & Inotify.IN_MOVED_FROM:
+                moves[cookie] = (path, is_dir)
+            elif mask & Inotify.IN_MOVED_TO:
+                source: tuple | None = moves.pop(cookie, None)
+                if source != None:
+                    self._moved(source=source[0], target=path, is_dir=is_dir)
+                    if is_dir:
+                        self._rename_watches(source=source[0], target=path)
+                else:
+                    # von außerhalb in den Baum verschoben
+                    self._created(path=path, is_dir=is_dir)
+                    if is_dir:
+                        self._add_tree(path=path, record=True)
+        # ohne passendes IN_MOVED_TO wurde aus dem Baum heraus verschoben
+        for path, is_dir in moves.values():
+            self._deleted(path=path, is_dir=is_dir)
+            if is_dir:
+                self._remove_tree(path=path)
+
+    def _state(self, path: str, existed: bool) -> '_PathState':
+        state: _PathState | None = self._states.get(path)
+        if state == None:
+            state: _PathState = _PathState(existed=existed)
+            self._states[path] = state
+        return state
+
+    def _created(self, path: str, is_dir: bool) -> None:
+        state: _PathState = self._state(path=path, existed=False)
+        state.set(exists=True, created=True, directory=is_dir)
+
+    def _modified(self, path: str) -> None:
+        state: _PathState = self._state(path=path, existed=True)
+        state.exists = True
+        state.modified = True
+
+    def _deleted(self, path: str, is_dir: bool) -> None:
+        state: _PathState = self._state(path=path, existed=True)
+        state.set(exists=False, directory=is_dir)
+
+    def _moved(self, source: str, target: str, is_dir: bool) -> None:
+        source_state: _PathState = self._state(path=source, existed=True)
+        target_state: _PathState = self._state(path=target, existed=False)
+        if source_state.created:
+            # im Batch neu angelegter Inhalt hat keine Herkunft, am Ziel ist er einfach neu
+            target_state.set(exists=True, created=True, directory=is_dir)
+        else:
+            origin: str = source_state.origin if source_state.origin != None else source
+            target_state.set(exists=True, origin=origin, modified=source_state.modified, directory=is_dir)
+        source_state.set(exists=False, directory=is_dir)
+
+    def _flush(self) -> None:
+        states: dict = self._states
+        overflow: bool = self._overflow
+        self._states: dict = dict()
+        self._overflow: bool = False
+        self._first_event = None
+        self._last_event = None
+        changes: list = list()
+        if overflow:
+            changes.append({'type': 'rescan', 'path': self._root})
+        # Verschiebungen zuerst: die Herkunft muss verschwunden sein und wird dann nicht mehr als gelöscht gemeldet
+        moved: dict = dict()
+        for path, state in states.items():
+            if state.exists and state.origin != None and state.origin != path and state.origin not in moved.values():
+                origin_state: _PathState | None = states.get(state.origin)
+                if origin_state != None and not origin_state.exists:
+                    moved[path] = state.origin
+        consumed: set = set(moved.values())
+        for path, state in states.items():
+            if path in moved:
+                changes.append(ChangeWatcher._change(change_type='moved', path=path, is_dir=state.directory, source=moved[path]))
+                if state.modified:
+                    changes.append(ChangeWatcher._change(change_type='modified', path=path, is_dir=state.directory))
+            elif state.exists and not state.existed:
+                changes.append(ChangeWatcher._change(change_type='added', path=path, is_dir=state.directory))
+            elif state.exists and (state.created or state.modified or (state.origin != None and state.origin != path)):
+                changes.append(ChangeWatcher._change(change_type='modified', path=path, is_dir=state.directory))
+            elif not state.exists and state.existed and path not in consumed:
+                changes.append(ChangeWatcher._change(change_type='deleted', path=path, is_dir=state.directory))
+        for start in range(0, len(changes), self._batch_size):
+            self._emit(changes[start:start + self._batch_size])
+
+    @staticmethod
+    def _change(change_type: str, path: str, is_dir: bool, source: str | None = None) -> dict:
+        change: dict = {'type': change_type, 'path': path}
+        if source != None:
+            change['from'] = source
+        if is_dir:
+            change['directory'] = True
+        elif change_type != 'deleted':
+            try:
+                stat: os.stat_result = os.lstat(path)
+                change['size'] = stat.st_size
+                change['mtime_ns'] = stat.st_mtime_ns
+            except OSError:
+                pass
+        return change
+
+    def _add_tree(self, path: str, record: bool) -> None:
+        # record: Inhalt eines neuen Verzeichnisses als angelegt melden, er kann vor dem Watch entstanden sein
+        stack: list = [path]
+        while stack:
+            directory: str = stack.pop()
+            try:
+                wd: int = self._inotify.add_watch(path=directory, mask=self._watch_mask)
+            except OSError as e:
+                if e.errno == errno.ENOSPC:
+                    # max_user_watches erreicht, der Baum ist nur noch per Rescan vollständig
+                    self._overflow: bool = True
+                continue
+            self._watches[wd] = directory
+            self._paths[directory] = wd
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        is_dir: bool = entry.is_dir(follow_symlinks=False)
+                        if record:
+                            self._created(path=entry.path, is_dir=is_dir)
+                        if is_dir:
+                            stack.append(entry.path)
+            except OSError:
+                continue
+
+    def _remove_tree(self, path: str) -> None:
+        prefix: str = path + os.sep
+        for directory in [directory for directory in self._paths if directory == path or directory.startswith(prefix)]:
+            wd: int = self._paths.pop(directory)
+            self._watches.pop(wd, None)
+            self._inotify.rm_watch(wd=wd)
+
+    def _rename_watches(self, source: str, target: str) -> None:
+        prefix: str = source + os.sep
+        for directory in [directory for directory in self._paths if directory == source or directory.startswith(prefix)]:
+            wd: int = self._paths.pop(directory)
+            renamed: str = target + directory[len(source):]
+            self._paths[renamed] = wd
+            self._watches[wd] = renamed
+
+    def _forget_watch(self, wd: int) -> None:
+        directory: str | None = self._watches.pop(wd, None)
+        if directory != None and self._paths.get(directory) == wd:
+            del self._paths[directory]
+
+    @property
+    def isRunning(self) -> bool:
+        with self._running_lock:
+            result: bool = self._running
+        return result
+
+    @property
+    def watchCount(self) -> int:
+        return len(self._watches)
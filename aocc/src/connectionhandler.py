@@ -1,21 +1,40 @@
-from multiprocessing.connection import Connection
+from multiprocessing.connection import Connection, Pipe, wait
 from aocc.src.package import Package
-from threading import Thread, Lock
-from queue import Queue
-from time import sleep
+from threading import Thread, Lock, current_thread
+from aocc.src.lanequeue import LaneQueue
+from aocc.src.sharedpayload import share_large_payload
+from queue import Empty
+from time import monotonic
+import logging
+
+_logger: logging.Logger = logging.getLogger(__name__)
 
 class ConnectionHandler:
 
-    def __init__(self, conn_in: Connection, conn_out: Connection, package_callback: callable = None, auto_start: bool = False) -> None:
+    _stop_marker: object = object()
+
+    def __init__(self, conn_in: Connection, conn_out: Connection, package_callback: callable = None, auto_start: bool = False, batch: bool = False, batch_window: float = 0.0, batch_max_packages: int = 256, batch_max_bytes: int = 1 << 20, shared_memory_threshold: int | None = None) -> None:
         self._conn_in: Connection = conn_in
         self._conn_out: Connection = conn_out
         self._callback: callable = package_callback
 
-        self._packages_in: Queue = Queue()
-        self._packages_in_queue_lock: Lock = Lock()
+        # Mit batch=True werden alle bereits wartenden Pakete (und bei batch_window > 0
+        # die innerhalb des Fensters eintreffenden) zu einem Frame zusammengefasst
+        self._batch: bool = batch
+        self._batch_window: float = batch_window
+        self._batch_max_packages: int = batch_max_packages
+        self._batch_max_bytes: int = batch_max_bytes
+        # Bytes-Payloads ab dieser Größe gehen über ein Shared-Memory-Segment statt durch die Pipe
+        self._shared_memory_threshold: int | None = shared_memory_threshold
+
+        # Steuerpakete überholen normale Pakete und diese wiederum Bulk-Daten
+        self._packages_in: LaneQueue = LaneQueue()
+        self._packages_out: LaneQueue = LaneQueue()
 
-        self._packages_out: Queue = Queue()
-        self._packages_out_queue_lock: Lock = Lock()
+        self._wakeup_reader: Connection | None = None
+        self._wakeup_writer: Connection | None = None
+        self._threads: list = list()
+        self._flush_deadline: float = 0.0
 
         self._is_running: bool = False
         self._is_running_lock: Lock = Lock()
@@ -24,90 +43,197 @@ class ConnectionHandler:
             self.start()
 
     def start(self) -> None:
-        if not self.isRunning:
-            with self._is_running_lock:
-                self._is_running: bool = True
-            Thread(target=self._handle_conn_in, daemon=True).start()
-            if self._callback != None:
-                Thread(target=self._handle_packages_in, daemon=True).start()
-            Thread(target=self._handle_packages_out, daemon=True).start()
-
-    def stop(self) -> None:
-        if self.isRunning:
-            with self._is_running_lock:
-                self._is_running: bool = False
+        with self._is_running_lock:
+            if self._is_running:
+                return None
+            # ein Thread aus dem letzten Lauf (z.B. in einem blockierenden send_bytes) würde sonst
+            # parallel zum neuen Sendethread auf dieselbe Verbindung schreiben
+            if any(thread.is_alive() for thread in self._threads):
+                raise Exception('ConnectionHandler is still stopping')
+            self._is_running: bool = True
+        # Der Wakeup-Pipe weckt den Empfangsthread beim Stoppen aus wait() auf
+        self._wakeup_reader, self._wakeup_writer = Pipe(duplex=False)
+        self._threads: list = [Thread(target=self._handle_conn_in, daemon=True)]
+        if self._callback != None:
+            self._threads.append(Thread(target=self._handle_packages_in, daemon=True))
+        self._threads.append(Thread(target=self._handle_packages_out, daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: float | None = 1.0, flush_timeout: float = 0.1) -> None:
+        # Die Stop-Markierung überholt als Steuerpaket alle anderen, danach sendet der Sendethread noch höchstens
+        # flush_timeout Sekunden lang die bereits eingereihten Pakete, der Rest wird verworfen
+        with self._is_running_lock:
+            if not self._is_running:
+                return None
+            self._is_running: bool = False
+            self._flush_deadline: float = monotonic() + flush_timeout
+        try:
+            self._wakeup_writer.send_bytes(b'\x00')
+        except OSError:
+            pass
+        if self._callback != None:
+            self._packages_in.put(ConnectionHandler._stop_marker, priority=Package.PRIORITY_CONTROL)
+        self._packages_out.put(ConnectionHandler._stop_marker, priority=Package.PRIORITY_CONTROL)
+        for thread in self._threads:
+            if thread.is_alive() and thread is not current_thread():
+                thread.join(timeout=timeout)
+        if not self._threads[0].is_alive():
+            self._wakeup_reader.close()
+            self._wakeup_writer.close()
+        # noch laufende Threads bleiben eingetragen, start() verweigert bis dahin den Neustart
+        self._threads: list = [thread for thread in self._threads if thread.is_alive()]
 
     def _handle_conn_in(self) -> None:
+        wakeup_reader: Connection = self._wakeup_reader
         while self.isRunning:
-            if self._conn_in.poll():
-                package: Package = self._conn_in.recv()
-                with self._packages_in_queue_lock:
-                    self._packages_in.put(package)
+            ready: list = wait([self._conn_in, wakeup_reader])
+            if wakeup_reader in ready:
+                break
+            try:
+                data: bytes = self._conn_in.recv_bytes()
+            except (EOFError, OSError):
+                break
+            # ein kaputter Frame darf den Empfangsthread nicht beenden, sonst kommt danach nichts mehr an
+            try:
+                frames: list = Package.split_frame(data)
+            except Exception as e:
+                _logger.error('dropping undecodable frame of %d bytes: %s', len(data), e)
+                continue
+            for frame in frames:
+                try:
+                    package: Package = Package.from_bytes(frame)
+                except Exception as e:
+                    _logger.error('dropping undecodable package of %d bytes: %s', len(frame), e)
+                    continue
+                self._packages_in.put(package, priority=package.Priority)
 
     def _handle_packages_in(self) -> None:
-        while self.isRunning and not self.packagesInEmpty:
-            if self._callback != None:
-                package: Package | None = self.get_package()
-                if package != None:    
-                    self._callback(package)
-                else:
-                    sleep(0.2)
-        return None
+        while True:
+            package: Package | object = self._packages_in.get()
+            if package is ConnectionHandler._stop_marker:
+                break
+            self._callback(package)
 
     def _handle_packages_out(self) -> None:
-        while self.isRunning and not self.packagesOutEmpty:
-            package: Package | None = self._get_out_package()
-            if package != None:
-                self._conn_out.send(package)
-            else:
-                sleep(0.2)
-        return None
-    
-    def _get_out_package(self) -> Package | None:
+        while True:
+            item: Package | list | object = self._packages_out.get()
+            if item is ConnectionHandler._stop_marker:
+                self._flush()
+                break
+            shared: list = list()
+            frames: list = self._encode(item=item, shared=shared)
+            stopped: bool = self._collect_batch(frames=frames, shared=shared) if self._batch else False
+            if not self._send_frames(frames=frames, shared=shared):
+                break
+            if stopped:
+                self._flush()
+                break
+
+    def _send_frames(self, frames: list, shared: list) -> bool:
         try:
-            with self._packages_out_queue_lock:
-                package: Package = self._packages_out.get(block=False)
-        except:
-            package: None = None
-        finally:
-            return package
-
-    def get_package(self) -> Package | None:
+            if len(frames) == 1:
+                self._conn_out.send_bytes(frames[0])
+            elif len(frames) > 1:
+                self._conn_out.send_bytes(Package.pack_batch(frames))
+        except (EOFError, OSError):
+            for buffer in shared:
+                buffer.release()
+            return False
+        for buffer in shared:
+            buffer.detach()
+        return True
+
+    def _flush(self) -> None:
+        # nach dem Stoppen: wartende Pakete bis zur Frist senden, den Rest verwerfen,
+        # damit ein späterer start() keine veralteten Pakete mehr verschickt
+        while monotonic() < self._flush_deadline:
+            try:
+                item: Package | list | object = self._packages_out.get(block=False)
+            except Empty:
+                return None
+            if item is ConnectionHandler._stop_marker:
+                continue
+            shared: list = list()
+            if not self._send_frames(frames=self._encode(item=item, shared=shared), shared=shared):
+                break
+        dropped: int = 0
+        while True:
+            try:
+                item: Package | list | object = self._packages_out.get(block=False)
+            except Empty:
+                break
+            if item is not ConnectionHandler._stop_marker:
+                dropped += len(item) if isinstance(item, list) else 1
+        if dropped:
+            _logger.warning('dropping %d queued packages on stop', dropped)
+
+    def _collect_batch(self, frames: list, shared: list) -> bool:
+        size: int = sum(len(frame) for frame in frames)
+        deadline: float = monotonic() + self._batch_window
+        while len(frames) < self._batch_max_packages and size < self._batch_max_bytes:
+            remaining: float = deadline - monotonic()
+            try:
+                if remaining > 0:
+                    item: Package | list | object = self._packages_out.get(timeout=remaining)
+                else:
+                    item: Package | list | object = self._packages_out.get(block=False)
+            except Empty:
+                break
+            if item is ConnectionHandler._stop_marker:
+                return True
+            new_frames: list = self._encode(item=item, shared=shared)
+            frames.extend(new_frames)
+            size += sum(len(frame) for frame in new_frames)
+        return False
+
+    def _encode(self, item: Package | list, shared: list) -> list:
+        # Pakete, die sich nicht kodieren lassen, werden verworfen statt den Sendethread zu beenden
+        packages: list = item if isinstance(item, list) else [item]
+        frames: list = list()
+        for package in packages:
+            buffers: list = list()
+            try:
+                if self._shared_memory_threshold != None:
+                    payload, buffers = share_large_payload(payload=package.Payload, threshold=self._shared_memory_threshold)
+                    if buffers:
+                        package: Package = package.with_payload(payload=payload)
+                frames.append(package.to_bytes())
+            except Exception as e:
+                for buffer in buffers:
+                    buffer.release()
+                _logger.error('dropping package that can\'t be encoded: %s', e)
+                continue
+            shared.extend(buffers)
+        return frames
+
+    def get_package(self, block: bool = False, timeout: float | None = None) -> Package | None:
         try:
-            with self._packages_in_queue_lock:
-                package: Package = self._packages_in.get(block=False)
-        except:
-            package: None = None
-        finally:
-            return package
+            package: Package | object = self._packages_in.get(block=block, timeout=timeout)
+        except Empty:
+            return None
+        if package is ConnectionHandler._stop_marker:
+            return None
+        return package
 
     def send_package(self, package: Package) -> None:
-        with self._packages_out_queue_lock:
-            self._packages_out.put(package)    
+        self._packages_out.put(package, priority=package.Priority)
+
+    def send_packages(self, packages: list) -> None:
+        # die Pakete gehen gemeinsam als ein Frame über die Verbindung
+        if packages:
+            self._packages_out.put(list(packages), priority=min(package.Priority for package in packages))
 
     @property
     def packagesInEmpty(self) -> bool:
-        try:
-            with self._packages_in_queue_lock:
-                result: bool = self._packages_in.empty()
-            return result
-        except:
-            return True
-        
+        return self._packages_in.empty()
+
     @property
     def packagesOutEmpty(self) -> bool:
-        try:
-            with self._packages_out_queue_lock:
-                result: bool = self._packages_out.empty()
-            return result
-        except:
-            return True
+        return self._packages_out.empty()
 
     @property
     def isRunning(self) -> bool:
-        try:
-            with self._is_running_lock:
-                result: bool = self._is_running
-            return result
-        except:
-            return False
\ No newline at end of file
+        with self._is_running_lock:
+            result: bool = self._is_running
+        return result
@@ -1,27 +1,222 @@
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.fernet import Fernet
+from aocc.src.objectcodec import encode_object, decode_object
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from struct import Struct
+import hashlib
 import base64
-import pickle
+import hmac
+import os
+
+class DerivedKeyCache:
+
+    # Prozessinterner Cache für abgeleitete Schlüssel. Der Schlüssel des Caches ist ein HMAC über Salt,
+    # Passwort und Iterationen mit einem zufälligen Prozess-Secret, Passwörter werden also nicht gespeichert.
+    # Abgeleitete Schlüssel liegen in bytearrays und werden beim Entfernen mit Nullen überschrieben.
+
+    def __init__(self, ttl: float = 900.0, max_entries: int = 64) -> None:
+        self._ttl: float = ttl
+        self._max_entries: int = max_entries
+        self._secret: bytes = os.urandom(32)
+        self._entries: OrderedDict = OrderedDict()
+        self._entries_lock: Lock = Lock()
+        self._derive_locks: dict = dict()
+
+    def fingerprint(self, salt: bytes, password: bytes, iterations: int) -> bytes:
+        message: bytes = b''.join((len(salt).to_bytes(4, 'big'), salt, iterations.to_bytes(4, 'big'), password))
+        return hmac.new(self._secret, message, hashlib.sha256).digest()
+
+    def get_or_derive(self, salt: bytes, password: bytes, iterations: int, derive: callable) -> bytes:
+        fingerprint: bytes = self.fingerprint(salt=salt, password=password, iterations=iterations)
+        key: bytes | None = self._get(fingerprint=fingerprint)
+        if key != None:
+            return key
+        # je Fingerprint nur eine Ableitung, gleichzeitige Aufrufer warten darauf
+        with self._entries_lock:
+            derive_lock: Lock = self._derive_locks.setdefault(fingerprint, Lock())
+        with derive_lock:
+            key: bytes | None = self._get(fingerprint=fingerprint)
+            if key == None:
+                derived: bytearray = bytearray(derive())
+                key: bytes = bytes(derived)
+                self._put(fingerprint=fingerprint, key=derived)
+        with self._entries_lock:
+            self._derive_locks.pop(fingerprint, None)
+        return key
+
+    def evict(self, salt: bytes, password: bytes, iterations: int) -> bool:
+        fingerprint: bytes = self.fingerprint(salt=salt, password=password, iterations=iterations)
+        with self._entries_lock:
+            entry: tuple | None = self._entries.pop(fingerprint, None)
+        if entry != None:
+            DerivedKeyCache._zero(key=entry[0])
+        return entry != None
+
+    def clear(self) -> None:
+        with self._entries_lock:
+            entries: list = list(self._entries.values())
+            self._entries.clear()
+        for key, _ in entries:
+            DerivedKeyCache._zero(key=key)
+
+    def _get(self, fingerprint: bytes) -> bytes | None:
+        result: bytes | None = None
+        with self._entries_lock:
+            now: float = monotonic()
+            expired: list = [self._entries.pop(entry_fingerprint)[0] for entry_fingerprint in [entry_fingerprint for entry_fingerprint, (_, expires) in self._entries.items() if expires <= now]]
+            entry: tuple | None = self._entries.get(fingerprint)
+            if entry != None:
+                self._entries.move_to_end(fingerprint)
+                result = bytes(entry[0])
+        for key in expired:
+            DerivedKeyCache._zero(key=key)
+        return result
+
+    def _put(self, fingerprint: bytes, key: bytearray) -> None:
+        evicted: list = list()
+        with self._entries_lock:
+            previous: tuple | None = self._entries.pop(fingerprint, None)
+            if previous != None:
+                evicted.append(previous[0])
+            self._entries[fingerprint] = (key, monotonic() + self._ttl)
+            while len(self._entries) > self._max_entries:
+                evicted.append(self._entries.popitem(last=False)[1][0])
+        for old_key in evicted:
+            DerivedKeyCache._zero(key=old_key)
+
+    @staticmethod
+    def _zero(key: bytearray) -> None:
+        key[:] = bytes(len(key))
+
+    @property
+    def length(self) -> int:
+        with self._entries_lock:
+            return len(self._entries)
+
 
 class CryptoObject:
 
-    def __init__(self, salt: str, password: str) -> None:
+    _iterations: int = 390_000
+    _key_cache: DerivedKeyCache = DerivedKeyCache()
+
+    # Stream-Format: magic | chunk_size | nonce_prefix, danach Chunks aus AES-GCM-Ciphertext mit 16 Byte Tag.
+    # Alle Chunks außer dem letzten sind chunk_size groß. Nonce = nonce_prefix + Chunk-Zähler, die AAD ist
+    # der Header plus ein Final-Flag, so fallen vertauschte, fehlende oder abgeschnittene Chunks auf.
+    _stream_magic: bytes = b'ACS1'
+    _stream_header: Struct = Struct('!4sI8s')
+    _stream_tag_size: int = 16
+    _stream_chunk_size: int = 64 * 1024
+    _stream_max_chunk_size: int = 16 << 20
+
+    def __init__(self, salt: str, password: str, cache: bool = True) -> None:
+        salt_bytes: bytes = salt.encode(encoding='utf-8')
+        password_bytes: bytes = password.encode(encoding='utf-8')
+        derive: callable = lambda: CryptoObject._derive_key(salt=salt_bytes, password=password_bytes)
+        if cache:
+            key_derived: bytes = CryptoObject._key_cache.get_or_derive(salt=salt_bytes, password=password_bytes, iterations=CryptoObject._iterations, derive=derive)
+        else:
+            key_derived: bytes = derive()
+        key = base64.urlsafe_b64encode(key_derived)
+        self._fernet_object: Fernet = Fernet(key)
+        # eigener Schlüssel für Streams, damit derselbe Schlüssel nicht in zwei Verfahren steckt
+        stream_key: bytes = HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=b'aocc stream v1').derive(key_derived)
+        self._stream_aead: AESGCM = AESGCM(stream_key)
+
+    @staticmethod
+    def _derive_key(salt: bytes, password: bytes) -> bytes:
         kdf = PBKDF2HMAC(
             algorithm=hashes.SHA256(),
             length=32,
-            salt=salt.encode(encoding='utf-8'),
-            iterations=390_000,
+            salt=salt,
+            iterations=CryptoObject._iterations,
         )
-        key_derived = kdf.derive(password.encode(encoding='utf-8'))
-        key = base64.urlsafe_b64encode(key_derived)
-        self._fernet_object: Fernet = Fernet(key)
+        return kdf.derive(password)
+
+    @staticmethod
+    def evict_cached_key(salt: str, password: str) -> bool:
+        return CryptoObject._key_cache.evict(salt=salt.encode(encoding='utf-8'), password=password.encode(encoding='utf-8'), iterations=CryptoObject._iterations)
+
+    @staticmethod
+    def clear_key_cache() -> None:
+        CryptoObject._key_cache.clear()
 
     def encrypt_object(self, obj: any) -> bytes:
-        return self._fernet_object.encrypt(data=pickle.dumps(obj))
+        return self._fernet_object.encrypt(data=encode_object(obj=obj))
 
     def decrypt_object(self, enc_obj: bytes) -> any:
-        return pickle.loads(self._fernet_object.decrypt(enc_obj))
+        # ältere Daten sind noch mit pickle verschlüsselt und werden beim nächsten encrypt_object ersetzt
+        return decode_object(data=self._fernet_object.decrypt(enc_obj), legacy=True)
+
+    def encrypt_stream(self, reader: any, writer: any, chunk_size: int | None = None) -> int:
+        # liest reader bis EOF und schreibt den verschlüsselten Stream nach writer, liefert die geschriebenen Bytes
+        if chunk_size == None:
+            chunk_size: int = CryptoObject._stream_chunk_size
+        if chunk_size <= 0 or chunk_size > CryptoObject._stream_max_chunk_size:
+            raise Exception(f'chunk_size must be between 1 and {CryptoObject._stream_max_chunk_size}')
+        header: bytes = CryptoObject._stream_header.pack(CryptoObject._stream_magic, chunk_size, os.urandom(8))
+        written: int = writer.write(header)
+        counter: int = 0
+        chunk: bytes = CryptoObject._read_exactly(reader=reader, size=chunk_size)
+        while True:
+            # ein voller Chunk ist nur dann der letzte, wenn danach nichts mehr kommt
+            following: bytes = CryptoObject._read_exactly(reader=reader, size=chunk_size) if len(chunk) == chunk_size else b''
+            final: bool = len(following) == 0
+            written += writer.write(self._stream_aead.encrypt(CryptoObject._stream_nonce(header=header, counter=counter), chunk, header + (b'\x01' if final else b'\x00')))
+            if final:
+                return written
+            chunk: bytes = following
+            counter += 1
+
+    def decrypt_stream(self, reader: any, writer: any) -> int:
+        # schreibt den Klartext nach writer und liefert seine Länge; InvalidTag bei falschem Schlüssel oder Manipulation
+        header: bytes = CryptoObject._read_exactly(reader=reader, size=CryptoObject._stream_header.size)
+        if len(header) != CryptoObject._stream_header.size:
+            raise Exception('Stream is too short')
+        magic, chunk_size, _ = CryptoObject._stream_header.unpack(header)
+        if magic != CryptoObject._stream_magic:
+            raise Exception('Data is not an encrypted stream')
+        if chunk_size <= 0 or chunk_size > CryptoObject._stream_max_chunk_size:
+            raise Exception(f'Unsupported chunk_size {chunk_size}')
+        encrypted_size: int = chunk_size + CryptoObject._stream_tag_size
+        written: int = 0
+        counter: int = 0
+        chunk: bytes = CryptoObject._read_exactly(reader=reader, size=encrypted_size)
+        while True:
+            following: bytes = CryptoObject._read_exactly(reader=reader, size=encrypted_size) if len(chunk) == encrypted_size else b''
+            final: bool = len(following) == 0
+            plain: bytes = self._stream_aead.decrypt(CryptoObject._stream_nonce(header=header, counter=counter), chunk, header + (b'\x01' if final else b'\x00'))
+            written += writer.write(plain)
+            if final:
+                return written
+            chunk: bytes = following
+            counter += 1
+
+    @staticmethod
+    def _stream_nonce(header: bytes, counter: int) -> bytes:
+        if counter >= 1 << 32:
+            raise Exception('Stream has too many chunks')
+        return header[-8:] + counter.to_bytes(4, 'big')
+
+    @staticmethod
+    def _read_exactly(reader: any, size: int) -> bytes:
+        # read() darf bei Pipes und Sockets weniger liefern, erst b'' bedeutet EOF
+        data: bytes = reader.read(size)
+        if len(data) in (0, size):
+            return data
+        parts: list = [data]
+        missing: int = size - len(data)
+        while missing > 0:
+            part: bytes = reader.read(missing)
+            if not part:
+                break
+            parts.append(part)
+            missing -= len(part)
+        return b''.join(parts)
     
     @staticmethod
     def genereate_random_secret(size: int = 32, shuffle: bool = False, shuffle_rounds: int = 100) -> str:
@@ -0,0 +1,135 @@
+from aocc.src.fileindex import FileIndex, IndexEntry
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from time import perf_counter
+import os
+
+
+class DirectoryScanner:
+
+    # Vergleicht einen Verzeichnisbaum mit dem FileIndex und liefert nur die Änderungen.
+    # Verzeichnisse werden parallel mit os.scandir gelesen, der Vergleich läuft im aufrufenden Thread.
+    # Eine Änderung ist ein dict mit 'type' (added, modified, deleted, moved), 'path' und bei moved 'from'.
+
+    def __init__(self, index: FileIndex, max_workers: int = 8, batch_size: int = 1000) -> None:
+        if max_workers < 1 or batch_size < 1:
+            raise Exception('max_workers and batch_size must be at least 1')
+        self._index: FileIndex = index
+        self._max_workers: int = max_workers
+        self._batch_size: int = batch_size
+
+    def scan(self, root: str, emit: callable, update_index: bool = True) -> dict:
+        # emit() bekommt Listen mit höchstens batch_size Änderungen, zurückgegeben wird eine Zusammenfassung
+        root: str = os.path.abspath(root)
+        started: float = perf_counter()
+        known: dict = dict()
+        known_inodes: dict = dict()
+        for entry in self._index.iter_prefix(prefix=root + os.sep):
+            known[entry.path] = entry
+            known_inodes[entry.inode] = entry.path
+        summary: dict = {'root': root, 'files': 0, 'added': 0, 'modified': 0, 'deleted': 0, 'moved': 0}
+        pending: list = list()
+        upserts: list = list()
+        # neue Pfade mit einem bekannten Inode sind vielleicht verschoben, das steht erst nach dem Scan fest
+        move_candidates: list = list()
+
+        def add_change(change: dict, entry: IndexEntry | None = None) -> None:
+            summary[change['type']] += 1
+            pending.append(change)
+            if entry != None and update_index:
+                upserts.append(entry)
+            if len(pending) >= self._batch_size:
+                emit(list(pending))
+                pending.clear()
+            if len(upserts) >= self._batch_size:
+                self._index.upsert_many(entries=list(upserts))
+                upserts.clear()
+
+        unreadable: list = list()
+        for path, stat in self._walk(root=root, unreadable=unreadable):
+            summary['files'] += 1
+            entry: IndexEntry | None = known.pop(path, None)
+            if entry != None:
+                if not FileIndex.matches(entry=entry, stat=stat):
+                    add_change(change=DirectoryScanner._change(change_type='modified', path=path, stat=stat), entry=FileIndex.entry_from_stat(path=path, stat=stat))
+                continue
+            if stat.st_ino in known_inodes:
+                move_candidates.append((path, stat))
+                continue
+            add_change(change=DirectoryScanner._change(change_type='added', path=path, stat=stat), entry=FileIndex.entry_from_stat(path=path, stat=stat))
+
+        moved_from: list = list()
+        for path, stat in move_candidates:
+            old_path: str = known_inodes[stat.st_ino]
+            old_entry: IndexEntry | None = known.get(old_path)
+            # ein Umbenennen erhält size und mtime, ein wiederverwendeter Inode einer neuen Datei in der Regel nicht
+            if old_entry != None and old_entry.size == stat.st_size and old_entry.mtime_ns == stat.st_mtime_ns:
+                del known[old_path]
+                moved_from.append(old_path)
+                change: dict = DirectoryScanner._change(change_type='moved', path=path, stat=stat)
+                change['from'] = old_path
+                add_change(change=change, entry=FileIndex.entry_from_stat(path=path, stat=stat, hash=old_entry.hash))
+            else:
+                add_change(change=DirectoryScanner._change(change_type='added', path=path, stat=stat), entry=FileIndex.entry_from_stat(path=path, stat=stat))
+
+        # Dateien unter nicht lesbaren Verzeichnissen gelten nicht als gelöscht
+        skipped: tuple = tuple(directory + os.sep for directory in unreadable)
+        deleted: list = [path for path in known if not path.startswith(skipped)] if skipped else list(known)
+        for path in deleted:
+            add_change(change={'type': 'deleted', 'path': path})
+        if pending:
+            emit(list(pending))
+        if update_index:
+            if upserts:
+                self._index.upsert_many(entries=upserts)
+            if deleted or moved_from:
+                self._index.delete_many(paths=deleted + moved_from)
+        summary['duration'] = perf_counter() - started
+        return summary
+
+    def _walk(self, root: str, unreadable: list):
+        # liefert (Pfad, stat) aller regulären Dateien, Symlinks werden nicht verfolgt
+        with ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix='directory_scanner') as pool:
+            # fehlt die Wurzel selbst (nicht eingehängt, umbenannt), ist das ein Fehler und keine Löschung aller Dateien
+            running: set = {pool.submit(DirectoryScanner._scan_directory, root, False)}
+            while running:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    files, directories, readable = future.result()
+                    if not readable:
+                        unreadable.append(files)
+                        continue
+                    for directory in directories:
+                        running.add(pool.submit(DirectoryScanner._scan_directory, directory))
+                    yield from files
+
+    @staticmethod
+    def _scan_directory(path: str, missing_ok: bool = True) -> tuple:
+        # liefert (Dateien, Unterverzeichnisse, True) oder (Pfad, [], False) wenn das Verzeichnis nicht lesbar ist
+        files: list = list()
+        directories: list = list()
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            directories.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            files.append((entry.path, entry.stat(follow_symlinks=False)))
+                    except OSError:
+                        # während des Scans gelöscht oder nicht lesbar
+                        continue
+        except (FileNotFoundError, NotADirectoryError):
+            if not missing_ok:
+                raise Exception(f'{path} is not a directory')
+        except OSError:
+            return path, list(), False
+        return files, directories, True
+
+    @staticmethod
+    def _change(change_type: str, path: str, stat: os.stat_result) -> dict:
+        return {
+            'type': change_type,
+            'path': path,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns
+        }
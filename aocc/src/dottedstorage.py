@@ -1,41 +1,335 @@
 import pickle
 import os
 from cryptography.fernet import Fernet
+from aocc.src.storagejournal import StorageJournal
+from threading import Thread
 
 class DottedStorage:
 
     _missing = object()
+    # kompilierte Schlüssel ('a.b.c' -> (('a', 'b'), 'c')), gemeinsam für alle Instanzen
+    _paths: dict = dict()
+    _paths_limit: int = 4096
     
-    def __init__(self, data: dict | bytes | None = None) -> None: 
+    def __init__(self, data: dict | bytes | None = None, index: bool = False, file: str | None = None, journal_options: dict | None = None) -> None: 
         self._loaded: bool = False
         self._modified: bool = False
+        self._journal: StorageJournal | None = None
+        self._compaction: Thread | None = None
+        # Watcher auf Schlüsselpräfixe: id -> (Präfixe, callback), siehe watch()
+        self._watchers: dict = dict()
+        self._watcher_id: int = 0
+        # optionaler flacher Index {'a.b.c': Wert} über alle erreichbaren Schlüssel, wird bei set() mitgeführt.
+        # Änderungen direkt an get_data() oder an zurückgegebenen dicts sieht der Index nicht, dafür rebuild_index().
+        self._index: dict | None = dict() if index else None
         if data != None and isinstance(data, bytes) or isinstance(data, dict):
             self.load_data(data=data)
         else:
             self._store: dict = dict()
+        if file != None:
+            self.open_file(file=file, journal_options=journal_options)
+
+    @staticmethod
+    def _compile(key: str) -> tuple:
+        parts: list = key.split('.')
+        compiled: tuple = (tuple(parts[:-1]), parts[-1])
+        if len(DottedStorage._paths) >= DottedStorage._paths_limit:
+            DottedStorage._paths.clear()
+        DottedStorage._paths[key] = compiled
+        return compiled
 
     def set(self, key: str, value) -> None:
         """Set a value in the nested dict using a dotted key."""
-        parts = key.split('.')
+        if self._journal == None and not self._watchers:
+            self._set(key=key, value=value)
+        else:
+            self._apply(operations=[(key, value)])
+        return None
+
+    def delete(self, key: str) -> bool:
+        """Remove a dotted key, returns False if it did not exist."""
+        if self.get(key, DottedStorage._missing) is DottedStorage._missing:
+            return False
+        self._apply(operations=[(key,)])
+        return True
+
+    def _apply(self, operations: list) -> None:
+        # Operationen sind (key, value) zum Setzen und (key,) zum Löschen
+        diff: dict | None = {'changed': dict(), 'removed': dict()} if self._watchers else None
+        if self._journal != None:
+            # erst ins Journal, damit der Speicher nie einen Stand hat, der auf der Platte fehlt
+            with self._journal.lock:
+                self._journal.append(pairs=operations)
+                self._apply_operations(operations=operations, diff=diff)
+            self._maybe_compact()
+        else:
+            self._apply_operations(operations=operations, diff=diff)
+        if diff != None:
+            self._notify(diff=diff)
+
+    def _apply_operations(self, operations: list, diff: dict | None) -> None:
+        for operation in operations:
+            if diff == None:
+                self._apply_operation(operation=operation)
+                continue
+            # alte und neue Blätter unter dem obersten Schlüssel vergleichen, den die Operation verändert
+            root: str = self._affected_root(key=operation[0]) if len(operation) == 2 else operation[0]
+            before: dict = self._leaves_at(key=root)
+            self._apply_operation(operation=operation)
+            after: dict = self._leaves_at(key=root)
+            for key in before:
+                if key not in after:
+                    diff['removed'][key] = None
+                    diff['changed'].pop(key, None)
+            for key, value in after.items():
+                old = before.get(key, DottedStorage._missing)
+                if old is DottedStorage._missing or type(old) != type(value) or old != value:
+                    diff['changed'][key] = value
+                    diff['removed'].pop(key, None)
+
+    def _apply_operation(self, operation: tuple) -> None:
+        if len(operation) == 2:
+            self._set(key=operation[0], value=operation[1])
+        else:
+            self._delete(key=operation[0])
+
+    def _delete(self, key: str) -> None:
+        parents, last = DottedStorage._paths.get(key) or DottedStorage._compile(key=key)
+        d = self._store
+        for part in parents:
+            if part in d and isinstance(d[part], dict):
+                d = d[part]
+            else:
+                return None
+        old = d.pop(last, DottedStorage._missing)
+        if old is DottedStorage._missing:
+            return None
+        if self._index != None:
+            self._index.pop(key, None)
+            if isinstance(old, dict):
+                for old_key, _ in DottedStorage._flatten(data=old, prefix=key + '.'):
+                    self._index.pop(old_key, None)
+        self._modified: bool = True
+
+    def _set(self, key: str, value) -> None:
+        parents, last = DottedStorage._paths.get(key) or DottedStorage._compile(key=key)
         d = self._store
-        for part in parts[:-1]:
+        index: dict | None = self._index
+        for position, part in enumerate(parents):
             if part not in d or not isinstance(d[part], dict):
                 d[part] = {}
+                if index != None:
+                    # ein ersetzter Wert hatte keine Unterschlüssel, nur der Eintrag selbst ändert sich
+                    index['.'.join(parents[:position + 1])] = d[part]
             d = d[part]
-        d[parts[-1]] = value
+        if index != None:
+            old = d.get(last, DottedStorage._missing)
+            if isinstance(old, dict):
+                for old_key, _ in DottedStorage._flatten(data=old, prefix=key + '.'):
+                    index.pop(old_key, None)
+            index[key] = value
+            if isinstance(value, dict):
+                index.update(DottedStorage._flatten(data=value, prefix=key + '.'))
+        d[last] = value
         self._modified: bool = True
-        return None
 
     def get(self, key: str, default=None):
         """Get a value from the nested dict using a dotted key."""
-        parts = key.split('.')
+        if self._index != None:
+            return self._index.get(key, default)
+        parents, last = DottedStorage._paths.get(key) or DottedStorage._compile(key=key)
         d = self._store
-        for part in parts[:-1]:
+        for part in parents:
             if part in d and isinstance(d[part], dict):
                 d = d[part]
             else:
                 return default
-        return d.get(parts[-1], default)
+        return d.get(last, default)
+
+    def get_many(self, keys: list, default=None) -> dict:
+        """Get several values at once, returns a dict dotted key -> value."""
+        if self._index != None:
+            index: dict = self._index
+            return {key: index.get(key, default) for key in keys}
+        return {key: self.get(key, default) for key in keys}
+
+    def set_many(self, values: dict) -> None:
+        """Set several values at once from a dict (or pairs) dotted key -> value."""
+        items: list = list(values.items() if isinstance(values, dict) else values)
+        if self._journal == None and not self._watchers:
+            for key, value in items:
+                self._set(key=key, value=value)
+        else:
+            # ein Journal-Datensatz und ein Diff für alle Werte
+            self._apply(operations=items)
+
+    def apply_diff(self, diff: dict) -> None:
+        """Apply a diff as delivered to watch() callbacks."""
+        operations: list = [(key,) for key in diff.get('removed', list())]
+        operations.extend(diff.get('changed', dict()).items())
+        if operations:
+            self._apply(operations=operations)
+
+    def watch(self, prefixes: str | list, callback: callable) -> int:
+        """Call callback(diff) for changes below the prefixes ('language', 'language.*', '*' for all).
+
+        diff is {'changed': {dotted key: value}, 'removed': [dotted key]} and only contains leaf keys
+        below the prefixes that really changed.
+        """
+        if isinstance(prefixes, str):
+            prefixes: list = [prefixes]
+        normalized: tuple = tuple(DottedStorage._normalize_prefix(prefix=prefix) for prefix in prefixes)
+        self._watcher_id += 1
+        self._watchers[self._watcher_id] = (normalized, callback)
+        return self._watcher_id
+
+    def unwatch(self, watch_id: int) -> bool:
+        return self._watchers.pop(watch_id, None) != None
+
+    def leaves(self, prefixes: str | list = '*') -> dict:
+        """Current leaf values below the prefixes as {dotted key: value}."""
+        if isinstance(prefixes, str):
+            prefixes: list = [prefixes]
+        result: dict = dict()
+        for prefix in prefixes:
+            prefix: str = DottedStorage._normalize_prefix(prefix=prefix)
+            if prefix == '':
+                for key, value in self._store.items():
+                    if isinstance(key, str) and '.' not in key:
+                        result.update(DottedStorage._leaves(value=value, key=key))
+            else:
+                result.update(self._leaves_at(key=prefix))
+        return result
+
+    def _notify(self, diff: dict) -> None:
+        if not diff['changed'] and not diff['removed']:
+            return None
+        for prefixes, callback in list(self._watchers.values()):
+            changed: dict = {key: value for key, value in diff['changed'].items() if DottedStorage._matches(key=key, prefixes=prefixes)}
+            removed: list = [key for key in diff['removed'] if DottedStorage._matches(key=key, prefixes=prefixes)]
+            if changed or removed:
+                try:
+                    callback({'changed': changed, 'removed': removed})
+                except Exception:
+                    # ein fehlerhafter Watcher darf die Änderung nicht abbrechen
+                    continue
+
+    def _affected_root(self, key: str) -> str:
+        # der erste Elternschlüssel, der fehlt oder kein dict ist, wird durch set() neu angelegt
+        parents, last = DottedStorage._paths.get(key) or DottedStorage._compile(key=key)
+        d = self._store
+        for position, part in enumerate(parents):
+            if part in d and isinstance(d[part], dict):
+                d = d[part]
+            else:
+                return '.'.join(parents[:position + 1])
+        return key
+
+    def _leaves_at(self, key: str) -> dict:
+        parents, last = DottedStorage._paths.get(key) or DottedStorage._compile(key=key)
+        d = self._store
+        for part in parents:
+            if part in d and isinstance(d[part], dict):
+                d = d[part]
+            else:
+                return dict()
+        value = d.get(last, DottedStorage._missing)
+        if value is DottedStorage._missing:
+            return dict()
+        return dict(DottedStorage._leaves(value=value, key=key))
+
+    @staticmethod
+    def _leaves(value, key: str):
+        # ein dict ist nur dann kein Blatt, wenn alle seine Schlüssel per Dotted Key erreichbar sind
+        if isinstance(value, dict) and value and all(isinstance(child, str) and '.' not in child for child in value):
+            for child, child_value in value.items():
+                yield from DottedStorage._leaves(value=child_value, key=f'{key}.{child}')
+        else:
+            yield key, value
+
+    @staticmethod
+    def _normalize_prefix(prefix: str) -> str:
+        if prefix in ('*', ''):
+            return ''
+        if prefix.endswith('.*'):
+            return prefix[:-2]
+        return prefix
+
+    @staticmethod
+    def _matches(key: str, prefixes: tuple) -> bool:
+        for prefix in prefixes:
+            if prefix == '' or key == prefix or key.startswith(prefix + '.'):
+                return True
+        return False
+
+    def open_file(self, file: str, journal_options: dict | None = None) -> None:
+        """Load the snapshot and journal of file, later changes are appended to the journal."""
+        self.close()
+        journal: StorageJournal = StorageJournal(path=file, **(journal_options or dict()))
+        data: dict = journal.load()
+        if self._loaded or self._modified:
+            # der Speicher hat schon Daten, die gelten und werden zum neuen Snapshot
+            journal.compact(data=self._store)
+        else:
+            self.load_data(data=data)
+        self._journal: StorageJournal = journal
+
+    def dump_to_file(self, file: str, journal_options: dict | None = None) -> None:
+        """Write a full snapshot to file and keep journaling changes next to it."""
+        if self._journal != None and self._journal.path == os.path.abspath(file):
+            self.compact()
+            return None
+        self.close()
+        journal: StorageJournal = StorageJournal(path=file, **(journal_options or dict()))
+        journal.compact(data=self._store)
+        self._journal: StorageJournal = journal
+
+    def compact(self) -> None:
+        """Write the current data as new snapshot and start an empty journal."""
+        journal: StorageJournal | None = self._journal
+        if journal != None:
+            with journal.lock:
+                journal.compact(data=self._store)
+
+    def close(self) -> None:
+        if self._compaction != None:
+            self._compaction.join()
+            self._compaction: None = None
+        if self._journal != None:
+            self._journal.close()
+            self._journal: None = None
+
+    def _maybe_compact(self) -> None:
+        # ab compact_size läuft die Kompaktierung im Hintergrund, set() wartet nur auf den Lock
+        if self._journal.needsCompaction and (self._compaction == None or not self._compaction.is_alive()):
+            self._compaction: Thread = Thread(target=self._compact_background, daemon=True, name='dotted_storage_compaction')
+            self._compaction.start()
+
+    def _compact_background(self) -> None:
+        journal: StorageJournal | None = self._journal
+        if journal != None:
+            with journal.lock:
+                if journal.needsCompaction:
+                    journal.compact(data=self._store)
+
+    def rebuild_index(self) -> None:
+        if self._index != None:
+            self._index: dict = dict(DottedStorage._flatten(data=self._store)) if isinstance(self._store, dict) else dict()
+
+    @staticmethod
+    def _flatten(data: dict, prefix: str = ''):
+        # liefert (dotted key, Wert) für alle über get() erreichbaren Schlüssel, auch für Zwischen-dicts.
+        # Schlüssel mit Punkt oder ohne str-Typ sind per Dotted Key nicht erreichbar und fehlen deshalb.
+        stack: list = [(prefix, data)]
+        while stack:
+            prefix, current = stack.pop()
+            for key, value in current.items():
+                if not isinstance(key, str) or '.' in key:
+                    continue
+                dotted: str = prefix + key
+                yield dotted, value
+                if isinstance(value, dict):
+                    stack.append((dotted + '.', value))
 
     def __getitem__(self, key: str):
         val = self.get(key, DottedStorage._missing)
@@ -55,6 +349,7 @@ class DottedStorage:
     def load_data(self, data: dict) -> None:
         if not self._loaded and not self._modified:
             self._store: dict = data            
+            self.rebuild_index()
         self._loaded: bool = True
 
     def reset_modified(self) -> None:
@@ -67,6 +362,14 @@ class DottedStorage:
         except:
             return False
         
+    @property
+    def journal(self) -> StorageJournal | None:
+        return self._journal
+
+    @property
+    def indexed(self) -> bool:
+        return self._index != None
+
     @property
     def modified(self) -> bool:
         try:
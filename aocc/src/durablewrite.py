@@ -0,0 +1,262 @@
+from concurrent.futures import Future
+from threading import Thread, Lock, current_thread
+from queue import Queue, Empty
+import ctypes
+import ctypes.util
+import uuid
+import sys
+import os
+
+
+def atomic_write(path: str, data: bytes | bytearray | memoryview, sync: bool = True) -> int:
+    # erst in eine temporäre Datei im selben Verzeichnis schreiben und dann umbenennen,
+    # ein Absturz hinterlässt so entweder die alte oder die neue Datei, nie eine halbe
+    fd, temp_path = open_temp(path=path)
+    try:
+        written: int = _write_all(fd=fd, data=data)
+    except:
+        discard_temp(fd=fd, temp_path=temp_path)
+        raise
+    commit_temp(fd=fd, temp_path=temp_path, path=path, sync=sync)
+    return written
+
+
+def open_temp(path: str) -> tuple:
+    # liefert (fd, temp_path) einer neuen Datei neben path, mit den Rechten der bestehenden Datei
+    directory, name = os.path.split(os.path.abspath(path))
+    temp_path: str = os.path.join(directory, f'.{name}.{uuid.uuid4().hex[:12]}.tmp')
+    fd: int = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o666)
+    try:
+        # Rechte der bestehenden Datei übernehmen
+        os.chmod(temp_path, os.stat(path).st_mode & 0o7777)
+    except OSError:
+        pass
+    return fd, temp_path
+
+
+def commit_temp(fd: int, temp_path: str, path: str, sync: bool = True) -> None:
+    # schließt fd und ersetzt path durch die temporäre Datei, mit sync=True dauerhaft auf der Platte
+    try:
+        if sync:
+            os.fsync(fd)
+    except:
+        discard_temp(fd=fd, temp_path=temp_path)
+        raise
+    os.close(fd)
+    try:
+        os.replace(temp_path, path)
+    except:
+        _remove(path=temp_path)
+        raise
+    if sync:
+        _fsync_directory(path=os.path.dirname(os.path.abspath(path)))
+
+
+def discard_temp(fd: int, temp_path: str) -> None:
+    try:
+        os.close(fd)
+    finally:
+        _remove(path=temp_path)
+
+
+class GroupCommitWriter:
+
+    # Wie atomic_write, aber die Schreiber warten gemeinsam auf einen Commit-Thread. Der schreibt alle
+    # bis dahin eingereihten Dateien mit einem syncfs() je Dateisystem (sonst fsync je Datei) auf die
+    # Platte, benennt sie um und macht die Verzeichnisse mit einem zweiten Sync dauerhaft.
+
+    _stop_marker: object = object()
+    _syncfs: callable = None
+
+    def __init__(self, max_batch: int = 256) -> None:
+        if max_batch < 1:
+            raise Exception('max_batch must be at least 1')
+        self._max_batch: int = max_batch
+        self._queue: Queue = Queue()
+        self._worker: Thread | None = None
+        self._running: bool = False
+        self._running_lock: Lock = Lock()
+        self._commits: int = 0
+
+    def start(self) -> None:
+        with self._running_lock:
+            if self._running:
+                return None
+            self._running: bool = True
+        self._worker: Thread = Thread(target=self._run, daemon=True, name='group_commit_writer')
+        self._worker.start()
+
+    def stop(self, timeout: float | None = 5.0) -> None:
+        with self._running_lock:
+            if not self._running:
+                return None
+            self._running: bool = False
+            self._queue.put(GroupCommitWriter._stop_marker)
+        if self._worker is not current_thread():
+            self._worker.join(timeout=timeout)
+
+    def write(self, path: str, data: bytes | bytearray | memoryview, timeout: float | None = None) -> int:
+        # blockiert, bis die Datei dauerhaft geschrieben ist
+        return self.submit(path=path, data=data).result(timeout=timeout)
+
+    def submit(self, path: str, data: bytes | bytearray | memoryview) -> Future:
+        if not self.isRunning:
+            raise Exception('GroupCommitWriter is not running')
+        future: Future = Future()
+        fd, temp_path = open_temp(path=path)
+        try:
+            written: int = _write_all(fd=fd, data=data)
+        except:
+            discard_temp(fd=fd, temp_path=temp_path)
+            raise
+        # stop() könnte während des Schreibens gelaufen sein, nach der Stop-Markierung
+        # würde der Eintrag nie mehr abgeholt. Prüfung und put deshalb unter demselben Lock wie in stop()
+        with self._running_lock:
+            if self._running:
+                self._queue.put((fd, temp_path, path, written, future))
+                return future
+        discard_temp(fd=fd, temp_path=temp_path)
+        raise Exception('GroupCommitWriter is not running')
+
+    def _run(self) -> None:
+        stopping: bool = False
+        while not stopping:
+            item: tuple | object = self._queue.get()
+            if item is GroupCommitWriter._stop_marker:
+                break
+            batch: list = [item]
+            while len(batch) < self._max_batch:
+                try:
+                    item: tuple | object = self._queue.get_nowait()
+                except Empty:
+                    break
+                if item is GroupCommitWriter._stop_marker:
+                    stopping: bool = True
+                    break
+                batch.append(item)
+            self._commit(batch=batch)
+        # was nach dem Stop noch eingereiht wurde, wird trotzdem geschrieben
+        remaining: list = list()
+        while True:
+            try:
+                item: tuple | object = self._queue.get_nowait()
+            except Empty:
+                break
+            if item is not GroupCommitWriter._stop_marker:
+                remaining.append(item)
+        if remaining:
+            self._commit(batch=remaining)
+
+    def _commit(self, batch: list) -> None:
+        try:
+            GroupCommitWriter._sync_files(fds=[item[0] for item in batch])
+        except Exception as e:
+            for fd, temp_path, path, written, future in batch:
+                os.close(fd)
+                _remove(path=temp_path)
+                future.set_exception(e)
+            return None
+        replaced: list = list()
+        for fd, temp_path, path, written, future in batch:
+            os.close(fd)
+            try:
+                os.replace(temp_path, path)
+                replaced.append((path, written, future))
+            except Exception as e:
+                _remove(path=temp_path)
+                future.set_exception(e)
+        try:
+            GroupCommitWriter._sync_directories(paths=[item[0] for item in replaced])
+        except Exception as e:
+            for path, written, future in replaced:
+                future.set_exception(e)
+            return None
+        self._commits += 1
+        for path, written, future in replaced:
+            future.set_result(written)
+
+    @staticmethod
+    def _sync_files(fds: list) -> None:
+        syncfs: callable | None = GroupCommitWriter._load_syncfs()
+        if syncfs == None:
+            for fd in fds:
+                os.fsync(fd)
+            return None
+        devices: dict = dict()
+        for fd in fds:
+            devices.setdefault(os.fstat(fd).st_dev, fd)
+        for fd in devices.values():
+            if syncfs(fd) != 0:
+                number: int = ctypes.get_errno()
+                raise OSError(number, os.strerror(number))
+
+    @staticmethod
+    def _sync_directories(paths: list) -> None:
+        directories: set = {os.path.dirname(os.path.abspath(path)) for path in paths}
+        syncfs: callable | None = GroupCommitWriter._load_syncfs()
+        if syncfs == None:
+            for directory in directories:
+                _fsync_directory(path=directory)
+            return None
+        devices: dict = dict()
+        for directory in directories:
+            devices.setdefault(os.stat(directory).st_dev, directory)
+        for directory in devices.values():
+            fd: int = os.open(directory, os.O_RDONLY)
+            try:
+                if syncfs(fd) != 0:
+                    number: int = ctypes.get_errno()
+                    raise OSError(number, os.strerror(number))
+            finally:
+                os.close(fd)
+
+    @staticmethod
+    def _load_syncfs() -> callable:
+        # syncfs() gibt es nur unter Linux, sonst False als Marker für fsync je Datei
+        if GroupCommitWriter._syncfs == None:
+            syncfs: callable | bool = False
+            if sys.platform.startswith('linux'):
+                try:
+                    libc: ctypes.CDLL = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+                    syncfs = libc.syncfs
+                    syncfs.argtypes = [ctypes.c_int]
+                except (OSError, AttributeError):
+                    syncfs = False
+            GroupCommitWriter._syncfs = syncfs
+        return GroupCommitWriter._syncfs or None
+
+    @property
+    def isRunning(self) -> bool:
+        with self._running_lock:
+            result: bool = self._running
+        return result
+
+    @property
+    def commitCount(self) -> int:
+        return self._commits
+
+
+def _write_all(fd: int, data: bytes | bytearray | memoryview) -> int:
+    view: memoryview = memoryview(data).cast('B')
+    written: int = 0
+    while written < len(view):
+        written += os.write(fd, view[written:])
+    return written
+
+
+def _fsync_directory(path: str) -> None:
+    # Verzeichnisse lassen sich unter Windows nicht öffnen, dort ist das Umbenennen ohnehin journaled
+    if os.name != 'posix':
+        return None
+    fd: int = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _remove(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,180 @@
+from aocc.src.fileobject import FileObject
+from threading import Lock
+from hashlib import blake2b
+from typing import NamedTuple, Iterator
+import sqlite3
+import os
+
+
+class IndexEntry(NamedTuple):
+    path: str
+    size: int
+    mtime_ns: int
+    inode: int
+    mode: int
+    hash: bytes | None
+
+
+class FileIndex:
+
+    # Persistenter Index Pfad -> (size, mtime_ns, inode, mode, hash) in einer SQLite-Datenbank.
+    # Die Tabelle ist nach dem Pfad geclustert (WITHOUT ROWID), Präfixabfragen laufen als Bereichsscan
+    # über den Primärschlüssel und werden seitenweise gelesen, damit auch große Indizes wenig Speicher brauchen.
+
+    _hash_size: int = 32
+    _fetch_size: int = 1024
+
+    def __init__(self, path: str) -> None:
+        self._path: str = path
+        directory: str = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory, exist_ok=True)
+        self._connection: sqlite3.Connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock: Lock = Lock()
+        with self._lock:
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS files ('
+                'path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, '
+                'inode INTEGER NOT NULL, mode INTEGER NOT NULL, hash BLOB'
+                ') WITHOUT ROWID'
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self) -> 'FileIndex':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def get(self, path: str) -> IndexEntry | None:
+        with self._lock:
+            row: tuple | None = self._connection.execute('SELECT path, size, mtime_ns, inode, mode, hash FROM files WHERE path = ?', (path,)).fetchone()
+        return IndexEntry(*row) if row != None else None
+
+    def upsert_many(self, entries: list) -> int:
+        with self._lock:
+            self._connection.execute('BEGIN')
+            try:
+                self._connection.executemany('INSERT OR REPLACE INTO files (path, size, mtime_ns, inode, mode, hash) VALUES (?, ?, ?, ?, ?, ?)', entries)
+                self._connection.execute('COMMIT')
+            except:
+                self._connection.execute('ROLLBACK')
+                raise
+        return len(entries)
+
+    def upsert(self, entry: IndexEntry) -> None:
+        self.upsert_many(entries=[entry])
+
+    def delete_many(self, paths: list) -> int:
+        with self._lock:
+            self._connection.execute('BEGIN')
+            try:
+                cursor: sqlite3.Cursor = self._connection.executemany('DELETE FROM files WHERE path = ?', ((path,) for path in paths))
+                self._connection.execute('COMMIT')
+            except:
+                self._connection.execute('ROLLBACK')
+                raise
+        return cursor.rowcount
+
+    def delete_prefix(self, prefix: str) -> int:
+        with self._lock:
+            cursor: sqlite3.Cursor = self._connection.execute('DELETE FROM files WHERE ' + FileIndex._prefix_condition(prefix=prefix), FileIndex._prefix_arguments(prefix=prefix))
+        return cursor.rowcount
+
+    def iter_prefix(self, prefix: str = '') -> Iterator[IndexEntry]:
+        # seitenweise über den Primärschlüssel, ohne einen Cursor über mehrere Aufrufe offen zu halten
+        last: str | None = None
+        while True:
+            condition: str = FileIndex._prefix_condition(prefix=prefix)
+            arguments: tuple = FileIndex._prefix_arguments(prefix=prefix)
+            if last != None:
+                # die untere Grenze ersetzen, sonst beginnt SQLite jede Seite wieder am Präfix
+                condition: str = 'path > ?' if prefix == '' else 'path > ? AND path < ?'
+                arguments: tuple = (last,) + arguments[1:]
+            with self._lock:
+                rows: list = self._connection.execute(
+                    f'SELECT path, size, mtime_ns, inode, mode, hash FROM files WHERE {condition} ORDER BY path LIMIT {self._fetch_size}',
+                    arguments
+                ).fetchall()
+            for row in rows:
+                yield IndexEntry(*row)
+            if len(rows) < self._fetch_size:
+                break
+            last: str = rows[-1][0]
+
+    def count(self, prefix: str = '') -> int:
+        with self._lock:
+            return self._connection.execute('SELECT COUNT(*) FROM files WHERE ' + FileIndex._prefix_condition(prefix=prefix), FileIndex._prefix_arguments(prefix=prefix)).fetchone()[0]
+
+    def is_unchanged(self, path: str, stat: os.stat_result | None = None) -> bool:
+        entry: IndexEntry | None = self.get(path=path)
+        if entry == None:
+            return False
+        if stat == None:
+            try:
+                stat: os.stat_result = os.stat(path)
+            except FileNotFoundError:
+                return False
+        return FileIndex.matches(entry=entry, stat=stat)
+
+    def refresh_many(self, paths: list, with_hash: bool = True) -> list:
+        # liefert die aktuellen Einträge; unveränderte Dateien werden weder gelesen noch neu gehasht,
+        # verschwundene Dateien werden aus dem Index entfernt
+        result: list = list()
+        changed: list = list()
+        missing: list = list()
+        for path in paths:
+            try:
+                stat: os.stat_result = os.stat(path)
+            except FileNotFoundError:
+                missing.append(path)
+                continue
+            entry: IndexEntry | None = self.get(path=path)
+            if entry != None and FileIndex.matches(entry=entry, stat=stat) and (entry.hash != None or not with_hash):
+                result.append(entry)
+                continue
+            entry: IndexEntry = FileIndex.entry_from_stat(path=path, stat=stat, hash=FileIndex.hash_file(path=path) if with_hash else None)
+            changed.append(entry)
+            result.append(entry)
+        if changed:
+            self.upsert_many(entries=changed)
+        if missing:
+            self.delete_many(paths=missing)
+        return result
+
+    @staticmethod
+    def matches(entry: IndexEntry, stat: os.stat_result) -> bool:
+        return entry.size == stat.st_size and entry.mtime_ns == stat.st_mtime_ns and entry.inode == stat.st_ino and entry.mode == stat.st_mode
+
+    @staticmethod
+    def entry_from_stat(path: str, stat: os.stat_result, hash: bytes | None = None) -> IndexEntry:
+        return IndexEntry(path, stat.st_size, stat.st_mtime_ns, stat.st_ino, stat.st_mode, hash)
+
+    @staticmethod
+    def hash_file(path: str, chunk_size: int = 1 << 20) -> bytes:
+        hasher = blake2b(digest_size=FileIndex._hash_size)
+        for chunk in FileObject(path=path).iter_chunks(size=chunk_size):
+            hasher.update(chunk)
+        return hasher.digest()
+
+    @staticmethod
+    def _prefix_condition(prefix: str) -> str:
+        if prefix == '':
+            return '1'
+        return 'path >= ? AND path < ?'
+
+    @staticmethod
+    def _prefix_arguments(prefix: str) -> tuple:
+        # obere Grenze: letztes Zeichen des Präfix um eins erhöht, damit der Index als Bereich genutzt wird
+        if prefix == '':
+            return tuple()
+        return (prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1))
+
+    @property
+    def path(self) -> str:
+        return self._path
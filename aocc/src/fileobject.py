@@ -1,5 +1,7 @@
+from aocc.src.durablewrite import atomic_write
+from aocc.src.objectcodec import encode_object, decode_object, is_encoded
 import os
-import pickle
+import mmap
 
 class FileObject:
 
@@ -26,21 +28,58 @@ class FileObject:
                 return reader.read()
         return b''
     
-    def write_bytes(self, data: bytes) -> int:
-        with open(file=self._path, mode='wb') as writer:
-            return writer.write(data)
+    def read_range(self, offset: int, length: int) -> bytes:
+        if offset < 0 or length <= 0 or not (self.exists() and self.is_file()):
+            return b''
+        with open(file=self._path, mode='rb') as reader:
+            size: int = os.fstat(reader.fileno()).st_size
+            if offset >= size:
+                return b''
+            end: int = min(offset + length, size)
+            # mmap-Offsets müssen auf die Allocation-Granularity ausgerichtet sein
+            start: int = offset - offset % mmap.ALLOCATIONGRANULARITY
+            with mmap.mmap(reader.fileno(), length=end - start, offset=start, access=mmap.ACCESS_READ) as mapped:
+                return mapped[offset - start:end - start]
+
+    def iter_chunks(self, size: int):
+        if size <= 0:
+            raise ValueError('size must be greater than 0')
+        if not (self.exists() and self.is_file()):
+            return None
+        with open(file=self._path, mode='rb') as reader:
+            file_size: int = os.fstat(reader.fileno()).st_size
+            if file_size == 0:
+                return None
+            with mmap.mmap(reader.fileno(), length=0, access=mmap.ACCESS_READ) as mapped:
+                for offset in range(0, file_size, size):
+                    yield mapped[offset:offset + size]
+
+    def size(self) -> int:
+        if self.exists() and self.is_file():
+            return os.path.getsize(self._path)
+        return 0
+
+    def write_bytes(self, data: bytes, sync: bool = True) -> int:
+        return atomic_write(path=self._path, data=data, sync=sync)
         
-    def read_object(self) -> any:
+    def read_object(self, migrate: bool = True) -> any:
         data: bytes = self.read_bytes()
         if len(data) > 0:
             try:
-                return pickle.loads(data)
+                obj: any = decode_object(data=data, legacy=True)
             except:
                 return None
+            # alte pickle-Dateien einmalig im neuen Format zurückschreiben
+            if migrate and not is_encoded(data=data):
+                try:
+                    self.write_object(obj=obj)
+                except:
+                    pass
+            return obj
         return None
     
     def write_object(self, obj: any) -> bool:
-        data = pickle.dumps(obj)
+        data: bytes = encode_object(obj=obj)
         if len(data) == self.write_bytes(data=data):
             return True
         return False
@@ -1,15 +1,42 @@
 from aocc.src.service import Service, Connection, Package
+from aocc.src.packageexecutor import PackageExecutor
+from aocc.src.filestream import FileStreams, FileStream
+from aocc.src.sharedpayload import SharedBuffer, payload_data
+from aocc.src.fileobject import FileObject
+from aocc.src.durablewrite import GroupCommitWriter, open_temp, commit_temp, discard_temp
+from aocc.src.blocksignature import compute_signature, compute_delta, write_delta
+from concurrent.futures import ThreadPoolExecutor
 import os
 from time import sleep
 
 class FileService(Service):
 
-    def __init__(self, conn_in: Connection, conn_out: Connection):
-        super(FileService, self).__init__(name='FileService', conn_in=conn_in, conn_out=conn_out, request_callback=self._request_callback, response_callback=self._response_callback, config_required=False)
+    _stream_chunk_size: int = 1 << 20
+    _stream_max_chunk_size: int = 16 << 20
+    _stream_idle_timeout: float = 300.0
+    _stat_workers: int = 8
+    _stat_chunk_size: int = 1000
+
+    def __init__(self, conn_in: Connection, conn_out: Connection, block: bool = True, connection_options: dict | None = None, io_workers: int = 8, io_queue_depth: int = 1024):
+        # eigener I/O-Pool: Operationen auf derselben Datei bzw. demselben Stream-Chunk laufen in Reihenfolge,
+        # unabhängige Pfade und Chunks parallel
+        executor: PackageExecutor = PackageExecutor(max_workers=io_workers, queue_depth=io_queue_depth, order_key=FileService._io_key)
+        super(FileService, self).__init__(name='FileService', conn_in=conn_in, conn_out=conn_out, request_callback=self._request_callback, response_callback=self._response_callback, config_required=False, executor=executor, connection_options=connection_options)
+        self._streams: FileStreams = FileStreams(default_chunk_size=self._stream_chunk_size, max_chunk_size=self._stream_max_chunk_size, idle_timeout=self._stream_idle_timeout)
+        # gleichzeitige put_file_data-Requests teilen sich einen Sync
+        self._writer: GroupCommitWriter = GroupCommitWriter()
+        self._writer.start()
+        self._stat_pool: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=self._stat_workers, thread_name_prefix='file_stat')
         self.start()
-        while self.isRunning:
+        while block and self.isRunning:
             sleep(0.5)
 
+    def stop(self) -> None:
+        super(FileService, self).stop()
+        self._streams.close_all()
+        self._writer.stop()
+        self._stat_pool.shutdown(wait=False, cancel_futures=True)
+
     def _request_callback(self, package: Package) -> None:
         match package.Subject:
             case 'file_exists':
@@ -62,7 +89,8 @@ class FileService(Service):
                                 'exists': True,
                                 'length': len(file_data),
                                 'data': file_data
-                            }
+                            },
+                            priority=Package.PRIORITY_BULK
                         )
                     else:
                         response: Package = self._create_wrong_payload_response(package=package)
@@ -70,6 +98,36 @@ class FileService(Service):
                     response: Package = self._create_no_payload_response(package=package)
                 self.send_package(package=response)    
             
+            case 'get_file_range':
+                if package.Payload != None:
+
+                    try:
+                        file: str = package.Payload['file']
+                        offset: int = int(package.Payload['offset'])
+                        length: int = int(package.Payload['length'])
+                    except:
+                        file: None = None
+
+                    if file != None:
+                        try:
+                            file_object: FileObject = FileObject(path=file)
+                            file_data: bytes = file_object.read_range(offset=offset, length=length)
+                            response: Package = self._create_response(package=package, payload={
+                                'file': file,
+                                'exists': file_object.exists(),
+                                'size': file_object.size(),
+                                'offset': offset,
+                                'length': len(file_data),
+                                'data': file_data
+                            }, priority=Package.PRIORITY_BULK)
+                        except Exception as e:
+                            response: Package = self._create_error_response(package=package, error=e)
+                    else:
+                        response: Package = self._create_wrong_payload_response(package=package)
+                else:
+                    response: Package = self._create_no_payload_response(package=package)
+                self.send_package(package=response)
+
             case 'put_file_data':
                 if package.Payload != None:
                     
@@ -81,7 +139,9 @@ class FileService(Service):
                         file_data: None = None
 
                     if file != None and file_data != None:
-                        result: bool = len(file_data) == self._write_file_bytes(file=file, data=file_data)
+                        result: bool = len(file_data) == self._write_file_bytes(file=file, data=payload_data(file_data))
+                        if isinstance(file_data, SharedBuffer):
+                            file_data.release()
                         response: Package = Package(
                             sender=self._name,
                             recipent=package.Sender,
@@ -102,6 +162,236 @@ class FileService(Service):
                     response: Package = self._create_no_payload_response(package=package)
                 self.send_package(package=response)
 
+            case 'open_read_stream' | 'open_write_stream':
+                if package.Payload != None:
+
+                    try:
+                        file: str = package.Payload['file']
+                        chunk_size: int | None = package.Payload.get('chunk_size')
+                    except:
+                        file: None = None
+
+                    if file != None:
+                        mode: str = 'read' if package.Subject == 'open_read_stream' else 'write'
+                        try:
+                            stream: FileStream = self._streams.open(path=file, mode=mode, chunk_size=chunk_size)
+                            response: Package = self._create_response(package=package, payload={
+                                'file': file,
+                                'stream': stream.id,
+                                'size': stream.size,
+                                'chunk_size': stream.chunkSize
+                            })
+                        except Exception as e:
+                            response: Package = self._create_error_response(package=package, error=e)
+                    else:
+                        response: Package = self._create_wrong_payload_response(package=package)
+                else:
+                    response: Package = self._create_no_payload_response(package=package)
+                self.send_package(package=response)
+
+            case 'read_chunk':
+                if package.Payload != None:
+
+                    try:
+                        stream_id: str = package.Payload['stream']
+                        offset: int = int(package.Payload['offset'])
+                        length: int = int(package.Payload['length'])
+                    except:
+                        stream_id: None = None
+
+                    if stream_id != None:
+                        try:
+                            stream: FileStream = self._streams.get(stream_id=stream_id)
+                            data: bytes = stream.read_chunk(offset=offset, length=length)
+                            response: Package = self._create_response(package=package, payload={
+                                'stream': stream_id,
+                                'offset': offset,
+                                'length': len(data),
+                                'data': data,
+                                'eof': offset + len(data) >= stream.size
+                            }, priority=Package.PRIORITY_BULK)
+                        except Exception as e:
+                            response: Package = self._create_error_response(package=package, error=e)
+                    else:
+                        response: Package = self._create_wrong_payload_response(package=package)
+                else:
+                    response: Package = self._create_no_payload_response(package=package)
+                self.send_package(package=response)
+
+            case 'write_chunk':
+                if package.Payload != None:
+
+                    try:
+                        stream_id: str = package.Payload['stream']
+                        offset: int = int(package.Payload['offset'])
+                        data: bytes = package.Payload['data']
+                    except:
+                        stream_id: None = None
+
+                    if stream_id != None and isinstance(data, (bytes, SharedBuffer)):
+                        try:
+                            written: int = self._streams.get(stream_id=stream_id).write_chunk(offset=offset, data=payload_data(data))
+                            response: Package = self._create_response(package=package, payload={
+                                'stream': stream_id,
+                                'offset': offset,
+                                'written': written
+                            })
+                        except Exception as e:
+                            response: Package = self._create_error_response(package=package, error=e)
+                        finally:
+                            if isinstance(data, SharedBuffer):
+                                data.release()
+                    else:
+                        response: Package = self._create_wrong_payload_response(package=package)
+                else:
+                    response: Package = self._create_no_payload_response(package=package)
+                self.send_package(package=response)
+
+            case 'close_stream':
+                if package.Payload != None:
+
+                    try:
+                        stream_id: str = package.Payload['stream']
+                        discard: bool = bool(package.Payload.get('discard', False))
+                    except:
+                        stream_id: None = None
+
+                    if stream_id != None:
+                        try:
+                            stream: FileStream = self._streams.close(stream_id=stream_id, discard=discard)
+                            response: Package = self._create_response(package=package, payload={
+                                'stream': stream_id,
+                                'file': stream.path,
+                                'written': stream.written,
+                                'closed': True
+                            })
+                        except Exception as e:
+                            response: Package = self._create_error_response(package=package, error=e)
+                    else:
+                        response: Package = self._create_wrong_payload_response(package=package)
+                else:
+                    response: Package = self._create_no_payload_response(package=package)
+                self.send_package(package=response)
+
+            case 'get_file_signature':
+                if package.Payload != None:
+
+                    try:
+                        file: str = package.Payload['file']
+                        block_size: int | None = package.Payload.get('block_size')
+                    except:
+                        file: None = None
+
+                    if file != None:
+                        try:
+                            response: Package = self._create_response(package=package, payload={
+                                'file': file,
+                                'signature': compute_signature(path=file, block_size=block_size)
+                            })
+                        except Exception as e:
+                            response: Package = self._create_error_response(package=package, error=e)
+                    else:
+                        response: Package = self._create_wrong_payload_response(package=package)
+                else:
+                    response: Package = self._create_no_payload_response(package=package)
+                self.send_package(package=response)
+
+            case 'get_file_delta':
+                if package.Payload != None:
+
+                    try:
+                        file: str = package.Payload['file']
+                        signature: dict = package.Payload['signature']
+                    except:
+                        file: None = None
+
+                    if file != None:
+                        try:
+                            response: Package = self._create_response(package=package, payload={
+                                'file': file,
+                                'delta': compute_delta(path=file, signature=signature)
+                            }, priority=Package.PRIORITY_BULK)
+                        except Exception as e:
+                            response: Package = self._create_error_response(package=package, error=e)
+                    else:
+                        response: Package = self._create_wrong_payload_response(package=package)
+                else:
+                    response: Package = self._create_no_payload_response(package=package)
+                self.send_package(package=response)
+
+            case 'apply_file_delta':
+                if package.Payload != None:
+
+                    try:
+                        file: str = package.Payload['file']
+                        delta: dict = package.Payload['delta']
+                    except:
+                        file: None = None
+
+                    if file != None:
+                        # erst vollständig in eine temporäre Datei schreiben, die Basis wird beim Anwenden noch gelesen
+                        try:
+                            written: int = FileService._apply_file_delta(file=file, delta=delta)
+                            response: Package = self._create_response(package=package, payload={
+                                'file': file,
+                                'size': written,
+                                'written': True
+                            })
+                        except Exception as e:
+                            response: Package = self._create_error_response(package=package, error=e)
+                    else:
+                        response: Package = self._create_wrong_payload_response(package=package)
+                else:
+                    response: Package = self._create_no_payload_response(package=package)
+                self.send_package(package=response)
+
+            case 'stat_many' | 'exists_many':
+                if package.Payload != None:
+
+                    try:
+                        files: list = list(package.Payload['files'])
+                        chunk_size: int = int(package.Payload.get('chunk_size') or self._stat_chunk_size)
+                        stream: bool = bool(package.Payload.get('stream', False))
+                    except:
+                        files: None = None
+
+                    if files != None and chunk_size > 0:
+                        function: callable = FileService._stat_files if package.Subject == 'stat_many' else FileService._files_exist
+                        # die Chunks laufen parallel, kommen aber in der Reihenfolge der Liste zurück
+                        chunks = self._stat_pool.map(function, [files[start:start + chunk_size] for start in range(0, len(files), chunk_size)])
+                        if stream:
+                            # Chunks und Antwort gehen in derselben Lane raus, der Empfänger verarbeitet sie aber nicht
+                            # unbedingt in dieser Reihenfolge. Die Antwort nennt deshalb die Anzahl der Chunks,
+                            # der Client wartet auf alle, die Position steht in 'offset'
+                            count: int = 0
+                            for index, results in enumerate(chunks):
+                                self.send_package(package=self._create_chunk_package(package=package, offset=index * chunk_size, results=results))
+                                count += 1
+                            response: Package = self._create_response(package=package, payload={
+                                'count': len(files),
+                                'chunks': count
+                            })
+                        else:
+                            results: list = list()
+                            for chunk in chunks:
+                                results.extend(chunk)
+                            response: Package = self._create_response(package=package, payload={
+                                'count': len(files),
+                                'results': results
+                            })
+                    else:
+                        response: Package = self._create_wrong_payload_response(package=package)
+                else:
+                    response: Package = self._create_no_payload_response(package=package)
+                self.send_package(package=response)
+
+            case 'get_io_stats':
+                response: Package = self._create_response(package=package, payload={
+                    'workers': self._executor.maxWorkers,
+                    'timings': self._executor.timings
+                })
+                self.send_package(package=response)
+
             case _:
                 pass
 
@@ -126,38 +416,67 @@ class FileService(Service):
     def _write_file_bytes(self, file: str, data: bytes) -> int:
         if not os.path.isdir(file) and self._is_file(file=file):
             try:
-                with open(file=file, mode='wb') as output_file:
-                    result: int = output_file.write(data) 
+                result: int = self._writer.write(path=file, data=data)
             except:
                 result: int = int(0)
             finally:
                 return result
         return int(0)
 
-    def _create_no_payload_response(self, package: Package) -> Package:
+    @staticmethod
+    def _io_key(package: Package) -> tuple | None:
+        if isinstance(package.Payload, dict):
+            file: any = package.Payload.get('file')
+            if isinstance(file, str):
+                return ('file', os.path.abspath(file))
+            stream: any = package.Payload.get('stream')
+            if isinstance(stream, str):
+                # Chunks eines Streams laufen parallel, nur Chunks am selben Offset und open/close nacheinander
+                offset: any = package.Payload.get('offset')
+                if package.Subject in ('read_chunk', 'write_chunk') and isinstance(offset, int):
+                    return ('stream', stream, offset)
+                return ('stream', stream)
+        return None
+
+    @staticmethod
+    def _stat_files(files: list) -> list:
+        # je Pfad [size, mtime_ns, mode, inode] oder None, wenn es den Pfad nicht gibt
+        results: list = list()
+        for file in files:
+            try:
+                stat: os.stat_result = os.stat(file)
+                results.append([stat.st_size, stat.st_mtime_ns, stat.st_mode, stat.st_ino])
+            except (OSError, ValueError):
+                results.append(None)
+        return results
+
+    @staticmethod
+    def _files_exist(files: list) -> list:
+        return [os.path.exists(file) for file in files]
+
+    @staticmethod
+    def _apply_file_delta(file: str, delta: dict) -> int:
+        # temporäre Datei mit den Rechten von file, danach fsync und atomares Umbenennen
+        fd, temp_path = open_temp(path=file)
+        try:
+            with open(file=fd, mode='wb', closefd=False) as writer:
+                written: int = write_delta(basis=file, delta=delta, writer=writer)
+        except:
+            discard_temp(fd=fd, temp_path=temp_path)
+            raise
+        commit_temp(fd=fd, temp_path=temp_path, path=file)
+        return written
+
+    def _create_chunk_package(self, package: Package, offset: int, results: list) -> Package:
         return Package(
             sender=self._name,
             recipent=package.Sender,
-            package_type='response',
-            package_id=package.PackageID,
-            subject=package.Subject,
-            code=501,
+            package_type='request',
+            package_id=self._generate_request_id(),
+            subject=f'{package.Subject}_chunk',
             payload={
-                'data': 'No Payload was set for Package',
-                'package': package
+                'request': package.PackageID,
+                'offset': offset,
+                'results': results
             }
         )
-    
-    def _create_wrong_payload_response(self, package: Package) -> Package:
-        return Package(
-            sender=self._name,
-            recipent=package.Sender,
-            package_type='response',
-            package_id=package.PackageID,
-            subject=package.Subject,
-            code=502,
-            payload={
-                'data': 'Wrong Payload',
-                'package': package
-            }
-        )
\ No newline at end of file
@@ -0,0 +1,285 @@
+from aocc.src.package import Package
+from aocc.src.service import Service
+from aocc.src.sharedpayload import SharedBuffer, payload_data
+from aocc.src.durablewrite import open_temp, commit_temp, discard_temp
+from concurrent.futures import Future
+from collections import deque
+from threading import Thread, Lock, Event, Condition
+from time import monotonic
+import uuid
+import os
+
+# positionsgenaues Lesen und Schreiben ohne gemeinsamen Dateizeiger, unter Windows nicht vorhanden
+_positional_io: bool = hasattr(os, 'pread') and hasattr(os, 'pwrite')
+
+class FileStream:
+
+    # Ein Schreib-Stream schreibt in eine temporäre Datei neben dem Ziel. Erst close() ersetzt das Ziel
+    # (atomar und mit fsync), close(discard=True) entfernt nur die temporäre Datei.
+    # Chunks an verschiedenen Offsets können gleichzeitig gelesen bzw. geschrieben werden (pread/pwrite,
+    # ohne diese unter einem Lock).
+
+    def __init__(self, path: str, mode: str, chunk_size: int) -> None:
+        if mode not in ['read', 'write']:
+            raise Exception('only <read> or <write> as mode are allowed')
+        self._id: str = uuid.uuid4().hex
+        self._path: str = path
+        self._mode: str = mode
+        self._chunk_size: int = chunk_size
+        self._fd: int | None = None
+        self._temp_path: str | None = None
+        if mode == 'read':
+            self._file = open(file=path, mode='rb')
+        else:
+            self._fd, self._temp_path = open_temp(path=path)
+            # der Deskriptor gehört commit_temp/discard_temp, nicht dem Dateiobjekt
+            self._file = open(file=self._fd, mode='wb', closefd=False)
+        self._lock: Lock = Lock()
+        self._condition: Condition = Condition()
+        self._active: int = 0
+        self._written: int = 0
+        self._closed: bool = False
+        self._last_used: float = monotonic()
+
+    def read_chunk(self, offset: int, length: int) -> bytes:
+        if self._mode != 'read':
+            raise Exception(f'Stream {self._id} is not readable')
+        if length <= 0:
+            raise Exception('length must be greater than 0')
+        self._begin()
+        try:
+            if _positional_io:
+                return os.pread(self._file.fileno(), min(length, self._chunk_size), offset)
+            with self._lock:
+                self._file.seek(offset)
+                return self._file.read(min(length, self._chunk_size))
+        finally:
+            self._end()
+
+    def write_chunk(self, offset: int, data: bytes) -> int:
+        if self._mode != 'write':
+            raise Exception(f'Stream {self._id} is not writable')
+        if len(data) > self._chunk_size:
+            raise Exception(f'Chunk is larger than {self._chunk_size} bytes')
+        self._begin()
+        try:
+            if _positional_io:
+                view: memoryview = memoryview(data).cast('B')
+                written: int = 0
+                while written < len(view):
+                    written += os.pwrite(self._fd, view[written:], offset + written)
+            else:
+                with self._lock:
+                    self._file.seek(offset)
+                    written: int = self._file.write(data)
+            with self._lock:
+                self._written += written
+        finally:
+            self._end()
+        return written
+
+    def close(self, discard: bool = False) -> None:
+        # wartet auf laufende read_chunk/write_chunk, spätere schlagen fehl
+        with self._condition:
+            if self._closed:
+                return None
+            self._closed: bool = True
+            self._condition.wait_for(lambda: not self._active)
+        if self._mode == 'read':
+            self._file.close()
+            return None
+        try:
+            self._file.close()
+        except:
+            discard_temp(fd=self._fd, temp_path=self._temp_path)
+            raise
+        if discard:
+            discard_temp(fd=self._fd, temp_path=self._temp_path)
+        else:
+            commit_temp(fd=self._fd, temp_path=self._temp_path, path=self._path)
+
+    def _begin(self) -> None:
+        with self._condition:
+            if self._closed:
+                raise Exception(f'Stream {self._id} is closed')
+            self._active += 1
+            self._last_used: float = monotonic()
+
+    def _end(self) -> None:
+        with self._condition:
+            self._active -= 1
+            if not self._active:
+                self._condition.notify_all()
+
+    @property
+    def id(self) -> str:
+        return self._id
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def mode(self) -> str:
+        return self._mode
+
+    @property
+    def size(self) -> int:
+        return os.fstat(self._file.fileno()).st_size
+
+    @property
+    def chunkSize(self) -> int:
+        return self._chunk_size
+
+    @property
+    def written(self) -> int:
+        return self._written
+
+    @property
+    def idleTime(self) -> float:
+        return monotonic() - self._last_used
+
+
+class FileStreams:
+
+    # Streams, die länger als idle_timeout Sekunden nicht benutzt wurden (z.B. weil der Client abgestürzt ist),
+    # werden von einem Hintergrund-Thread geschlossen, Schreib-Streams dabei verworfen. None schaltet das ab.
+
+    def __init__(self, default_chunk_size: int = 1 << 20, max_chunk_size: int = 16 << 20, idle_timeout: float | None = 300.0) -> None:
+        if idle_timeout != None and idle_timeout <= 0:
+            raise Exception('idle_timeout must be greater than 0')
+        self._default_chunk_size: int = default_chunk_size
+        self._max_chunk_size: int = max_chunk_size
+        self._idle_timeout: float | None = idle_timeout
+        self._streams: dict = dict()
+        self._streams_lock: Lock = Lock()
+        self._sweeper: Thread | None = None
+        self._sweeper_stop: Event = Event()
+
+    def open(self, path: str, mode: str, chunk_size: int | None = None) -> FileStream:
+        if chunk_size == None or chunk_size <= 0:
+            chunk_size: int = self._default_chunk_size
+        stream: FileStream = FileStream(path=path, mode=mode, chunk_size=min(chunk_size, self._max_chunk_size))
+        with self._streams_lock:
+            self._streams[stream.id] = stream
+            if self._idle_timeout != None and (self._sweeper == None or not self._sweeper.is_alive()):
+                self._sweeper_stop.clear()
+                self._sweeper: Thread = Thread(target=self._sweep, daemon=True)
+                self._sweeper.start()
+        return stream
+
+    def get(self, stream_id: str) -> FileStream:
+        with self._streams_lock:
+            stream: FileStream | None = self._streams.get(stream_id)
+        if stream == None:
+            raise Exception(f'Stream {stream_id} not found')
+        return stream
+
+    def close(self, stream_id: str, discard: bool = False) -> FileStream:
+        with self._streams_lock:
+            stream: FileStream | None = self._streams.pop(stream_id, None)
+        if stream == None:
+            raise Exception(f'Stream {stream_id} not found')
+        stream.close(discard=discard)
+        return stream
+
+    def close_all(self) -> None:
+        # offene Schreib-Streams wurden nie abgeschlossen und ersetzen das Ziel deshalb nicht
+        self._sweeper_stop.set()
+        with self._streams_lock:
+            streams: list = list(self._streams.values())
+            self._streams.clear()
+        for stream in streams:
+            stream.close(discard=True)
+
+    def expire_idle(self) -> int:
+        if self._idle_timeout == None:
+            return 0
+        with self._streams_lock:
+            expired: list = [stream for stream in self._streams.values() if stream.idleTime >= self._idle_timeout]
+            for stream in expired:
+                del self._streams[stream.id]
+        for stream in expired:
+            try:
+                stream.close(discard=True)
+            except:
+                pass
+        return len(expired)
+
+    def _sweep(self) -> None:
+        interval: float = min(self._idle_timeout / 2, 30.0)
+        while not self._sweeper_stop.wait(interval):
+            self.expire_idle()
+
+    @property
+    def count(self) -> int:
+        return len(self._streams)
+
+
+def download_file(service: Service, source: str, target: str, chunk_size: int | None = None, window: int = 4, timeout: float | None = 30.0, recipient: str = 'FileService') -> int:
+    # Es sind höchstens <window> Chunks gleichzeitig unterwegs, der Speicherbedarf bleibt damit bei chunk_size * window
+    opened: Package = _expect_ok(service.request(recipient=recipient, subject='open_read_stream', payload={'file': source, 'chunk_size': chunk_size}, timeout=timeout).result())
+    stream: str = opened.Payload['stream']
+    size: int = opened.Payload['size']
+    step: int = opened.Payload['chunk_size']
+    in_flight: deque = deque()
+    received: int = 0
+    try:
+        with open(file=target, mode='wb') as writer:
+            for offset in range(0, size, step):
+                in_flight.append(service.request(recipient=recipient, subject='read_chunk', payload={'stream': stream, 'offset': offset, 'length': step}, timeout=timeout))
+                if len(in_flight) >= window:
+                    received += _write_received_chunk(writer=writer, future=in_flight.popleft())
+            while in_flight:
+                received += _write_received_chunk(writer=writer, future=in_flight.popleft())
+    finally:
+        for future in in_flight:
+            future.cancel()
+        service.request(recipient=recipient, subject='close_stream', payload={'stream': stream}, timeout=timeout)
+    return received
+
+
+def upload_file(service: Service, source: str, target: str, chunk_size: int | None = None, window: int = 4, timeout: float | None = 30.0, recipient: str = 'FileService') -> int:
+    opened: Package = _expect_ok(service.request(recipient=recipient, subject='open_write_stream', payload={'file': target, 'chunk_size': chunk_size}, timeout=timeout).result())
+    stream: str = opened.Payload['stream']
+    step: int = opened.Payload['chunk_size']
+    in_flight: deque = deque()
+    closed: bool = False
+    try:
+        with open(file=source, mode='rb') as reader:
+            offset: int = 0
+            while True:
+                data: bytes = reader.read(step)
+                if not data:
+                    break
+                in_flight.append(service.request(recipient=recipient, subject='write_chunk', payload={'stream': stream, 'offset': offset, 'data': data}, timeout=timeout))
+                offset += len(data)
+                if len(in_flight) >= window:
+                    _expect_ok(in_flight.popleft().result())
+        while in_flight:
+            _expect_ok(in_flight.popleft().result())
+        result: Package = _expect_ok(service.request(recipient=recipient, subject='close_stream', payload={'stream': stream}, timeout=timeout).result())
+        closed: bool = True
+        return result.Payload['written']
+    finally:
+        for future in in_flight:
+            future.cancel()
+        if not closed:
+            service.request(recipient=recipient, subject='close_stream', payload={'stream': stream, 'discard': True}, timeout=timeout)
+
+
+def _write_received_chunk(writer: any, future: Future) -> int:
+    package: Package = _expect_ok(future.result())
+    data: bytes | SharedBuffer = package.Payload['data']
+    writer.seek(package.Payload['offset'])
+    try:
+        return writer.write(payload_data(data))
+    finally:
+        if isinstance(data, SharedBuffer):
+            data.release()
+
+
+def _expect_ok(package: Package) -> Package:
+    if package.StatusCode != 200:
+        raise Exception(f'{package.Subject} failed with code {package.StatusCode}: {package.Payload}')
+    return package
@@ -0,0 +1,38 @@
+from aocc.src.package import Package
+from threading import Condition
+from collections import deque
+from queue import Empty
+
+class LaneQueue:
+
+    def __init__(self, lanes: int = Package.PRIORITY_BULK + 1) -> None:
+        self._lanes: list = [deque() for _ in range(lanes)]
+        self._length: int = 0
+        self._condition: Condition = Condition()
+
+    def put(self, item: any, priority: int = Package.PRIORITY_NORMAL) -> None:
+        lane: int = min(max(priority, 0), len(self._lanes) - 1)
+        with self._condition:
+            self._lanes[lane].append(item)
+            self._length += 1
+            self._condition.notify()
+
+    def get(self, block: bool = True, timeout: float | None = None) -> any:
+        with self._condition:
+            if block:
+                if not self._condition.wait_for(lambda: self._length, timeout=timeout):
+                    raise Empty()
+            elif not self._length:
+                raise Empty()
+            for lane in self._lanes:
+                if lane:
+                    self._length -= 1
+                    return lane.popleft()
+
+    def empty(self) -> bool:
+        with self._condition:
+            return not self._length
+
+    def qsize(self) -> int:
+        with self._condition:
+            return self._length
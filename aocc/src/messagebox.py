@@ -1,80 +1,114 @@
 from aocc.src.package import Package
-from threading import Lock
+from threading import Condition
+from collections import deque
+import asyncio
 
 class MessageBox:
 
     def __init__(self, name: str, direction: str) -> None:
         self._name: str = name
         self._direction: str = direction
-        self._data: list = list()
-        self._data_lock: Lock = Lock()
+        # eine Warteschlange je Prioritätsklasse, entnommen wird immer aus der wichtigsten
+        self._data: list = [deque() for _ in range(Package.PRIORITY_BULK + 1)]
+        self._length: int = 0
+        self._data_condition: Condition = Condition()
+        self._async_waiters: deque = deque()
 
     def add_package(self, package: Package) -> bool:
-        try:
-            with self._data_lock:
-                self._data.append(package)
-            result: bool = True
-        except:
-            result: bool = False
-        finally:
-            return result
+        with self._data_condition:
+            self._lane(package=package).append(package)
+            self._length += 1
+            self._data_condition.notify()
+            self._wake_async_waiters()
+        return True
 
     def add_packages(self, packages: list) -> bool:
-        try:
-            with self._data_lock:
-                for package in packages:
-                    if isinstance(package, Package):
-                        self._data.append(package)
-            result: bool = True
-        except:
-            result: bool = False
-        finally:
-            return result
+        packages: list = [package for package in packages if isinstance(package, Package)]
+        with self._data_condition:
+            for package in packages:
+                self._lane(package=package).append(package)
+            self._length += len(packages)
+            self._data_condition.notify(len(packages))
+            self._wake_async_waiters()
+        return True
 
-    def get_package(self, block: bool = True) -> Package:
-        if block:
-            while True:
-                if not self.empty():
-                    with self._data_lock:
-                        package: Package = self._data.pop(0)
-                    break
-        else:
-            if not self.empty():
-                with self._data_lock:
-                        package: Package = self._data.pop(0)
-            else:
+    def get_package(self, block: bool = True, timeout: float | None = None) -> Package:
+        with self._data_condition:
+            if block:
+                if not self._wait_for_data(timeout=timeout):
+                    raise Exception('No Data in list Error')
+            elif not self._length:
                 raise Exception('No Data in list Error')
-        return package
+            return self._pop()
 
-    def get_all_packages(self) -> list:
-        error: bool = False
-        with self._data_lock:
+    async def get_package_async(self, timeout: float | None = None) -> Package:
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        deadline: float | None = None if timeout == None else loop.time() + timeout
+        while True:
+            with self._data_condition:
+                if self._length:
+                    return self._pop()
+                waiter: tuple = (loop, loop.create_future())
+                self._async_waiters.append(waiter)
+            remaining: float | None = None if deadline == None else deadline - loop.time()
             try:
-                result: list = self._data
-            except:
-                result: list = list()
-                error: bool = True
+                if remaining != None and remaining <= 0:
+                    raise asyncio.TimeoutError()
+                await asyncio.wait_for(waiter[1], timeout=remaining)
+            except asyncio.TimeoutError:
+                raise Exception('No Data in list Error')
             finally:
-                if not error:
-                    self._data.clear()
+                with self._data_condition:
+                    if waiter in self._async_waiters:
+                        self._async_waiters.remove(waiter)
+
+    def get_many(self, n: int, block: bool = True, timeout: float | None = None) -> list:
+        result: list = list()
+        with self._data_condition:
+            if block and not self._wait_for_data(timeout=timeout):
                 return result
+            while self._length and len(result) < n:
+                result.append(self._pop())
+        return result
+
+    def get_all_packages(self) -> list:
+        with self._data_condition:
+            result: list = [package for lane in self._data for package in lane]
+            for lane in self._data:
+                lane.clear()
+            self._length: int = 0
+        return result
+
+    def _lane(self, package: Package) -> deque:
+        return self._data[min(max(package.Priority, 0), len(self._data) - 1)]
+
+    def _pop(self) -> Package:
+        # muss mit gehaltenem self._data_condition und self._length > 0 aufgerufen werden
+        for lane in self._data:
+            if lane:
+                self._length -= 1
+                return lane.popleft()
+
+    def _wake_async_waiters(self) -> None:
+        # muss mit gehaltenem self._data_condition aufgerufen werden;
+        # geweckte Coroutinen konkurrieren danach regulär um die Pakete
+        while self._async_waiters:
+            loop, future = self._async_waiters.popleft()
+            loop.call_soon_threadsafe(MessageBox._resolve_waiter, future)
+
+    @staticmethod
+    def _resolve_waiter(future: asyncio.Future) -> None:
+        if not future.done():
+            future.set_result(None)
+
+    def _wait_for_data(self, timeout: float | None) -> bool:
+        # muss mit gehaltenem self._data_condition aufgerufen werden
+        return bool(self._data_condition.wait_for(lambda: self._length, timeout=timeout))
 
     def empty(self) -> bool:
-        try:
-            if self.length() > 0:
-                result: bool = False
-            elif self.length() == 0:
-                result: bool = True
-        except:
-            result: bool = False
-        finally:
-            return result
+        with self._data_condition:
+            return not self._length
 
     def length(self) -> int:
-        try:
-            with self._data_lock:
-                length: int = len(self._data)
-        except:
-            length: int = 0
-        finally:
-            return length
\ No newline at end of file
+        with self._data_condition:
+            return self._length
@@ -0,0 +1,262 @@
+from struct import Struct, error as StructError
+import pickle
+import codecs
+import io
+
+# Binärformat (Version 1) für die Bäume aus dict/list/tuple/str/int/float/bool/bytes/None,
+# die DottedStorage, Account und die Konfiguration halten:
+# magic | version, danach genau ein Wert. Jeder Wert beginnt mit einem Tag-Byte,
+# Längen und Anzahlen sind LEB128-Varints, ganze Zahlen außerhalb von int64 werden als
+# vorzeichenbehaftete Bytes gespeichert. Beim Lesen wird nur dieser Wertebereich erzeugt,
+# im Gegensatz zu pickle kann eine manipulierte Datei keinen Code ausführen.
+
+_magic: bytes = b'AOC'
+_version: int = 1
+_header: bytes = _magic + bytes((_version,))
+_max_depth: int = 128
+
+_tag_none: int = 0x00
+_tag_false: int = 0x01
+_tag_true: int = 0x02
+_tag_int8: int = 0x03
+_tag_int64: int = 0x04
+_tag_bigint: int = 0x05
+_tag_float: int = 0x06
+_tag_str: int = 0x07
+_tag_bytes: int = 0x08
+_tag_list: int = 0x09
+_tag_tuple: int = 0x0A
+_tag_dict: int = 0x0B
+# Schlüssel, die als str schon einmal in einem dict vorkamen, werden nur noch über ihre Nummer
+# referenziert. Das hält Listen gleichartiger dicts klein und spart beim Lesen das Dekodieren.
+_tag_key_ref: int = 0x0C
+
+_int8: Struct = Struct('!b')
+_int64: Struct = Struct('!q')
+_float: Struct = Struct('!d')
+
+
+def encode_object(obj: any) -> bytes:
+    out: bytearray = bytearray(_header)
+    _encode(obj, out, dict(), 0)
+    return bytes(out)
+
+
+def decode_object(data: bytes | bytearray | memoryview, legacy: bool = False) -> any:
+    # legacy=True liest zusätzlich alte pickle-Daten, aber nur mit den eingebauten Grundtypen
+    data: bytes = bytes(data)
+    if not is_encoded(data=data):
+        if legacy:
+            return _legacy_loads(data=data)
+        raise Exception('data is not encoded with the object codec')
+    if data[len(_magic)] != _version:
+        raise Exception(f'Unknown object codec version {data[len(_magic)]}')
+    try:
+        obj, offset = _decode(data, len(_header), list(), 0)
+    except (IndexError, StructError, UnicodeDecodeError) as e:
+        raise Exception(f'Object data is truncated or corrupt: {e}')
+    if offset != len(data):
+        raise Exception('Object data has a wrong length')
+    return obj
+
+
+def is_encoded(data: bytes | bytearray | memoryview) -> bool:
+    return len(data) >= len(_header) and bytes(data[:len(_magic)]) == _magic
+
+
+# _encode und _decode laufen für jeden Wert, deshalb positionelle Argumente und kurze Wege für die häufigen Typen
+
+def _encode(obj: any, out: bytearray, keys: dict, depth: int) -> None:
+    # exakte Typen zuerst, das ist der häufige Fall; bool vor int, weil bool eine Unterklasse ist
+    obj_type: type = type(obj)
+    if obj_type is str:
+        data: bytes = obj.encode('utf-8')
+        _write_length(out, _tag_str, len(data))
+        out += data
+    elif obj_type is dict:
+        if depth >= _max_depth:
+            raise Exception(f'Object is nested deeper than {_max_depth} levels')
+        _write_length(out, _tag_dict, len(obj))
+        for key, value in obj.items():
+            if type(key) is not str and isinstance(key, str):
+                # Unterklassen (z.B. StrEnum) als reinen str, sonst fehlt der Schlüssel in der Tabelle
+                # und alle späteren Referenzen zeigen beim Lesen auf den falschen Schlüssel
+                key: str = str.__str__(key)
+            if type(key) is str:
+                index: int | None = keys.get(key)
+                if index != None:
+                    _write_length(out, _tag_key_ref, index)
+                else:
+                    keys[key] = len(keys)
+                    data: bytes = key.encode('utf-8')
+                    _write_length(out, _tag_str, len(data))
+                    out += data
+            else:
+                _encode(key, out, keys, depth + 1)
+            _encode(value, out, keys, depth + 1)
+    elif obj is None:
+        out.append(_tag_none)
+    elif obj_type is bool:
+        out.append(_tag_true if obj else _tag_false)
+    elif obj_type is int:
+        _encode_int(obj, out)
+    elif obj_type is float:
+        out.append(_tag_float)
+        out += _float.pack(obj)
+    elif obj_type is list or obj_type is tuple:
+        if depth >= _max_depth:
+            raise Exception(f'Object is nested deeper than {_max_depth} levels')
+        _write_length(out, _tag_list if obj_type is list else _tag_tuple, len(obj))
+        for item in obj:
+            _encode(item, out, keys, depth + 1)
+    elif isinstance(obj, (bytes, bytearray, memoryview)):
+        data: bytes = bytes(obj)
+        _write_length(out, _tag_bytes, len(data))
+        out += data
+    # Unterklassen (z.B. IntEnum, OrderedDict) werden als ihr Grundtyp gespeichert
+    elif isinstance(obj, bool):
+        out.append(_tag_true if obj else _tag_false)
+    elif isinstance(obj, int):
+        _encode_int(int(obj), out)
+    elif isinstance(obj, float):
+        _encode(float(obj), out, keys, depth)
+    elif isinstance(obj, str):
+        # str.__str__ liefert den Wert, str() bei (str, Enum) dagegen 'Klasse.NAME'
+        _encode(str.__str__(obj), out, keys, depth)
+    elif isinstance(obj, dict):
+        _encode(dict(obj), out, keys, depth)
+    elif isinstance(obj, list):
+        _encode(list(obj), out, keys, depth)
+    elif isinstance(obj, tuple):
+        _encode(tuple(obj), out, keys, depth)
+    else:
+        raise Exception(f'Object of type {obj_type.__name__} can\'t be encoded')
+
+
+def _encode_int(value: int, out: bytearray) -> None:
+    if -128 <= value <= 127:
+        out.append(_tag_int8)
+        out += _int8.pack(value)
+    elif -(1 << 63) <= value < (1 << 63):
+        out.append(_tag_int64)
+        out += _int64.pack(value)
+    else:
+        data: bytes = value.to_bytes((value.bit_length() + 8) // 8, 'big', signed=True)
+        _write_length(out, _tag_bigint, len(data))
+        out += data
+
+
+def _write_length(out: bytearray, tag: int, value: int) -> None:
+    # Tag gefolgt von einem LEB128-Varint
+    out.append(tag)
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _decode(data: bytes, offset: int, keys: list, depth: int) -> tuple:
+    tag: int = data[offset]
+    offset += 1
+    if tag == _tag_str:
+        length: int = data[offset]
+        offset += 1
+        if length >= 0x80:
+            length, offset = _read_varint(data, offset - 1)
+        end: int = offset + length
+        if end > len(data):
+            raise Exception('Object data is truncated')
+        return data[offset:end].decode('utf-8'), end
+    if tag == _tag_dict:
+        if depth >= _max_depth:
+            raise Exception(f'Object is nested deeper than {_max_depth} levels')
+        count, offset = _read_varint(data, offset)
+        result: dict = dict()
+        for _ in range(count):
+            key_tag: int = data[offset]
+            if key_tag == _tag_key_ref:
+                index, offset = _read_varint(data, offset + 1)
+                try:
+                    key: any = keys[index]
+                except IndexError:
+                    raise Exception(f'Unknown key reference {index}')
+            elif key_tag == _tag_str:
+                key, offset = _decode(data, offset, keys, depth + 1)
+                keys.append(key)
+            else:
+                key, offset = _decode(data, offset, keys, depth + 1)
+            value, offset = _decode(data, offset, keys, depth + 1)
+            try:
+                result[key] = value
+            except TypeError:
+                raise Exception(f'Unhashable dict key of type {type(key).__name__}')
+        return result, offset
+    if tag == _tag_int8:
+        return _int8.unpack_from(data, offset)[0], offset + 1
+    if tag == _tag_float:
+        return _float.unpack_from(data, offset)[0], offset + 8
+    if tag == _tag_none:
+        return None, offset
+    if tag == _tag_true:
+        return True, offset
+    if tag == _tag_false:
+        return False, offset
+    if tag == _tag_list or tag == _tag_tuple:
+        if depth >= _max_depth:
+            raise Exception(f'Object is nested deeper than {_max_depth} levels')
+        count, offset = _read_varint(data, offset)
+        # jedes Element braucht mindestens ein Byte, sonst könnte count beliebig Speicher anfordern
+        if offset + count > len(data):
+            raise Exception('Object data is truncated')
+        items: list = list()
+        for _ in range(count):
+            item, offset = _decode(data, offset, keys, depth + 1)
+            items.append(item)
+        return (items if tag == _tag_list else tuple(items)), offset
+    if tag == _tag_int64:
+        return _int64.unpack_from(data, offset)[0], offset + 8
+    if tag == _tag_bytes or tag == _tag_bigint:
+        length, offset = _read_varint(data, offset)
+        end: int = offset + length
+        if end > len(data):
+            raise Exception('Object data is truncated')
+        if tag == _tag_bytes:
+            return data[offset:end], end
+        return int.from_bytes(data[offset:end], 'big', signed=True), end
+    raise Exception(f'Unknown object codec tag {tag}')
+
+
+def _read_varint(data: bytes, offset: int) -> tuple:
+    value: int = 0
+    shift: int = 0
+    while True:
+        byte: int = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+        if shift > 63:
+            raise Exception('Varint is too long')
+
+
+class _LegacyUnpickler(pickle.Unpickler):
+
+    # Alte Dateien wurden mit pickle geschrieben. Für die Migration werden nur Daten aus den
+    # eingebauten Grundtypen akzeptiert, jede Klasse oder Funktion im Stream wird abgelehnt.
+    # _codecs.encode braucht pickle bis Protokoll 2 für bytes.
+
+    _allowed: dict = {
+        ('_codecs', 'encode'): codecs.encode,
+        ('builtins', 'bytearray'): bytearray,
+    }
+
+    def find_class(self, module: str, name: str) -> any:
+        try:
+            return _LegacyUnpickler._allowed[(module, name)]
+        except KeyError:
+            raise pickle.UnpicklingError(f'{module}.{name} is not allowed in legacy data')
+
+
+def _legacy_loads(data: bytes) -> any:
+    return _LegacyUnpickler(io.BytesIO(data)).load()
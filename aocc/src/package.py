@@ -1,12 +1,42 @@
 from time import time
+from struct import Struct, error as StructError
+import pickle
 
 class Package:
 
-    def __init__(self, sender: str, recipent: str, package_type: str, package_id: str, subject: str, code: int = 0, payload: any = None):
+    __slots__ = ('_created', '_sender', '_receipent', '_package_type', '_package_id', '_subject', '_code', '_payload', '_priority')
+
+    # Prioritätsklassen, kleinere Werte werden zuerst zugestellt
+    PRIORITY_CONTROL: int = 0
+    PRIORITY_NORMAL: int = 1
+    PRIORITY_BULK: int = 2
+    _control_subjects: tuple = ('stop', 'get_config')
+
+    # Wire-Format (Version 2):
+    # magic | version | type | payload_format | priority | code | created | len(id) | len(sender) | len(receipent) | len(subject) | len(payload)
+    # danach folgen die UTF-8 Strings in dieser Reihenfolge und zuletzt der Payload.
+    # Version 1 ist identisch, nur ohne priority.
+    _wire_magic: bytes = b'AP'
+    _wire_version: int = 2
+    _wire_headers: dict = {
+        1: Struct('!2sBBBidHHHHI'),
+        2: Struct('!2sBBBBidHHHHI'),
+    }
+    _wire_header: Struct = _wire_headers[_wire_version]
+    _package_types: tuple = ('request', 'response')
+    _payload_none: int = 0
+    _payload_bytes: int = 1
+    _payload_pickle: int = 2
+    # Batch-Frame: magic | version | Anzahl, danach je Paket Länge + Paketdaten
+    _batch_magic: bytes = b'AB'
+    _batch_header: Struct = Struct('!2sBI')
+    _batch_length: Struct = Struct('!I')
+
+    def __init__(self, sender: str, recipent: str, package_type: str, package_id: str, subject: str, code: int = 0, payload: any = None, priority: int | None = None):
         self._created: float = time()
         self._sender: str = sender
         self._receipent: str = recipent
-        if package_type in ['request', 'response']:
+        if package_type in Package._package_types:
             self._package_type: str = package_type
         else:
             raise Exception('only <request> or <response> as package_type are allowed')
@@ -14,59 +44,178 @@ class Package:
         self._subject: str = subject
         self._code: int = code
         self._payload: any = payload
+        self._priority: int = priority if priority != None else Package._default_priority(subject=subject)
+
+    @staticmethod
+    def _default_priority(subject: str) -> int:
+        if subject in Package._control_subjects:
+            return Package.PRIORITY_CONTROL
+        return Package.PRIORITY_NORMAL
+
+    def with_payload(self, payload: any) -> 'Package':
+        package: Package = Package.__new__(Package)
+        for slot in Package.__slots__:
+            setattr(package, slot, getattr(self, slot))
+        package._payload = payload
+        return package
+
+    def to_bytes(self) -> bytes:
+        if self._payload is None:
+            payload_format: int = Package._payload_none
+            payload: bytes = b''
+        elif isinstance(self._payload, (bytes, bytearray, memoryview)):
+            payload_format: int = Package._payload_bytes
+            payload: bytes = bytes(self._payload)
+        else:
+            payload_format: int = Package._payload_pickle
+            payload: bytes = pickle.dumps(self._payload, protocol=pickle.HIGHEST_PROTOCOL)
+        package_id: bytes = self._package_id.encode('utf-8')
+        sender: bytes = self._sender.encode('utf-8')
+        receipent: bytes = self._receipent.encode('utf-8')
+        subject: bytes = self._subject.encode('utf-8')
+        try:
+            header: bytes = Package._wire_header.pack(
+                Package._wire_magic,
+                Package._wire_version,
+                Package._package_types.index(self._package_type),
+                payload_format,
+                self._priority,
+                self._code,
+                self._created,
+                len(package_id),
+                len(sender),
+                len(receipent),
+                len(subject),
+                len(payload)
+            )
+        except StructError as e:
+            raise Exception(f'Package can\'t be encoded: {e}')
+        return b''.join((header, package_id, sender, receipent, subject, payload))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'Package':
+        view: memoryview = memoryview(data)
+        offset, package_type, payload_format, priority, code, created, id_length, sender_length, receipent_length, subject_length, payload_length = Package._unpack_header(view=view)
+        package: Package = cls.__new__(cls)
+        package._created = created
+        package._code = code
+        package._package_type = Package._package_types[package_type]
+        package._package_id = str(view[offset:offset + id_length], 'utf-8')
+        offset += id_length
+        package._sender = str(view[offset:offset + sender_length], 'utf-8')
+        offset += sender_length
+        package._receipent = str(view[offset:offset + receipent_length], 'utf-8')
+        offset += receipent_length
+        package._subject = str(view[offset:offset + subject_length], 'utf-8')
+        offset += subject_length
+        package._priority = priority if priority != None else Package._default_priority(subject=package._subject)
+        if offset + payload_length != len(view):
+            raise Exception('Package data has a wrong length')
+        payload: memoryview = view[offset:]
+        if payload_format == Package._payload_none:
+            package._payload = None
+        elif payload_format == Package._payload_bytes:
+            package._payload = bytes(payload)
+        elif payload_format == Package._payload_pickle:
+            package._payload = pickle.loads(payload)
+        else:
+            raise Exception(f'Unknown payload format {payload_format}')
+        return package
+
+    @staticmethod
+    def peek_receipent(data: bytes) -> str:
+        view: memoryview = memoryview(data)
+        header: tuple = Package._unpack_header(view=view)
+        offset: int = header[0] + header[6] + header[7]
+        return str(view[offset:offset + header[8]], 'utf-8')
+
+    @staticmethod
+    def pack_batch(frames: list) -> bytes:
+        parts: list = [Package._batch_header.pack(Package._batch_magic, Package._wire_version, len(frames))]
+        for frame in frames:
+            parts.append(Package._batch_length.pack(len(frame)))
+            parts.append(frame)
+        return b''.join(parts)
+
+    @staticmethod
+    def split_frame(data: bytes) -> list:
+        if data[:2] != Package._batch_magic:
+            return [data]
+        view: memoryview = memoryview(data)
+        try:
+            magic, version, count = Package._batch_header.unpack_from(view)
+        except StructError:
+            raise Exception('Batch data is too short')
+        if version not in Package._wire_headers:
+            raise Exception(f'Unsupported batch version {version}')
+        offset: int = Package._batch_header.size
+        frames: list = list()
+        for _ in range(count):
+            try:
+                length: int = Package._batch_length.unpack_from(view, offset)[0]
+            except StructError:
+                raise Exception('Batch data is too short')
+            offset += Package._batch_length.size
+            if offset + length > len(view):
+                raise Exception('Batch data is too short')
+            frames.append(view[offset:offset + length])
+            offset += length
+        if offset != len(view):
+            raise Exception('Batch data has a wrong length')
+        return frames
+
+    @staticmethod
+    def _unpack_header(view: memoryview) -> tuple:
+        # liefert (Header-Länge, type, payload_format, priority, code, created, len(id), len(sender), len(receipent), len(subject), len(payload));
+        # priority ist None bei Version 1
+        if bytes(view[:2]) != Package._wire_magic:
+            raise Exception('Data is not a Package')
+        version: int = view[2] if len(view) > 2 else 0
+        wire_header: Struct | None = Package._wire_headers.get(version)
+        if wire_header == None:
+            raise Exception(f'Unsupported Package version {version}')
+        try:
+            header: tuple = wire_header.unpack_from(view)
+        except StructError:
+            raise Exception('Package data is too short')
+        if version == 1:
+            header: tuple = header[:4] + (None,) + header[4:]
+        if header[2] >= len(Package._package_types):
+            raise Exception(f'Unknown package_type {header[2]}')
+        return (wire_header.size,) + header[2:]
 
     @property
     def Created(self) -> float:
-        try:
-            return self._created
-        except:
-            return float(0.0)
+        return self._created
 
     @property
     def Sender(self) -> str:
-        try:
-            return self._sender
-        except:
-            return str()
-        
+        return self._sender
+
     @property
     def Receipent(self) -> str:
-        try:
-            return self._receipent
-        except:
-            return str()
-        
+        return self._receipent
+
     @property
     def PackageType(self) -> str:
-        try:
-            return self._package_type
-        except:
-            return str()
-        
+        return self._package_type
+
     @property
     def PackageID(self) -> str:
-        try:
-            return self._package_id
-        except:
-            return str()
+        return self._package_id
 
     @property
     def Subject(self) -> str:
-        try:
-            return self._subject
-        except:
-            return str()
-        
+        return self._subject
+
     @property
     def StatusCode(self) -> int:
-        try:
-            return self._code
-        except:
-            return int(0)
+        return self._code
 
     @property
     def Payload(self) -> any:
-        try:
-            return self._payload
-        except:
-            return None
\ No newline at end of file
+        return self._payload
+
+    @property
+    def Priority(self) -> int:
+        return self._priority
@@ -0,0 +1,169 @@
+from aocc.src.package import Package
+from threading import Thread, Lock, BoundedSemaphore, current_thread
+from time import perf_counter
+from aocc.src.lanequeue import LaneQueue
+from collections import deque
+import traceback
+
+class PackageExecutor:
+
+    _stop_marker: object = object()
+
+    def __init__(self, max_workers: int = 8, queue_depth: int = 1024, subject_limits: dict | None = None, ordered_senders: bool | list = False, order_key: callable = None) -> None:
+        if max_workers < 1 or queue_depth < 1:
+            raise Exception('max_workers and queue_depth must be at least 1')
+        self._max_workers: int = max_workers
+        self._subject_limits: dict = dict(subject_limits) if subject_limits != None else dict()
+        self._ordered_senders: bool | list = ordered_senders
+        # order_key(package) liefert einen Schlüssel, Pakete mit gleichem Schlüssel laufen nacheinander;
+        # None heißt ungeordnet. Ohne order_key wird nach ordered_senders geordnet.
+        self._order_key: callable = order_key
+
+        # zählt angenommene, aber noch nicht abgeschlossene Pakete;
+        # Steuerpakete sind davon ausgenommen, damit z.B. ein stop nie blockiert
+        self._capacity: BoundedSemaphore = BoundedSemaphore(queue_depth)
+        self._run_queue: LaneQueue = LaneQueue()
+        self._workers: list = list()
+
+        self._state_lock: Lock = Lock()
+        self._subject_active: dict = dict()
+        self._subject_pending: dict = dict()
+        self._key_busy: set = set()
+        self._key_pending: dict = dict()
+        self._timings: dict = dict()
+        self._timings_lock: Lock = Lock()
+
+        self._is_running: bool = False
+        self._is_running_lock: Lock = Lock()
+
+    def start(self) -> None:
+        with self._is_running_lock:
+            if self._is_running:
+                return None
+            self._is_running: bool = True
+        self._workers: list = [Thread(target=self._work, daemon=True, name=f'package_worker_{i}') for i in range(self._max_workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def shutdown(self, wait: bool = True, timeout: float | None = 1.0) -> None:
+        with self._is_running_lock:
+            if not self._is_running:
+                return None
+            self._is_running: bool = False
+        for _ in self._workers:
+            self._run_queue.put(PackageExecutor._stop_marker, priority=Package.PRIORITY_CONTROL)
+        if wait:
+            for worker in self._workers:
+                if worker is not current_thread():
+                    worker.join(timeout=timeout)
+        self._workers: list = list()
+
+    def submit(self, package: Package, handler: callable, block: bool = True, timeout: float | None = None) -> bool:
+        if not self.isRunning:
+            return False
+        limited: bool = package.Priority != Package.PRIORITY_CONTROL
+        if limited and not self._capacity.acquire(blocking=block, timeout=timeout if block else None):
+            return False
+        key: any = self._ordering_key(package=package)
+        with self._state_lock:
+            self._schedule_ordered(task=(package, handler, limited, key))
+        return True
+
+    def _schedule_ordered(self, task: tuple) -> None:
+        # muss mit gehaltenem self._state_lock aufgerufen werden
+        key: any = task[3]
+        if key != None:
+            if key in self._key_busy:
+                self._key_pending.setdefault(key, deque()).append(task)
+                return None
+            self._key_busy.add(key)
+        self._schedule_subject(task=task)
+
+    def _schedule_subject(self, task: tuple) -> None:
+        # muss mit gehaltenem self._state_lock aufgerufen werden
+        subject: str = task[0].Subject
+        limit: int | None = self._subject_limits.get(subject)
+        if limit != None:
+            active: int = self._subject_active.get(subject, 0)
+            if active >= limit:
+                self._subject_pending.setdefault(subject, deque()).append(task)
+                return None
+            self._subject_active[subject] = active + 1
+        self._enqueue(task=task)
+
+    def _enqueue(self, task: tuple) -> None:
+        self._run_queue.put(task, priority=task[0].Priority)
+
+    def _finish(self, package: Package, limited: bool, key: any) -> None:
+        with self._state_lock:
+            subject: str = package.Subject
+            if subject in self._subject_active:
+                self._subject_active[subject] -= 1
+                pending: deque | None = self._subject_pending.get(subject)
+                if pending:
+                    self._subject_active[subject] += 1
+                    self._enqueue(task=pending.popleft())
+                    if not pending:
+                        del self._subject_pending[subject]
+                elif self._subject_active[subject] == 0:
+                    del self._subject_active[subject]
+            if key in self._key_busy:
+                pending: deque | None = self._key_pending.get(key)
+                if pending:
+                    next_task: tuple = pending.popleft()
+                    if not pending:
+                        del self._key_pending[key]
+                    self._schedule_subject(task=next_task)
+                else:
+                    self._key_busy.discard(key)
+        if limited:
+            self._capacity.release()
+
+    def _work(self) -> None:
+        while True:
+            task: tuple | object = self._run_queue.get()
+            if task is PackageExecutor._stop_marker:
+                break
+            package, handler, limited, key = task
+            started: float = perf_counter()
+            try:
+                handler(package)
+            except Exception:
+                traceback.print_exc()
+            finally:
+                self._record_timing(subject=package.Subject, duration=perf_counter() - started)
+                self._finish(package=package, limited=limited, key=key)
+
+    def _record_timing(self, subject: str, duration: float) -> None:
+        with self._timings_lock:
+            timing: list | None = self._timings.get(subject)
+            if timing == None:
+                self._timings[subject] = [1, duration, duration]
+            else:
+                timing[0] += 1
+                timing[1] += duration
+                timing[2] = max(timing[2], duration)
+
+    def _ordering_key(self, package: Package) -> any:
+        if self._order_key != None:
+            return self._order_key(package)
+        sender: str = package.Sender
+        if isinstance(self._ordered_senders, bool):
+            return sender if self._ordered_senders else None
+        return sender if sender in self._ordered_senders else None
+
+    @property
+    def maxWorkers(self) -> int:
+        return self._max_workers
+
+    @property
+    def timings(self) -> dict:
+        # je Subject: Anzahl, Gesamtdauer, mittlere und längste Dauer in Sekunden
+        with self._timings_lock:
+            return {subject: {'count': count, 'total': total, 'mean': total / count, 'max': maximum} for subject, (count, total, maximum) in self._timings.items()}
+
+    @property
+    def isRunning(self) -> bool:
+        with self._is_running_lock:
+            result: bool = self._is_running
+        return result
@@ -0,0 +1,78 @@
+from aocc.src.package import Package
+from concurrent.futures import Future
+from threading import Thread, Condition
+from time import monotonic
+import heapq
+
+class RequestTracker:
+
+    def __init__(self) -> None:
+        self._pending: dict = dict()
+        self._deadlines: list = list()
+        self._condition: Condition = Condition()
+        self._expiry_thread: Thread | None = None
+
+    def register(self, package_id: str, timeout: float | None = None) -> Future:
+        future: Future = Future()
+        with self._condition:
+            if package_id in self._pending:
+                raise Exception(f'Request {package_id} is already pending')
+            self._pending[package_id] = future
+            if timeout != None:
+                heapq.heappush(self._deadlines, (monotonic() + timeout, package_id))
+                self._ensure_expiry_thread()
+                self._condition.notify()
+        future.add_done_callback(lambda done: self._forget(package_id=package_id, future=done))
+        return future
+
+    def resolve(self, package: Package) -> bool:
+        with self._condition:
+            future: Future | None = self._pending.pop(package.PackageID, None)
+        if future == None:
+            return False
+        # Future kann zwischenzeitlich abgebrochen worden sein
+        if future.set_running_or_notify_cancel():
+            future.set_result(package)
+        return True
+
+    def cancel_all(self) -> None:
+        with self._condition:
+            futures: list = list(self._pending.values())
+            self._pending.clear()
+            self._deadlines.clear()
+        for future in futures:
+            future.cancel()
+
+    def _forget(self, package_id: str, future: Future) -> None:
+        with self._condition:
+            if self._pending.get(package_id) is future:
+                del self._pending[package_id]
+
+    def _ensure_expiry_thread(self) -> None:
+        # muss mit gehaltenem self._condition aufgerufen werden
+        if self._expiry_thread == None or not self._expiry_thread.is_alive():
+            self._expiry_thread: Thread = Thread(target=self._expire, daemon=True, name='request_expiry')
+            self._expiry_thread.start()
+
+    def _expire(self) -> None:
+        while True:
+            with self._condition:
+                while True:
+                    if not self._deadlines:
+                        # ohne offene Deadlines endet der Thread und wird bei Bedarf neu gestartet
+                        self._expiry_thread: None = None
+                        return None
+                    deadline, package_id = self._deadlines[0]
+                    remaining: float = deadline - monotonic()
+                    if remaining <= 0:
+                        heapq.heappop(self._deadlines)
+                        future: Future | None = self._pending.pop(package_id, None)
+                        break
+                    self._condition.wait(timeout=remaining)
+            if future != None and future.set_running_or_notify_cancel():
+                future.set_exception(TimeoutError(f'Request {package_id} timed out'))
+
+    @property
+    def pendingCount(self) -> int:
+        with self._condition:
+            return len(self._pending)
@@ -2,22 +2,34 @@ from multiprocessing.connection import Connection
 from aocc.src.connectionhandler import ConnectionHandler
 from aocc.src.dottedstorage import DottedStorage
 from aocc.src.cryptoobject import CryptoObject
+from aocc.src.packageexecutor import PackageExecutor
+from aocc.src.requesttracker import RequestTracker
+from concurrent.futures import Future
+import asyncio
 from queue import Queue, Empty
-from threading import Thread, Lock
+from threading import Lock
 from aocc.src.package import Package
-from time import sleep
+import logging
+
+_logger: logging.Logger = logging.getLogger(__name__)
 
 class Service:
 
-    def __init__(self, name: str, conn_in: Connection, conn_out: Connection, request_callback: callable = None, response_callback: callable = None, config_required: bool = True) -> None:
+    _config_service: str = 'ConfigService'
+    _config_timeout: float = 10.0
+
+    def __init__(self, name: str, conn_in: Connection, conn_out: Connection, request_callback: callable = None, response_callback: callable = None, config_required: bool = True, executor: PackageExecutor | None = None, connection_options: dict | None = None, config_watch: list | None = None, config_callback: callable = None) -> None:
         self._name: str = name
-        self._connection_handler: ConnectionHandler = ConnectionHandler(conn_in=conn_in, conn_out=conn_out, package_callback=self._package_callback)
+        self._executor: PackageExecutor = executor if executor != None else PackageExecutor()
+        self._connection_handler: ConnectionHandler = ConnectionHandler(conn_in=conn_in, conn_out=conn_out, package_callback=self._package_callback, **(connection_options or dict()))
         self._request_callback: callable = request_callback
         self._response_callback: callable = response_callback
         self._config_required: bool = config_required
+        # Präfixe der Konfiguration, deren Änderungen der ConfigService schickt, config_callback(diff) wird danach aufgerufen
+        self._config_watch: list | None = config_watch
+        self._config_callback: callable = config_callback
 
-        self._responses: dict = dict()
-        self._responses_dict_lock: Lock = Lock()
+        self._requests: RequestTracker = RequestTracker()
 
         self._config: DottedStorage = DottedStorage()
         self._is_running: bool = False
@@ -27,24 +39,66 @@ class Service:
         if not self.isRunning:
             with self._is_running_lock:
                 self._is_running: bool = True
+            self._executor.start()
             self._connection_handler.start()
             if self._config_required:
                 self._request_config()
                 if not self._config.loaded:
                     raise Exception('Loading config went wrong')
+                if self._config_watch and not self._watch_config():
+                    raise Exception('Watching config went wrong')
 
     def stop(self) -> None:
         if self.isRunning:
             with self._is_running_lock:
                 self._is_running: bool = False
             self._connection_handler.stop()
+            self._executor.shutdown()
+            self._requests.cancel_all()
 
     def send_package(self, package: Package) -> None:
         self._connection_handler.send_package(package=package)
 
+    def send_packages(self, packages: list) -> None:
+        self._connection_handler.send_packages(packages=packages)
+
+    def request(self, recipient: str, subject: str, payload: any = None, timeout: float | None = None) -> Future:
+        request_id: str = self._generate_request_id()
+        future: Future = self._requests.register(package_id=request_id, timeout=timeout)
+        request: Package = Package(
+            sender=self._name,
+            recipent=recipient,
+            package_type='request',
+            package_id=request_id,
+            subject=subject,
+            payload=payload
+            )
+        self.send_package(package=request)
+        return future
+
+    async def request_async(self, recipient: str, subject: str, payload: any = None, timeout: float | None = None) -> Package:
+        return await asyncio.wrap_future(self.request(recipient=recipient, subject=subject, payload=payload, timeout=timeout))
+
     def _package_callback(self, package: Package) -> None:
-        thread: Thread = Thread(target=self._handle_package, args=(package,), daemon=True)
-        thread.start()
+        if package.Subject == 'config_changed' and package.PackageType == 'request' and package.Sender == self._config_service and package.Receipent == self._name:
+            # direkt im Empfangsthread anwenden, der Executor könnte zwei Änderungen vertauschen.
+            # Eine fehlerhafte Änderung darf den Empfangsthread nicht beenden
+            try:
+                self._config.apply_diff(diff=package.Payload)
+            except Exception as e:
+                _logger.error('dropping config_changed from %s that can\'t be applied: %s', package.Sender, e)
+                return None
+            if self._config_callback != None:
+                self._executor.submit(package=package, handler=self._handle_config_changed)
+            return None
+        # Antworten auf eigene Requests ebenfalls im Empfangsthread auflösen: wartet ein Handler auf
+        # request().result(), ist vielleicht kein Worker des Executors mehr frei
+        if package.PackageType == 'response' and package.Receipent == self._name and self._requests.resolve(package=package):
+            return None
+        self._executor.submit(package=package, handler=self._handle_package)
+
+    def _handle_config_changed(self, package: Package) -> None:
+        self._config_callback(package.Payload)
 
     def _handle_package(self, package: Package) -> None:
         if package.Receipent == self._name:
@@ -53,15 +107,11 @@ class Service:
                     if self._request_callback != None:
                         self._request_callback(package)
                 case 'response':
-                    match package.Subject:
-                        case 'stop':
-                            self.stop()
-                        case 'get_config':
-                            with self._responses_dict_lock:
-                                self._responses[package.PackageID] = package
+                    if package.Subject == 'stop':
+                        self.stop()
                     if self._response_callback != None:
                         if package.Subject not in ['dummy', 'get_config']:
-                            self._response_callback(package)        
+                            self._response_callback(package)
                 case _:
                     response: Package = Package(
                         sender=self._name,
@@ -86,28 +136,79 @@ class Service:
             self.send_package(package=response)
 
     def _request_config(self) -> None:
-        request_id: str = self._generate_request_id()
-        request: Package = Package(
-                    sender=self._name,
-                    recipent='ConfigService',
-                    package_type='request',
-                    package_id=request_id,
-                    subject='get_config'
-                )
-        self._connection_handler.send_package(package=request)
-        while True:
-            with self._responses_dict_lock:
-                if request_id in self._responses:
-                    package: Package = self._responses[request_id]
-                    del self._responses[request_id]
-                    break
-            sleep(0.2)
+        future: Future = self.request(recipient=self._config_service, subject='get_config', timeout=self._config_timeout)
+        try:
+            package: Package = future.result()
+        except Exception:
+            return None
         if package.StatusCode == 200:
             self._config.load_data(package.Payload)
 
+    def _watch_config(self) -> bool:
+        # die aktuellen Werte kommen als erstes config_changed vor der Antwort
+        future: Future = self.request(recipient=self._config_service, subject='watch_config', payload={'prefixes': list(self._config_watch)}, timeout=self._config_timeout)
+        try:
+            package: Package = future.result()
+        except Exception:
+            return False
+        return package.StatusCode == 200
+
     def _generate_request_id(self) -> str:
         return CryptoObject.genereate_random_secret()
 
+    def _create_response(self, package: Package, payload: any, priority: int | None = None) -> Package:
+        return Package(
+            sender=self._name,
+            recipent=package.Sender,
+            package_type='response',
+            package_id=package.PackageID,
+            subject=package.Subject,
+            code=200,
+            payload=payload,
+            priority=priority
+        )
+
+    def _create_error_response(self, package: Package, error: Exception) -> Package:
+        return Package(
+            sender=self._name,
+            recipent=package.Sender,
+            package_type='response',
+            package_id=package.PackageID,
+            subject=package.Subject,
+            code=500,
+            payload={
+                'data': str(error)
+            }
+        )
+
+    def _create_no_payload_response(self, package: Package) -> Package:
+        return Package(
+            sender=self._name,
+            recipent=package.Sender,
+            package_type='response',
+            package_id=package.PackageID,
+            subject=package.Subject,
+            code=501,
+            payload={
+                'data': 'No Payload was set for Package',
+                'package': package
+            }
+        )
+
+    def _create_wrong_payload_response(self, package: Package) -> Package:
+        return Package(
+            sender=self._name,
+            recipent=package.Sender,
+            package_type='response',
+            package_id=package.PackageID,
+            subject=package.Subject,
+            code=502,
+            payload={
+                'data': 'Wrong Payload',
+                'package': package
+            }
+        )
+
     @property
     def isRunning(self) -> bool:
         with self._is_running_lock:
@@ -0,0 +1,122 @@
+from aocc.src.service import Service, Connection, Package
+from aocc.src.dottedstorage import DottedStorage
+from threading import Lock
+from copy import deepcopy
+from time import sleep
+
+class ConfigService(Service):
+
+    # Besitzer der Konfiguration. get_config liefert den ganzen Baum, watch_config abonniert Präfixe:
+    # der Absender bekommt zuerst alle aktuellen Werte und danach bei jeder Änderung nur die geänderten
+    # Schlüssel als config_changed-Request mit {'changed': {key: value}, 'removed': [key]}.
+
+    def __init__(self, conn_in: Connection, conn_out: Connection, config_file: str | None = None, data: dict | None = None, block: bool = True, connection_options: dict | None = None):
+        super(ConfigService, self).__init__(name=Service._config_service, conn_in=conn_in, conn_out=conn_out, request_callback=self._request_callback, response_callback=self._response_callback, config_required=False, connection_options=connection_options)
+        if config_file != None:
+            self._config: DottedStorage = DottedStorage(file=config_file)
+        else:
+            self._config: DottedStorage = DottedStorage(data=data if data != None else dict())
+        # Änderungen und neue Abonnements laufen nacheinander, damit die ersten Werte eines Abonnenten
+        # nie nach einer späteren Änderung bei ihm ankommen
+        self._lock: Lock = Lock()
+        self._subscribers: dict = dict()
+        self.start()
+        while block and self.isRunning:
+            sleep(0.5)
+
+    def stop(self) -> None:
+        if self.isRunning:
+            super(ConfigService, self).stop()
+            self._config.close()
+
+    def _request_callback(self, package: Package) -> None:
+        match package.Subject:
+            case 'get_config':
+                with self._lock:
+                    data: dict = deepcopy(self._config.get_data())
+                self.send_package(package=self._create_response(package=package, payload=data))
+
+            case 'set_config':
+                if package.Payload != None:
+
+                    try:
+                        diff: dict = {
+                            'changed': dict(package.Payload.get('values', dict())),
+                            'removed': list(package.Payload.get('removed', list()))
+                        }
+                    except:
+                        diff: None = None
+
+                    if diff != None:
+                        try:
+                            with self._lock:
+                                self._config.apply_diff(diff=diff)
+                            response: Package = self._create_response(package=package, payload={'changed': len(diff['changed']), 'removed': len(diff['removed'])})
+                        except Exception as e:
+                            response: Package = self._create_error_response(package=package, error=e)
+                    else:
+                        response: Package = self._create_wrong_payload_response(package=package)
+                else:
+                    response: Package = self._create_no_payload_response(package=package)
+                self.send_package(package=response)
+
+            case 'watch_config':
+                if package.Payload != None:
+
+                    try:
+                        prefixes: list = list(package.Payload['prefixes'])
+                        if not all(isinstance(prefix, str) for prefix in prefixes):
+                            prefixes: None = None
+                    except:
+                        prefixes: None = None
+
+                    if prefixes != None:
+                        with self._lock:
+                            self._unsubscribe(name=package.Sender)
+                            self._subscribers[package.Sender] = self._config.watch(prefixes=prefixes, callback=lambda diff, name=package.Sender: self._push(name=name, diff=diff))
+                            current: dict = self._config.leaves(prefixes=prefixes)
+                            self._push(name=package.Sender, diff={'changed': current, 'removed': list()})
+                        response: Package = self._create_response(package=package, payload={'prefixes': prefixes, 'keys': len(current)})
+                    else:
+                        response: Package = self._create_wrong_payload_response(package=package)
+                else:
+                    response: Package = self._create_no_payload_response(package=package)
+                self.send_package(package=response)
+
+            case 'unwatch_config':
+                with self._lock:
+                    removed: bool = self._unsubscribe(name=package.Sender)
+                self.send_package(package=self._create_response(package=package, payload={'removed': removed}))
+
+            case _:
+                pass
+
+    def _response_callback(self, package: Package) -> None:
+        match package.Subject:
+            case 'unknown_receipent':
+                # der Abonnent ist nicht mehr am Router angemeldet
+                try:
+                    name: str = package.Payload.Receipent
+                except:
+                    return None
+                with self._lock:
+                    self._unsubscribe(name=name)
+
+            case _:
+                pass
+
+    def _unsubscribe(self, name: str) -> bool:
+        watch_id: int | None = self._subscribers.pop(name, None)
+        if watch_id == None:
+            return False
+        return self._config.unwatch(watch_id=watch_id)
+
+    def _push(self, name: str, diff: dict) -> None:
+        self.send_package(package=Package(
+            sender=self._name,
+            recipent=name,
+            package_type='request',
+            package_id=self._generate_request_id(),
+            subject='config_changed',
+            payload=diff
+        ))
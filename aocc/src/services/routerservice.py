@@ -1,110 +1,218 @@
-from threading import Thread, Lock
-from multiprocessing.connection import Connection
-from time import sleep
+from threading import Thread, Lock, current_thread
+from multiprocessing.connection import Connection, Pipe, wait
 from aocc.src.package import Package
+from collections import deque
+from queue import Queue
+import logging
+
+_logger: logging.Logger = logging.getLogger(__name__)
 
 class RouterService:
 
-    def __init__(self, name: str) -> None:
+    # Ein Thread liest alle Verbindungen und ordnet die Frames den Empfängern zu. Gesendet wird über eine feste
+    # Anzahl Sende-Threads aus je einer Queue pro Empfänger, ein Service, der nicht mehr liest, blockiert so
+    # höchstens einen Sende-Thread statt das ganze Routing. Jeder Sende-Thread schickt einen Frame und reiht den
+    # Empfänger dann wieder hinten ein, die Reihenfolge je Empfänger bleibt erhalten. Mehr als max_pending
+    # wartende Frames für einen Empfänger werden verworfen.
+
+    _stop_marker: object = object()
+
+    def __init__(self, name: str, sender_threads: int = 4, max_pending: int = 4096) -> None:
+        if sender_threads < 1 or max_pending < 1:
+            raise Exception('sender_threads and max_pending must be at least 1')
+        self._name: str = name
+        self._sender_threads: int = sender_threads
+        self._max_pending: int = max_pending
+        self._outboxes: dict = dict()
+        self._outboxes_lock: Lock = Lock()
+        self._ready: Queue = Queue()
+        self._writers: list = list()
         self._connections: dict = dict()
-        self._workers: dict = dict()
         self._connections_lock: Lock = Lock()
-        self._workers_lock: Lock = Lock()
+        # Routing-Tabellen werden bei Änderungen komplett ersetzt (copy-on-write),
+        # damit der Router-Thread sie ohne Lock lesen kann
+        self._routes: dict = dict()
+        self._senders: dict = dict()
+        self._wakeup_reader: Connection | None = None
+        self._wakeup_writer: Connection | None = None
+        self._worker: Thread | None = None
         self._running: bool = False
-        
+        self._running_lock: Lock = Lock()
 
     def start(self) -> None:
-        pass
+        with self._running_lock:
+            if self._running:
+                return None
+            # ein Sende-Thread aus dem letzten Lauf hängt noch in send_bytes und würde mit den neuen konkurrieren
+            if any(writer.is_alive() for writer in self._writers):
+                raise Exception('RouterService is still stopping')
+            self._running: bool = True
+        self._wakeup_reader, self._wakeup_writer = Pipe(duplex=False)
+        self._writers: list = [Thread(target=self._send_loop, daemon=True, name=f'{self._name}_sender_{index}') for index in range(self._sender_threads)]
+        for writer in self._writers:
+            writer.start()
+        self._worker: Thread = Thread(target=self._run, daemon=True, name=f'{self._name}_router')
+        self._worker.start()
 
-    def stop(self) -> None:
-        pass
+    def stop(self, timeout: float | None = 1.0) -> None:
+        with self._running_lock:
+            if not self._running:
+                return None
+            self._running: bool = False
+        self._wakeup()
+        if self._worker is not current_thread():
+            self._worker.join(timeout=timeout)
+        if not self._worker.is_alive():
+            self._wakeup_reader.close()
+            self._wakeup_writer.close()
+        self._worker: None = None
+        with self._outboxes_lock:
+            self._outboxes.clear()
+        for _ in self._writers:
+            self._ready.put(RouterService._stop_marker)
+        for writer in self._writers:
+            if writer is not current_thread():
+                writer.join(timeout=timeout)
+        self._writers: list = [writer for writer in self._writers if writer.is_alive()]
 
     def _run(self) -> None:
-        while self._running:
-            workers: list = self._get_workers_names()
-            services: list = self._get_services_names()
-            runs: int = 0
-            while True:
-                run: bool = False
-                for service in services:
-                    if service not in workers:
-                        self._start_workers(name=service)
-                        run: bool = True
-                if not run:
-                    if runs == 0:
-                        sleep(0.2)
-                    break
-                else:
-                    runs += 1
+        wakeup_reader: Connection = self._wakeup_reader
+        while self.isRunning:
+            senders: dict = self._senders
+            ready: list = wait([wakeup_reader] + list(senders.keys()))
+            for connection in ready:
+                if connection is wakeup_reader:
+                    while wakeup_reader.poll():
+                        wakeup_reader.recv_bytes()
+                    continue
+                name: str = senders[connection]
+                try:
+                    data: bytes = connection.recv_bytes()
+                except (EOFError, OSError):
+                    self.del_connection_pair(name=name)
+                    continue
+                try:
+                    self._route(sender=name, data=data)
+                except Exception as e:
+                    _logger.error('dropping frame from %s that can\'t be routed: %s', name, e)
+
+    def _route(self, sender: str, data: bytes) -> None:
+        # Batch-Frames werden je Empfänger neu gebündelt weitergeleitet
+        outgoing: dict = dict()
+        for frame in Package.split_frame(data):
+            connection, frame = self._resolve(sender=sender, frame=frame)
+            if connection != None:
+                outgoing.setdefault(connection, list()).append(frame)
+        for connection, frames in outgoing.items():
+            self._enqueue(connection=connection, data=frames[0] if len(frames) == 1 else Package.pack_batch(frames))
+
+    def _enqueue(self, connection: Connection, data: bytes) -> None:
+        with self._outboxes_lock:
+            outbox: deque | None = self._outboxes.get(connection)
+            if outbox == None:
+                # noch nicht eingereiht, ein Sende-Thread übernimmt den Empfänger
+                self._outboxes[connection] = deque((data,))
+                self._ready.put(connection)
+                return None
+            if len(outbox) >= self._max_pending:
+                _logger.warning('dropping frame, %d frames are already waiting for a receiver', len(outbox))
+                return None
+            outbox.append(data)
+
+    def _send_loop(self) -> None:
+        while True:
+            connection: Connection | object = self._ready.get()
+            if connection is RouterService._stop_marker:
+                break
+            with self._outboxes_lock:
+                outbox: deque | None = self._outboxes.get(connection)
+                if not outbox:
+                    self._outboxes.pop(connection, None)
+                    continue
+                data: bytes = outbox.popleft()
+            try:
+                connection.send_bytes(data)
+            except (EOFError, OSError):
+                with self._outboxes_lock:
+                    self._outboxes.pop(connection, None)
+                continue
+            with self._outboxes_lock:
+                outbox: deque | None = self._outboxes.get(connection)
+                if outbox == None:
+                    continue
+                if not outbox:
+                    del self._outboxes[connection]
+                    continue
+            self._ready.put(connection)
+
+    def _resolve(self, sender: str, frame: bytes) -> tuple:
+        # Für das Weiterleiten reicht der Header, der Payload wird nicht dekodiert
+        connection: Connection | None = self._routes.get(Package.peek_receipent(frame))
+        if connection != None:
+            return connection, frame
+        package: Package = Package.from_bytes(frame)
+        response: bytes = Package(
+            sender=self._name,
+            recipent=package.Sender,
+            package_type='response',
+            package_id=package.PackageID,
+            subject='unknown_receipent',
+            code=404,
+            payload=package
+            ).to_bytes()
+        return self._routes.get(sender), response
+
+    def _wakeup(self) -> None:
+        if self._wakeup_writer != None:
+            try:
+                self._wakeup_writer.send_bytes(b'\x00')
+            except OSError:
+                pass
+
+    def _rebuild_routes(self) -> None:
+        self._routes: dict = {name: pair['out'] for name, pair in self._connections.items()}
+        self._senders: dict = {pair['in']: name for name, pair in self._connections.items()}
 
     def add_connection_pair(self, name: str, conn_in: Connection, conn_out: Connection) -> bool:
         with self._connections_lock:
-            if name not in self._connections.keys():
-                self._connections[name] = {'in': conn_in, 'out': conn_out}
-                return True
-        return False
-    
+            if name in self._connections.keys():
+                return False
+            self._connections[name] = {'in': conn_in, 'out': conn_out}
+            self._rebuild_routes()
+        self._wakeup()
+        return True
+
     def del_connection_pair(self, name: str) -> bool:
         with self._connections_lock:
-            if name in self._connections.keys():
-                del self._connections[name]
-                if name not in self._connections.keys():
-                    return True
-        return False
-
-    def _start_workers(self, name: str) -> None:
-        worker_in: Thread = Thread(target=self._handle_connection_in, args=(name,), daemon=True, name=f'worker_{name}_in')
-        worker_out: Thread = Thread(target=self._handle_connection_out, args=(name,), daemon=True, name=f'worker_{name}_out')
-        with self._workers_lock:
-            self._workers[name] = {'running': True, 'worker_in': worker_in, 'worker_out': worker_out}
-            self._workers[name]['worker_in'].start()
-            self._workers[name]['worker_out'].start()
+            if name not in self._connections.keys():
+                return False
+            connection: Connection = self._connections.pop(name)['out']
+            self._rebuild_routes()
+        with self._outboxes_lock:
+            self._outboxes.pop(connection, None)
+        self._wakeup()
+        return True
 
     def _get_connection(self, name: str, direction: str) -> Connection | None:
         with self._connections_lock:
             if name in self._connections.keys():
                 return self._connections[name][direction]
         return None
-    
+
     def _get_connections(self, names: list, direction: str) -> list:
         result: list = list()
         for name in names:
             connection: Connection = self._get_connection(name=name, direction=direction)
             if isinstance(connection, Connection):
                 result.append(connection)
+        return result
 
     def _get_services_names(self) -> list:
         with self._connections_lock:
             return list(self._connections.keys())
 
-    def _get_workers_names(self) -> list:
-        with self._workers_lock:
-            return list(self._workers.keys())
-
-    def _get_worker_running_status(self, worker_name: str) -> bool:
-        with self._workers_lock:
-            if worker_name in self._workers.keys():
-                try:
-                    return self._workers[worker_name]['running']
-                except:
-                    return False
-        return False
-
-    def _handle_connection_in(self, name: str) -> None:
-        connection: Connection = self._get_connection(name=name, direction='in')
-        if isinstance(connection, Connection):
-            while self._running and self._get_worker_running_status(worker_name=name):
-                try:
-                    if connection.poll():
-                        package: Package = connection.recv()
-                    else:
-                        sleep(0.2)
-                except:
-                    break
-
-    def _handle_connection_out(self, name: str) -> None:
-        connection: Connection = self._get_connection(name=name, direction='out')
-        if isinstance(connection, Connection):
-            while self._running:
-                pass
-
+    @property
+    def isRunning(self) -> bool:
+        with self._running_lock:
+            result: bool = self._running
+        return result
@@ -0,0 +1,70 @@
+from aocc.src.service import Service, Connection, Package
+from aocc.src.packageexecutor import PackageExecutor
+from aocc.src.directoryscanner import DirectoryScanner
+from aocc.src.fileindex import FileIndex
+from time import sleep
+
+class ScannerService(Service):
+
+    # scan_directory vergleicht einen Verzeichnisbaum mit dem FileIndex. Die Änderungen gehen als
+    # directory_changes-Requests in Batches an den Absender, die Antwort enthält die Zusammenfassung.
+    # Batches und Antwort laufen in derselben Lane, der Empfänger verarbeitet die Batches aber über seinen Executor
+    # und kann die Antwort vorher sehen. Die Anzahl der Änderungen steht in der Zusammenfassung.
+
+    def __init__(self, conn_in: Connection, conn_out: Connection, index_path: str, block: bool = True, max_workers: int = 8, batch_size: int = 1000, connection_options: dict | None = None):
+        # Scans laufen nacheinander, damit sich zwei Scans derselben Wurzel nicht den Index verändern
+        executor: PackageExecutor = PackageExecutor(subject_limits={'scan_directory': 1})
+        super(ScannerService, self).__init__(name='ScannerService', conn_in=conn_in, conn_out=conn_out, request_callback=self._request_callback, response_callback=self._response_callback, config_required=False, executor=executor, connection_options=connection_options)
+        self._index: FileIndex = FileIndex(path=index_path)
+        self._scanner: DirectoryScanner = DirectoryScanner(index=self._index, max_workers=max_workers, batch_size=batch_size)
+        self.start()
+        while block and self.isRunning:
+            sleep(0.5)
+
+    def stop(self) -> None:
+        if self.isRunning:
+            super(ScannerService, self).stop()
+            self._index.close()
+
+    def _request_callback(self, package: Package) -> None:
+        match package.Subject:
+            case 'scan_directory':
+                if package.Payload != None:
+
+                    try:
+                        root: str = package.Payload['root']
+                        update_index: bool = bool(package.Payload.get('update_index', True))
+                    except:
+                        root: None = None
+
+                    if root != None:
+                        try:
+                            summary: dict = self._scanner.scan(root=root, emit=lambda changes: self._send_changes(package=package, root=root, changes=changes), update_index=update_index)
+                            response: Package = self._create_response(package=package, payload=summary)
+                        except Exception as e:
+                            response: Package = self._create_error_response(package=package, error=e)
+                    else:
+                        response: Package = self._create_wrong_payload_response(package=package)
+                else:
+                    response: Package = self._create_no_payload_response(package=package)
+                self.send_package(package=response)
+
+            case _:
+                pass
+
+    def _response_callback(self, package: Package) -> None:
+        pass
+
+    def _send_changes(self, package: Package, root: str, changes: list) -> None:
+        self.send_package(package=Package(
+            sender=self._name,
+            recipent=package.Sender,
+            package_type='request',
+            package_id=self._generate_request_id(),
+            subject='directory_changes',
+            payload={
+                'root': root,
+                'scan': package.PackageID,
+                'changes': changes
+            }
+        ))
@@ -0,0 +1,175 @@
+from aocc.src.service import Service, Connection, Package
+from aocc.src.changewatcher import ChangeWatcher
+from aocc.src.directoryscanner import DirectoryScanner
+from aocc.src.fileindex import FileIndex
+from threading import Lock
+from time import sleep
+import os
+
+class WatcherService(Service):
+
+    # watch_directory startet einen ChangeWatcher für eine Wurzel, die zusammengefassten Änderungen gehen als
+    # directory_changes-Requests an alle Absender, die die Wurzel beobachten. Der Watcher läuft, bis der letzte
+    # von ihnen unwatch_directory schickt. Mit index_path wird ein Überlauf der inotify-Queue
+    # gleich über den DirectoryScanner aufgelöst, sonst wird der rescan-Eintrag weitergereicht.
+
+    def __init__(self, conn_in: Connection, conn_out: Connection, index_path: str | None = None, block: bool = True, debounce: float = 0.2, max_delay: float = 2.0, batch_size: int = 1000, connection_options: dict | None = None):
+        super(WatcherService, self).__init__(name='WatcherService', conn_in=conn_in, conn_out=conn_out, request_callback=self._request_callback, response_callback=self._response_callback, config_required=False, connection_options=connection_options)
+        self._debounce: float = debounce
+        self._max_delay: float = max_delay
+        self._batch_size: int = batch_size
+        self._index: FileIndex | None = FileIndex(path=index_path) if index_path != None else None
+        self._scanner: DirectoryScanner | None = DirectoryScanner(index=self._index, batch_size=batch_size) if self._index != None else None
+        self._watchers: dict = dict()
+        self._subscribers: dict = dict()
+        self._watchers_lock: Lock = Lock()
+        self.start()
+        while block and self.isRunning:
+            sleep(0.5)
+
+    def stop(self) -> None:
+        if self.isRunning:
+            super(WatcherService, self).stop()
+            with self._watchers_lock:
+                watchers: list = list(self._watchers.values())
+                self._watchers.clear()
+                self._subscribers.clear()
+            for watcher in watchers:
+                watcher.stop()
+            if self._index != None:
+                self._index.close()
+
+    def _request_callback(self, package: Package) -> None:
+        match package.Subject:
+            case 'watch_directory':
+                if package.Payload != None:
+
+                    try:
+                        root: str = os.path.abspath(package.Payload['root'])
+                    except:
+                        root: None = None
+
+                    if root != None:
+                        try:
+                            watcher: ChangeWatcher = self._watch(root=root, subscriber=package.Sender)
+                            response: Package = self._create_response(package=package, payload={
+                                'root': root,
+                                'watches': watcher.watchCount
+                            })
+                        except Exception as e:
+                            response: Package = self._create_error_response(package=package, error=e)
+                    else:
+                        response: Package = self._create_wrong_payload_response(package=package)
+                else:
+                    response: Package = self._create_no_payload_response(package=package)
+                self.send_package(package=response)
+
+            case 'unwatch_directory':
+                if package.Payload != None:
+
+                    try:
+                        root: str = os.path.abspath(package.Payload['root'])
+                    except:
+                        root: None = None
+
+                    if root != None:
+                        was_watching: bool = self._unwatch(root=root, subscriber=package.Sender)
+                        response: Package = self._create_response(package=package, payload={
+                            'root': root,
+                            'watching': False,
+                            'was_watching': was_watching
+                        })
+                    else:
+                        response: Package = self._create_wrong_payload_response(package=package)
+                else:
+                    response: Package = self._create_no_payload_response(package=package)
+                self.send_package(package=response)
+
+            case _:
+                pass
+
+    def _response_callback(self, package: Package) -> None:
+        pass
+
+    def _watch(self, root: str, subscriber: str) -> ChangeWatcher:
+        with self._watchers_lock:
+            watcher: ChangeWatcher | None = self._watchers.get(root)
+            if watcher == None:
+                watcher: ChangeWatcher = ChangeWatcher(root=root, emit=lambda changes: self._forward_changes(root=root, changes=changes), debounce=self._debounce, max_delay=self._max_delay, batch_size=self._batch_size)
+                watcher.start()
+                self._watchers[root] = watcher
+                self._subscribers[root] = set()
+            self._subscribers[root].add(subscriber)
+        return watcher
+
+    def _unwatch(self, root: str, subscriber: str) -> bool:
+        # entfernt nur den Absender, der Watcher wird erst mit dem letzten Abonnenten beendet
+        with self._watchers_lock:
+            subscribers: set | None = self._subscribers.get(root)
+            if subscribers == None or subscriber not in subscribers:
+                return False
+            subscribers.discard(subscriber)
+            watcher: ChangeWatcher | None = None
+            if not subscribers:
+                del self._subscribers[root]
+                watcher: ChangeWatcher | None = self._watchers.pop(root, None)
+        if watcher != None:
+            watcher.stop()
+        return True
+
+    def _forward_changes(self, root: str, changes: list) -> None:
+        if self._scanner != None:
+            rescans: list = [change for change in changes if change['type'] == 'rescan']
+            changes: list = [change for change in changes if change['type'] != 'rescan']
+            # der Index bleibt mit den gemeldeten Änderungen synchron, ein Rescan meldet nur, was verloren ging
+            self._update_index(changes=changes)
+            for change in rescans:
+                try:
+                    self._scanner.scan(root=change['path'], emit=lambda scanned: self._send_changes(root=root, changes=scanned))
+                except Exception:
+                    # z.B. ist das Verzeichnis inzwischen verschwunden, dann muss der Abonnent selbst neu scannen
+                    changes.append(change)
+        if changes:
+            self._send_changes(root=root, changes=changes)
+
+    def _update_index(self, changes: list) -> None:
+        upserts: list = list()
+        deletes: list = list()
+        for change in changes:
+            if change['type'] == 'moved':
+                deletes.append(change['from'])
+                if change.get('directory', False):
+                    source: str = change['from'] + os.sep
+                    moved: list = [entry._replace(path=change['path'] + os.sep + entry.path[len(source):]) for entry in self._index.iter_prefix(prefix=source)]
+                    self._index.delete_prefix(prefix=source)
+                    upserts.extend(moved)
+            if change['type'] == 'deleted':
+                if change.get('directory', False):
+                    self._index.delete_prefix(prefix=change['path'] + os.sep)
+                deletes.append(change['path'])
+            elif not change.get('directory', False):
+                try:
+                    upserts.append(FileIndex.entry_from_stat(path=change['path'], stat=os.lstat(change['path'])))
+                except OSError:
+                    deletes.append(change['path'])
+        if deletes:
+            self._index.delete_many(paths=deletes)
+        if upserts:
+            self._index.upsert_many(entries=upserts)
+
+    def _send_changes(self, root: str, changes: list) -> None:
+        with self._watchers_lock:
+            subscribers: list = sorted(self._subscribers.get(root, set()))
+        for subscriber in subscribers:
+            self.send_package(package=Package(
+                sender=self._name,
+                recipent=subscriber,
+                package_type='request',
+                package_id=self._generate_request_id(),
+                subject='directory_changes',
+                payload={
+                    'root': root,
+                    'changes': changes
+                },
+                priority=Package.PRIORITY_BULK
+            ))
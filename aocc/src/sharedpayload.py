@@ -0,0 +1,145 @@
+from multiprocessing.shared_memory import SharedMemory
+from threading import Lock
+import inspect
+import weakref
+
+try:
+    from multiprocessing import resource_tracker
+except ImportError:
+    resource_tracker = None
+
+class SharedBuffer:
+
+    # Ein SharedBuffer wird beim Pickeln nur als Name und Größe des Segments übertragen.
+    # Der Empfänger übernimmt das Segment und gibt es mit release() frei, sobald
+    # alle mit acquire() angemeldeten Nutzer fertig sind.
+
+    _track_supported: bool = 'track' in inspect.signature(SharedMemory).parameters
+
+    def __init__(self, shared_memory: SharedMemory, size: int) -> None:
+        self._shared_memory: SharedMemory = shared_memory
+        self._size: int = size
+        self._references: int = 1
+        self._references_lock: Lock = Lock()
+        self._finalizer: weakref.finalize = weakref.finalize(self, SharedBuffer._free, shared_memory)
+
+    @classmethod
+    def create(cls, data: bytes | bytearray | memoryview) -> 'SharedBuffer':
+        size: int = len(data)
+        shared_memory: SharedMemory = SharedBuffer._open(name=None, size=max(size, 1))
+        shared_memory.buf[:size] = data
+        return cls(shared_memory=shared_memory, size=size)
+
+    @classmethod
+    def attach(cls, name: str, size: int) -> 'SharedBuffer':
+        return cls(shared_memory=SharedBuffer._open(name=name, size=size), size=size)
+
+    def __reduce__(self) -> tuple:
+        return (SharedBuffer.attach, (self._shared_memory.name, self._size))
+
+    def __len__(self) -> int:
+        return self._size
+
+    def acquire(self) -> 'SharedBuffer':
+        with self._references_lock:
+            if self._references <= 0:
+                raise Exception('SharedBuffer was already released')
+            self._references += 1
+        return self
+
+    def release(self) -> None:
+        with self._references_lock:
+            if self._references <= 0:
+                return None
+            self._references -= 1
+            if self._references > 0:
+                return None
+        self._finalizer()
+
+    def detach(self) -> None:
+        # nach dem Versand: die eigene Abbildung schließen, das Segment gehört jetzt dem Empfänger
+        with self._references_lock:
+            self._references: int = 0
+        self._finalizer.detach()
+        self._shared_memory.close()
+
+    def tobytes(self) -> bytes:
+        return bytes(self.buffer)
+
+    def __enter__(self) -> 'SharedBuffer':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.release()
+
+    @property
+    def buffer(self) -> memoryview:
+        if not self._finalizer.alive:
+            raise Exception('SharedBuffer was already released')
+        return self._shared_memory.buf[:self._size]
+
+    @property
+    def name(self) -> str:
+        return self._shared_memory.name
+
+    @property
+    def released(self) -> bool:
+        return not self._finalizer.alive
+
+    @staticmethod
+    def _open(name: str | None, size: int) -> SharedMemory:
+        if SharedBuffer._track_supported:
+            return SharedMemory(name=name, create=name == None, size=size, track=False)
+        else:
+            # vor Python 3.13 meldet sich jedes Segment beim resource_tracker an,
+            # der es sonst beim Prozessende des Senders wieder entfernen würde
+            shared_memory: SharedMemory = SharedMemory(name=name, create=name == None, size=size)
+            SharedBuffer._untrack(shared_memory=shared_memory, register=False)
+            return shared_memory
+
+    @staticmethod
+    def _untrack(shared_memory: SharedMemory, register: bool) -> None:
+        if resource_tracker != None and hasattr(shared_memory, '_name'):
+            if register:
+                resource_tracker.register(shared_memory._name, 'shared_memory')
+            else:
+                resource_tracker.unregister(shared_memory._name, 'shared_memory')
+
+    @staticmethod
+    def _free(shared_memory: SharedMemory) -> None:
+        try:
+            shared_memory.close()
+        except BufferError:
+            # noch existierende Views halten die Abbildung, das Segment wird trotzdem entfernt
+            pass
+        if not SharedBuffer._track_supported:
+            # unlink() meldet das Segment wieder beim resource_tracker ab
+            SharedBuffer._untrack(shared_memory=shared_memory, register=True)
+        try:
+            shared_memory.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def share_large_payload(payload: any, threshold: int) -> tuple:
+    # liefert (neuer Payload, Liste der angelegten SharedBuffer)
+    if isinstance(payload, (bytes, bytearray, memoryview)) and len(payload) >= threshold:
+        buffer: SharedBuffer = SharedBuffer.create(data=payload)
+        return buffer, [buffer]
+    if isinstance(payload, dict):
+        shared: list = list()
+        result: dict = dict()
+        for key, value in payload.items():
+            if isinstance(value, (bytes, bytearray, memoryview)) and len(value) >= threshold:
+                value: SharedBuffer = SharedBuffer.create(data=value)
+                shared.append(value)
+            result[key] = value
+        if shared:
+            return result, shared
+    return payload, list()
+
+
+def payload_data(value: any) -> bytes | memoryview:
+    if isinstance(value, SharedBuffer):
+        return value.buffer
+    return value
@@ -0,0 +1,192 @@
+from aocc.src.durablewrite import atomic_write
+from aocc.src.fileobject import FileObject
+from aocc.src.objectcodec import encode_object, decode_object
+from threading import RLock
+from struct import Struct
+import zlib
+import os
+
+
+class StorageJournal:
+
+    # Persistenz für DottedStorage aus einem Snapshot und einem Journal daneben (<path>.journal).
+    # Jede Änderung hängt nur einen kleinen Datensatz an das Journal an, compact() schreibt den ganzen
+    # Baum als neuen Snapshot und beginnt ein leeres Journal.
+    #
+    # Snapshot: encode_object(('dotted_snapshot', generation, data)), atomar ersetzt.
+    # Journal:  magic | generation, danach Datensätze aus Länge | crc32 | encode_object(((key, value), (key,), ...)),
+    #           (key,) löscht den Schlüssel.
+    # Ein Journal gehört nur zu dem Snapshot mit derselben (zufälligen) Generation. Stürzt compact() zwischen
+    # Snapshot und neuem Journal ab, ist das alte Journal schon im Snapshot enthalten und wird ignoriert.
+    # Ein halb geschriebener letzter Datensatz wird beim Laden abgeschnitten.
+
+    _journal_magic: bytes = b'ADJ1'
+    _journal_header: Struct = Struct('!4sQ')
+    _record_header: Struct = Struct('!II')
+    _snapshot_marker: str = 'dotted_snapshot'
+
+    def __init__(self, path: str, sync: bool = True, compact_size: int = 1 << 20) -> None:
+        if compact_size < 1:
+            raise Exception('compact_size must be at least 1')
+        self._path: str = os.path.abspath(path)
+        self._journal_path: str = self._path + '.journal'
+        self._sync: bool = sync
+        self._compact_size: int = compact_size
+        self._lock: RLock = RLock()
+        self._generation: int | None = None
+        self._fd: int | None = None
+        self._journal_size: int = 0
+        self._records: int = 0
+        self._compactions: int = 0
+
+    def load(self) -> dict:
+        # Snapshot lesen, passendes Journal nachspielen und das Journal zum Anhängen öffnen
+        with self._lock:
+            data, generation = self._read_snapshot()
+            records: int = 0
+            journal_size: int = 0
+            if generation != None:
+                records, journal_size = self._replay(data=data, generation=generation)
+            if generation == None or journal_size == 0:
+                # kein Snapshot im eigenen Format oder kein gültiges Journal: neu beginnen
+                self._write_snapshot(data=data)
+            else:
+                self._generation: int = generation
+                self._open_journal()
+                self._records: int = records
+            return data
+
+    def append(self, pairs: list) -> int:
+        # ein Datensatz mit allen Paaren (oder (key,) zum Löschen), beim Laden werden sie gemeinsam oder gar nicht angewendet
+        payload: bytes = encode_object(obj=tuple(pairs))
+        record: bytes = StorageJournal._record_header.pack(len(payload), zlib.crc32(payload)) + payload
+        with self._lock:
+            if self._fd == None:
+                raise Exception('StorageJournal is not loaded')
+            written: int = 0
+            while written < len(record):
+                written += os.write(self._fd, record[written:])
+            if self._sync:
+                os.fsync(self._fd)
+            self._journal_size += len(record)
+            self._records += 1
+        return len(record)
+
+    def compact(self, data: dict) -> None:
+        with self._lock:
+            self._write_snapshot(data=data)
+            self._compactions += 1
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fd != None:
+                os.close(self._fd)
+                self._fd: None = None
+
+    def _read_snapshot(self) -> tuple:
+        if not os.path.exists(self._path):
+            return dict(), None
+        # ältere Konfigurationsdateien sind ein einfaches dict (Codec oder pickle) und werden übernommen
+        snapshot: any = FileObject(path=self._path).read_object(migrate=False)
+        if isinstance(snapshot, tuple) and len(snapshot) == 3 and snapshot[0] == StorageJournal._snapshot_marker and isinstance(snapshot[2], dict):
+            return snapshot[2], snapshot[1]
+        if isinstance(snapshot, dict):
+            return snapshot, None
+        raise Exception(f'{self._path} is not a storage snapshot')
+
+    def _replay(self, data: dict, generation: int) -> tuple:
+        # liefert (Datensätze, gültige Länge des Journals), 0 wenn das Journal fehlt oder zu einem anderen Snapshot gehört
+        journal: bytes = FileObject(path=self._journal_path).read_bytes()
+        if len(journal) < StorageJournal._journal_header.size:
+            return 0, 0
+        magic, journal_generation = StorageJournal._journal_header.unpack_from(journal, 0)
+        if magic != StorageJournal._journal_magic or journal_generation != generation:
+            return 0, 0
+        offset: int = StorageJournal._journal_header.size
+        records: int = 0
+        while offset + StorageJournal._record_header.size <= len(journal):
+            length, checksum = StorageJournal._record_header.unpack_from(journal, offset)
+            start: int = offset + StorageJournal._record_header.size
+            payload: bytes = journal[start:start + length]
+            if len(payload) != length or zlib.crc32(payload) != checksum:
+                break
+            try:
+                pairs: tuple = decode_object(data=payload)
+            except:
+                break
+            for pair in pairs:
+                if len(pair) == 1:
+                    StorageJournal.remove(data=data, key=pair[0])
+                else:
+                    StorageJournal.apply(data=data, key=pair[0], value=pair[1])
+            offset: int = start + length
+            records += 1
+        if offset != len(journal):
+            # abgerissener Datensatz vom letzten Absturz, sonst würden neue Datensätze dahinter nie gelesen
+            with open(self._journal_path, 'r+b') as journal_file:
+                journal_file.truncate(offset)
+                journal_file.flush()
+                os.fsync(journal_file.fileno())
+        return records, offset
+
+    def _write_snapshot(self, data: dict) -> None:
+        generation: int = int.from_bytes(os.urandom(8), 'big')
+        atomic_write(path=self._path, data=encode_object(obj=(StorageJournal._snapshot_marker, generation, data)), sync=self._sync)
+        atomic_write(path=self._journal_path, data=StorageJournal._journal_header.pack(StorageJournal._journal_magic, generation), sync=self._sync)
+        self.close()
+        self._generation: int = generation
+        self._open_journal()
+        self._records: int = 0
+
+    def _open_journal(self) -> None:
+        self._fd: int = os.open(self._journal_path, os.O_WRONLY | os.O_APPEND | getattr(os, 'O_BINARY', 0))
+        self._journal_size: int = os.fstat(self._fd).st_size
+
+    @staticmethod
+    def apply(data: dict, key: str, value: any) -> None:
+        # wie DottedStorage.set ohne Index, für das Nachspielen des Journals
+        parts: list = key.split('.')
+        d: dict = data
+        for part in parts[:-1]:
+            if part not in d or not isinstance(d[part], dict):
+                d[part] = {}
+            d = d[part]
+        d[parts[-1]] = value
+
+    @staticmethod
+    def remove(data: dict, key: str) -> None:
+        parts: list = key.split('.')
+        d: dict = data
+        for part in parts[:-1]:
+            if part not in d or not isinstance(d[part], dict):
+                return None
+            d = d[part]
+        d.pop(parts[-1], None)
+
+    @property
+    def lock(self) -> RLock:
+        return self._lock
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def journalPath(self) -> str:
+        return self._journal_path
+
+    @property
+    def journalSize(self) -> int:
+        return self._journal_size
+
+    @property
+    def recordCount(self) -> int:
+        return self._records
+
+    @property
+    def compactionCount(self) -> int:
+        return self._compactions
+
+    @property
+    def needsCompaction(self) -> bool:
+        return self._journal_size >= self._compact_size
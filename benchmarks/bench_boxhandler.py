@@ -0,0 +1,39 @@
+# Aufruf aus dem Projektverzeichnis: python -m benchmarks.bench_boxhandler
+from time import perf_counter
+from aocc.src.boxhandler import BoxHandler
+from aocc.src.package import Package
+from aocc.src.worker import Worker
+
+ROUNDS: int = 20_000
+LEGACY_ROUNDS: int = 2_000
+
+
+def run_legacy(handler: BoxHandler, package: Package) -> float:
+    # bisheriger Ablauf: pro Box-Operation ein eigener Worker-Thread mit join()
+    start: float = perf_counter()
+    for _ in range(LEGACY_ROUNDS):
+        worker: Worker = Worker(target=handler.add_package_to_box, args=('bench', package))
+        worker.start()
+        worker.join()
+        worker: Worker = Worker(target=handler.get_package_from_box, args=('bench',))
+        worker.start()
+        worker.join()
+    return LEGACY_ROUNDS * 2 / (perf_counter() - start)
+
+
+def run_direct(handler: BoxHandler, package: Package) -> float:
+    start: float = perf_counter()
+    for _ in range(ROUNDS):
+        handler.add_package_to_box(name='bench', package=package)
+        handler.get_package_from_box(name='bench')
+    return ROUNDS * 2 / (perf_counter() - start)
+
+
+if __name__ == '__main__':
+    handler: BoxHandler = BoxHandler(direction='in')
+    handler.addBox(name='bench')
+    package: Package = Package(sender='a', recipent='b', package_type='request', package_id='0', subject='bench')
+    legacy: float = run_legacy(handler=handler, package=package)
+    direct: float = run_direct(handler=handler, package=package)
+    print(f'thread per operation: {legacy:>12,.0f} ops/s')
+    print(f'direct call:          {direct:>12,.0f} ops/s  ({direct / legacy:.0f}x)')
@@ -0,0 +1,41 @@
+# Aufruf aus dem Projektverzeichnis: python -m benchmarks.bench_configwatch
+from timeit import timeit
+from aocc.src.dottedstorage import DottedStorage
+from aocc.src.package import Package
+
+ROUNDS: int = 2_000
+
+
+def build_data(entries: int) -> dict:
+    data: dict = {'language': {'default': 'en', 'selected': 'en'}}
+    data['accounts'] = {f'account{i}': {'host': f'cloud{i}.example.org', 'sync': {'interval': 5, 'paths': [f'/home/user/sync/{i}']}} for i in range(entries)}
+    return data
+
+
+def bench(entries: int) -> None:
+    storage: DottedStorage = DottedStorage(data=build_data(entries=entries))
+    diffs: list = list()
+    storage.watch('language.*', diffs.append)
+    counter: list = [0]
+
+    def change() -> None:
+        counter[0] += 1
+        storage.set('language.selected', f'de{counter[0] % 2}')
+
+    def full_fetch() -> bytes:
+        # bisher: jeder Service holt nach einer Änderung den ganzen Baum mit get_config
+        return Package(sender='ConfigService', recipent='Client', package_type='response', package_id='x', subject='get_config', code=200, payload=storage.get_data()).to_bytes()
+
+    def push() -> bytes:
+        change()
+        return Package(sender='ConfigService', recipent='Client', package_type='request', package_id='x', subject='config_changed', payload=diffs[-1]).to_bytes()
+
+    full_time: float = timeit(full_fetch, number=ROUNDS) / ROUNDS
+    push_time: float = timeit(push, number=ROUNDS) / ROUNDS
+    print(f'{entries:>6} accounts: get_config {full_time * 1e6:9.1f} us {len(full_fetch()):>9} B | '
+          f'set + config_changed {push_time * 1e6:7.1f} us {len(push()):>5} B')
+
+
+if __name__ == '__main__':
+    for entries in (0, 100, 10_000):
+        bench(entries=entries)
@@ -0,0 +1,77 @@
+# Aufruf aus dem Projektverzeichnis: python -m benchmarks.bench_connectionhandler
+from multiprocessing import Pipe
+from threading import Event
+from time import perf_counter, process_time, sleep
+from statistics import median
+from aocc.src.connectionhandler import ConnectionHandler
+from aocc.src.package import Package
+
+ROUNDS: int = 2000
+IDLE_SECONDS: float = 2.0
+THROUGHPUT_PACKAGES: int = 50_000
+
+
+def bench_idle_cpu() -> None:
+    a_in, b_out = Pipe(duplex=False)
+    b_in, a_out = Pipe(duplex=False)
+    handler_a: ConnectionHandler = ConnectionHandler(conn_in=a_in, conn_out=a_out, package_callback=lambda package: None, auto_start=True)
+    handler_b: ConnectionHandler = ConnectionHandler(conn_in=b_in, conn_out=b_out, package_callback=lambda package: None, auto_start=True)
+    cpu_start: float = process_time()
+    sleep(IDLE_SECONDS)
+    cpu_used: float = process_time() - cpu_start
+    handler_a.stop()
+    handler_b.stop()
+    print(f'idle cpu: {cpu_used * 1000:.2f} ms in {IDLE_SECONDS:.1f} s ({cpu_used / IDLE_SECONDS * 100:.3f} %)')
+
+
+def bench_hop_latency() -> None:
+    a_in, b_out = Pipe(duplex=False)
+    b_in, a_out = Pipe(duplex=False)
+    answered: Event = Event()
+    handler_b: ConnectionHandler = ConnectionHandler(conn_in=b_in, conn_out=b_out, auto_start=False)
+    handler_b._callback = lambda package: handler_b.send_package(package=package)
+    handler_b.start()
+    handler_a: ConnectionHandler = ConnectionHandler(conn_in=a_in, conn_out=a_out, package_callback=lambda package: answered.set(), auto_start=True)
+    package: Package = Package(sender='bench_a', recipent='bench_b', package_type='request', package_id='0', subject='ping')
+    samples: list = list()
+    for _ in range(ROUNDS):
+        answered.clear()
+        start: float = perf_counter()
+        handler_a.send_package(package=package)
+        answered.wait()
+        samples.append(perf_counter() - start)
+    handler_a.stop()
+    handler_b.stop()
+    samples.sort()
+    # ein Round-Trip sind zwei Hops
+    print(f'hop latency: median {median(samples) / 2 * 1e6:.1f} us, p99 {samples[int(len(samples) * 0.99)] / 2 * 1e6:.1f} us over {ROUNDS} round trips')
+
+
+def bench_throughput(batch: bool) -> None:
+    conn_in, conn_out = Pipe(duplex=False)
+    received: Event = Event()
+    counter: list = [0]
+
+    def count(package: Package) -> None:
+        counter[0] += 1
+        if counter[0] == THROUGHPUT_PACKAGES:
+            received.set()
+
+    receiver: ConnectionHandler = ConnectionHandler(conn_in=conn_in, conn_out=Pipe(duplex=False)[1], package_callback=count, auto_start=True)
+    sender: ConnectionHandler = ConnectionHandler(conn_in=Pipe(duplex=False)[0], conn_out=conn_out, batch=batch, auto_start=True)
+    package: Package = Package(sender='FileService', recipent='SyncService', package_type='response', package_id='0', subject='stat', code=200, payload={'file': '/home/user/sync/a.txt', 'size': 1234, 'mtime': 1700000000.0})
+    start: float = perf_counter()
+    for _ in range(THROUGHPUT_PACKAGES):
+        sender.send_package(package=package)
+    received.wait()
+    elapsed: float = perf_counter() - start
+    sender.stop()
+    receiver.stop()
+    print(f'throughput (batch={batch!s:>5}): {THROUGHPUT_PACKAGES / elapsed:>10,.0f} packages/s')
+
+
+if __name__ == '__main__':
+    bench_idle_cpu()
+    bench_hop_latency()
+    bench_throughput(batch=False)
+    bench_throughput(batch=True)
@@ -0,0 +1,70 @@
+# Aufruf aus dem Projektverzeichnis: python -m benchmarks.bench_cryptoobject
+from time import perf_counter
+from tempfile import TemporaryDirectory
+from aocc.src.cryptoobject import CryptoObject
+from aocc.src.fileobject import FileObject
+import tracemalloc
+import os
+
+ACCOUNTS: int = 20
+RELOADS: int = 5
+BLOB_SIZE: int = 64 << 20
+
+
+def load_account(path: str, salt: str, password: str) -> dict:
+    # wie Account.load: Datei lesen, CryptoObject anlegen, entschlüsseln
+    return CryptoObject(salt=salt, password=password).decrypt_object(enc_obj=FileObject(path=path).read_bytes())
+
+
+def measure(run: callable) -> tuple:
+    tracemalloc.start()
+    start: float = perf_counter()
+    run()
+    elapsed: float = perf_counter() - start
+    peak: int = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def bench_blob(directory: str) -> None:
+    crypto: CryptoObject = CryptoObject(salt='blob', password='blob')
+    source: str = f'{directory}/blob.bin'
+    with open(file=source, mode='wb') as writer:
+        for _ in range(BLOB_SIZE // (1 << 20)):
+            writer.write(os.urandom(1 << 20))
+
+    def fernet() -> None:
+        FileObject(path=f'{directory}/blob.fernet').write_bytes(data=crypto._fernet_object.encrypt(FileObject(path=source).read_bytes()), sync=False)
+
+    def stream() -> None:
+        with open(file=source, mode='rb') as reader, open(file=f'{directory}/blob.stream', mode='wb') as writer:
+            crypto.encrypt_stream(reader=reader, writer=writer)
+
+    for name, run, target in [('fernet (whole blob)', fernet, 'blob.fernet'), ('aes-gcm stream', stream, 'blob.stream')]:
+        elapsed, peak = measure(run=run)
+        size: int = os.path.getsize(f'{directory}/{target}')
+        print(f'{name:<20} {BLOB_SIZE / elapsed / (1 << 20):>8,.0f} MiB/s  peak {peak / (1 << 20):>7,.1f} MiB  output {size / BLOB_SIZE:.3f}x')
+
+
+if __name__ == '__main__':
+    with TemporaryDirectory() as directory:
+        accounts: list = list()
+        for i in range(ACCOUNTS):
+            salt: str = CryptoObject.genereate_random_secret()
+            password: str = CryptoObject.genereate_random_secret()
+            path: str = f'{directory}/{i}'
+            FileObject(path=path).write_bytes(data=CryptoObject(salt=salt, password=password, cache=False).encrypt_object(obj={'id': str(i), 'user': {'name': 'bench'}}))
+            accounts.append((path, salt, password))
+        CryptoObject.clear_key_cache()
+        start: float = perf_counter()
+        for path, salt, password in accounts:
+            load_account(path=path, salt=salt, password=password)
+        cold: float = perf_counter() - start
+        start: float = perf_counter()
+        for _ in range(RELOADS):
+            for path, salt, password in accounts:
+                load_account(path=path, salt=salt, password=password)
+        warm: float = (perf_counter() - start) / RELOADS
+        print(f'{ACCOUNTS} accounts, cold cache: {cold * 1000:>10,.1f} ms ({cold / ACCOUNTS * 1000:,.1f} ms/account)')
+        print(f'{ACCOUNTS} accounts, warm cache: {warm * 1000:>10,.1f} ms ({warm / ACCOUNTS * 1000:,.3f} ms/account, {cold / warm:,.0f}x)')
+        bench_blob(directory=directory)
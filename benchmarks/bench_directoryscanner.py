@@ -0,0 +1,37 @@
+# Aufruf aus dem Projektverzeichnis: python -m benchmarks.bench_directoryscanner
+from time import perf_counter
+from tempfile import TemporaryDirectory
+from aocc.src.directoryscanner import DirectoryScanner
+from aocc.src.fileindex import FileIndex
+import os
+
+FILES: int = 500_000
+FILES_PER_DIRECTORY: int = 500
+
+
+def create_tree(root: str) -> None:
+    for directory in range(FILES // FILES_PER_DIRECTORY):
+        path: str = f'{root}/{directory // 100:02d}/{directory:04d}'
+        os.makedirs(path)
+        for file in range(FILES_PER_DIRECTORY):
+            open(f'{path}/{file}.txt', 'wb').close()
+
+
+def run_scan(scanner: DirectoryScanner, root: str) -> tuple:
+    changes: list = list()
+    start: float = perf_counter()
+    summary: dict = scanner.scan(root=root, emit=changes.extend)
+    return perf_counter() - start, summary, len(changes)
+
+
+if __name__ == '__main__':
+    with TemporaryDirectory() as directory:
+        root: str = f'{directory}/root'
+        create_tree(root=root)
+        with FileIndex(path=f'{directory}/file_index.db') as index:
+            for workers in [1, 8]:
+                index.delete_prefix(prefix=root + os.sep)
+                scanner: DirectoryScanner = DirectoryScanner(index=index, max_workers=workers)
+                initial, summary, _ = run_scan(scanner=scanner, root=root)
+                unchanged, summary, changes = run_scan(scanner=scanner, root=root)
+                print(f'{workers} worker(s): initial scan {initial:6.2f}s, unchanged rescan {unchanged:6.2f}s ({summary["files"]:,} files, {changes} changes)')
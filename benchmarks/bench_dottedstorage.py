@@ -0,0 +1,47 @@
+# Aufruf aus dem Projektverzeichnis: python -m benchmarks.bench_dottedstorage
+from timeit import timeit
+from aocc.src.dottedstorage import DottedStorage
+
+ROUNDS: int = 200_000
+
+
+def split_get(store: dict, key: str, default=None):
+    # bisheriger Weg: bei jedem Zugriff split() und durch die dicts laufen
+    parts = key.split('.')
+    d = store
+    for part in parts[:-1]:
+        if part in d and isinstance(d[part], dict):
+            d = d[part]
+        else:
+            return default
+    return d.get(parts[-1], default)
+
+
+def build_data(depth: int) -> tuple:
+    data: dict = {'token': {'access': {'data': 'x' * 64, 'request_time': 1718000000.25}}, 'user': {'name': 'user'}}
+    node: dict = data
+    parts: list = list()
+    for level in range(depth):
+        parts.append(f'level{level}')
+        node = node.setdefault(f'level{level}', dict())
+    node['value'] = 1
+    return data, '.'.join(parts + ['value'])
+
+
+if __name__ == '__main__':
+    for depth in (1, 4, 8):
+        data, key = build_data(depth=depth)
+        plain: DottedStorage = DottedStorage(data=data)
+        indexed: DottedStorage = DottedStorage(data=data, index=True)
+        split_time: float = timeit(lambda: split_get(data, key), number=ROUNDS) / ROUNDS
+        compiled_time: float = timeit(lambda: plain.get(key), number=ROUNDS) / ROUNDS
+        index_time: float = timeit(lambda: indexed.get(key), number=ROUNDS) / ROUNDS
+        set_plain: float = timeit(lambda: plain.set(key, 2), number=ROUNDS) / ROUNDS
+        set_indexed: float = timeit(lambda: indexed.set(key, 2), number=ROUNDS) / ROUNDS
+        print(f'depth {depth + 1:>2}: get split {split_time * 1e9:6.0f} ns  compiled {compiled_time * 1e9:6.0f} ns  index {index_time * 1e9:6.0f} ns | '
+              f'set compiled {set_plain * 1e9:6.0f} ns  index {set_indexed * 1e9:6.0f} ns')
+    keys: list = ['token.access.data', 'token.access.request_time', 'user.name']
+    indexed: DottedStorage = DottedStorage(data=build_data(depth=1)[0], index=True)
+    single: float = timeit(lambda: [indexed.get(key) for key in keys], number=ROUNDS) / ROUNDS
+    many: float = timeit(lambda: indexed.get_many(keys), number=ROUNDS) / ROUNDS
+    print(f'3 keys: get {single * 1e9:6.0f} ns  get_many {many * 1e9:6.0f} ns')
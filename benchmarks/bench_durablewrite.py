@@ -0,0 +1,45 @@
+# Aufruf aus dem Projektverzeichnis: python -m benchmarks.bench_durablewrite
+from time import perf_counter
+from tempfile import TemporaryDirectory
+from concurrent.futures import ThreadPoolExecutor
+from aocc.src.durablewrite import atomic_write, GroupCommitWriter
+import os
+
+FILES: int = 2_000
+SIZE: int = 4 * 1024
+WRITERS: int = 32
+
+
+def unsynced(directory: str, data: bytes) -> None:
+    def write(index: int) -> None:
+        with open(file=f'{directory}/{index}.bin', mode='wb') as writer:
+            writer.write(data)
+    with ThreadPoolExecutor(max_workers=WRITERS) as pool:
+        list(pool.map(write, range(FILES)))
+
+
+def fsync_each(directory: str, data: bytes) -> None:
+    with ThreadPoolExecutor(max_workers=WRITERS) as pool:
+        list(pool.map(lambda index: atomic_write(path=f'{directory}/{index}.bin', data=data), range(FILES)))
+
+
+def group_commit(directory: str, data: bytes) -> None:
+    writer: GroupCommitWriter = GroupCommitWriter()
+    writer.start()
+    try:
+        with ThreadPoolExecutor(max_workers=WRITERS) as pool:
+            list(pool.map(lambda index: writer.write(path=f'{directory}/{index}.bin', data=data), range(FILES)))
+    finally:
+        writer.stop()
+    print(f'  group commits: {writer.commitCount} for {FILES} files')
+
+
+if __name__ == '__main__':
+    data: bytes = os.urandom(SIZE)
+    directory: str = os.environ.get('BENCH_DIR', os.getcwd())
+    for name, run in [('unsynced wb', unsynced), ('atomic + fsync each', fsync_each), ('atomic + group commit', group_commit)]:
+        with TemporaryDirectory(dir=directory) as target:
+            start: float = perf_counter()
+            run(directory=target, data=data)
+            elapsed: float = perf_counter() - start
+        print(f'{name:<22} {FILES / elapsed:>10,.0f} files/s')
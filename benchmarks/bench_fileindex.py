@@ -0,0 +1,42 @@
+# Aufruf aus dem Projektverzeichnis: python -m benchmarks.bench_fileindex
+from time import perf_counter
+from tempfile import TemporaryDirectory
+from aocc.src.fileindex import FileIndex, IndexEntry
+import resource
+import os
+
+ENTRIES: int = 1_000_000
+BATCH: int = 10_000
+LOOKUPS: int = 20_000
+
+
+def fill(index: FileIndex) -> float:
+    start: float = perf_counter()
+    for offset in range(0, ENTRIES, BATCH):
+        index.upsert_many(entries=[IndexEntry(f'/data/{i // 1000:04d}/file_{i:07d}.bin', i, i, i, 0o100644, os.urandom(32)) for i in range(offset, offset + BATCH)])
+    return ENTRIES / (perf_counter() - start)
+
+
+def lookup(index: FileIndex) -> float:
+    start: float = perf_counter()
+    for i in range(0, ENTRIES, ENTRIES // LOOKUPS):
+        index.get(path=f'/data/{i // 1000:04d}/file_{i:07d}.bin')
+    return LOOKUPS / (perf_counter() - start)
+
+
+def scan_prefix(index: FileIndex) -> float:
+    start: float = perf_counter()
+    count: int = sum(1 for _ in index.iter_prefix(prefix='/data/05'))
+    assert count == 100_000
+    return count / (perf_counter() - start)
+
+
+if __name__ == '__main__':
+    with TemporaryDirectory() as directory:
+        with FileIndex(path=f'{directory}/file_index.db') as index:
+            print(f'batch upsert: {fill(index=index):>12,.0f} entries/s')
+            print(f'point lookup: {lookup(index=index):>12,.0f} lookups/s')
+            print(f'prefix scan:  {scan_prefix(index=index):>12,.0f} entries/s')
+            print(f'entries:      {index.count():>12,}')
+            print(f'database:     {os.path.getsize(index.path) / (1 << 20):>12,.1f} MiB')
+            print(f'peak RSS:     {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:>12,.1f} MiB')
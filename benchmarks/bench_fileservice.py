@@ -0,0 +1,55 @@
+# Aufruf aus dem Projektverzeichnis: python -m benchmarks.bench_fileservice
+from time import perf_counter
+from tempfile import TemporaryDirectory
+from multiprocessing import Pipe
+from aocc.src.fileservice import FileService
+from aocc.src.service import Service
+import os
+
+FILES: int = 100_000
+SINGLE: int = 5_000
+WINDOW: int = 64
+
+
+def exists_single(client: Service, files: list) -> float:
+    # bisher: ein file_exists-Request je Pfad, mit WINDOW Requests gleichzeitig unterwegs
+    start: float = perf_counter()
+    for offset in range(0, SINGLE, WINDOW):
+        futures: list = [client.request(recipient='FileService', subject='file_exists', payload={'file': file}) for file in files[offset:offset + WINDOW]]
+        for future in futures:
+            future.result(timeout=10.0)
+    return SINGLE / (perf_counter() - start)
+
+
+def query_many(client: Service, subject: str, files: list) -> float:
+    start: float = perf_counter()
+    response = client.request(recipient='FileService', subject=subject, payload={'files': files}, timeout=60.0).result()
+    assert response.Payload['count'] == len(files)
+    return len(files) / (perf_counter() - start)
+
+
+if __name__ == '__main__':
+    with TemporaryDirectory() as directory:
+        files: list = list()
+        for i in range(FILES):
+            path: str = f'{directory}/{i // 1000:03d}/{i}.bin'
+            if i % 1000 == 0:
+                os.makedirs(os.path.dirname(path))
+            if i % 2 == 0:
+                open(path, 'wb').close()
+            files.append(path)
+        client_in, file_out = Pipe(duplex=False)
+        file_in, client_out = Pipe(duplex=False)
+        file_service: FileService = FileService(conn_in=file_in, conn_out=file_out, block=False)
+        client: Service = Service(name='Client', conn_in=client_in, conn_out=client_out, config_required=False)
+        client.start()
+        try:
+            single: float = exists_single(client=client, files=files)
+            exists: float = query_many(client=client, subject='exists_many', files=files)
+            stat: float = query_many(client=client, subject='stat_many', files=files)
+        finally:
+            client.stop()
+            file_service.stop()
+        print(f'file_exists per path: {single:>10,.0f} paths/s')
+        print(f'exists_many:          {exists:>10,.0f} paths/s  ({exists / single:.0f}x)')
+        print(f'stat_many:            {stat:>10,.0f} paths/s')
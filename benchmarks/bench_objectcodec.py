@@ -0,0 +1,41 @@
+# Aufruf aus dem Projektverzeichnis: python -m benchmarks.bench_objectcodec
+import pickle
+from timeit import timeit
+from aocc.src.objectcodec import encode_object, decode_object
+from aocc.templates.config import data as config_data
+
+ROUNDS: int = 20_000
+
+CASES: dict = {
+    'config': config_data,
+    'account': {
+        'id': '5b0c3a8e-6f1d-4c8e-9a43-2f1e0b7d9c11',
+        'user': {'name': 'user'},
+        'token': {
+            'access': {'data': 'x' * 800, 'request_time': 1718000000.25},
+            'refresh': {'data': 'y' * 800, 'request_time': 1718000000.25}
+        },
+        'server': {'host': 'cloud.example.org', 'ip': None, 'version': None}
+    },
+    'file list': {'files': [{'path': f'/home/user/sync/documents/{i}.odt', 'size': i * 1024, 'mtime': 1718000000.5 + i, 'hash': bytes(32)} for i in range(1000)]},
+}
+
+
+def bench_case(name: str, obj: any) -> None:
+    rounds: int = ROUNDS if name != 'file list' else ROUNDS // 100
+    pickled: bytes = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    encoded: bytes = encode_object(obj)
+    assert decode_object(encoded) == obj
+    pickle_dump: float = timeit(lambda: pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL), number=rounds) / rounds
+    pickle_load: float = timeit(lambda: pickle.loads(pickled), number=rounds) / rounds
+    codec_dump: float = timeit(lambda: encode_object(obj), number=rounds) / rounds
+    codec_load: float = timeit(lambda: decode_object(encoded), number=rounds) / rounds
+    legacy_load: float = timeit(lambda: decode_object(pickled, legacy=True), number=rounds) / rounds
+    print(f'{name:>10}: size pickle {len(pickled):>7} B  codec {len(encoded):>7} B | '
+          f'encode pickle {pickle_dump * 1e6:9.2f} us  codec {codec_dump * 1e6:9.2f} us | '
+          f'decode pickle {pickle_load * 1e6:9.2f} us  codec {codec_load * 1e6:9.2f} us  legacy {legacy_load * 1e6:9.2f} us')
+
+
+if __name__ == '__main__':
+    for name, obj in CASES.items():
+        bench_case(name=name, obj=obj)
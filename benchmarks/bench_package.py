@@ -0,0 +1,32 @@
+# Aufruf aus dem Projektverzeichnis: python -m benchmarks.bench_package
+import pickle
+from timeit import timeit
+from aocc.src.package import Package
+
+ROUNDS: int = 50_000
+
+CASES: dict = {
+    'no payload': None,
+    'small dict': {'file': '/home/user/sync/documents/report.odt', 'exists': True},
+    '4 KiB bytes': b'x' * 4096,
+    '1 MiB bytes': b'x' * (1024 * 1024),
+}
+
+
+def bench_case(name: str, payload: any) -> None:
+    package: Package = Package(sender='FileService', recipent='SyncService', package_type='response', package_id='Yq3#p0W!vB9sLk2@', subject='get_file_data', code=200, payload=payload)
+    rounds: int = ROUNDS if payload is None or len(payload) < 100_000 else 500
+    pickled: bytes = pickle.dumps(package)
+    encoded: bytes = package.to_bytes()
+    pickle_dump: float = timeit(lambda: pickle.dumps(package), number=rounds) / rounds
+    pickle_load: float = timeit(lambda: pickle.loads(pickled), number=rounds) / rounds
+    wire_dump: float = timeit(lambda: package.to_bytes(), number=rounds) / rounds
+    wire_load: float = timeit(lambda: Package.from_bytes(encoded), number=rounds) / rounds
+    print(f'{name:>12}: size pickle {len(pickled):>8} B  wire {len(encoded):>8} B | '
+          f'encode pickle {pickle_dump * 1e6:8.2f} us  wire {wire_dump * 1e6:8.2f} us | '
+          f'decode pickle {pickle_load * 1e6:8.2f} us  wire {wire_load * 1e6:8.2f} us')
+
+
+if __name__ == '__main__':
+    for name, payload in CASES.items():
+        bench_case(name=name, payload=payload)
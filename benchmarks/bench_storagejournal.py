@@ -0,0 +1,48 @@
+# Aufruf aus dem Projektverzeichnis: python -m benchmarks.bench_storagejournal
+import os
+import tempfile
+from time import perf_counter
+from aocc.src.dottedstorage import DottedStorage
+from aocc.src.fileobject import FileObject
+from aocc.src.objectcodec import encode_object
+
+ROUNDS: int = 500
+
+
+def build_data(entries: int) -> dict:
+    data: dict = {
+        'token': {'access': {'data': 'x' * 800, 'request_time': 0.0}, 'refresh': {'data': 'y' * 800, 'request_time': 0.0}},
+        'user': {'name': 'user'}
+    }
+    data['files'] = {f'file{i}': {'path': f'/home/user/sync/{i}.odt', 'size': i} for i in range(entries)}
+    return data
+
+
+def bench(entries: int, sync: bool) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        rewrite_file: FileObject = FileObject(path=os.path.join(directory, 'rewrite.cfg'))
+        rewrite: DottedStorage = DottedStorage(data=build_data(entries=entries))
+        started: float = perf_counter()
+        for i in range(ROUNDS):
+            rewrite.set('token.access.request_time', float(i))
+            # bisher: den ganzen Baum neu schreiben
+            rewrite_file.write_bytes(data=encode_object(obj=rewrite.get_data()), sync=sync)
+        rewrite_time: float = (perf_counter() - started) / ROUNDS
+        rewrite_bytes: int = rewrite_file.size()
+
+        journaled: DottedStorage = DottedStorage(data=build_data(entries=entries))
+        journaled.dump_to_file(os.path.join(directory, 'journal.cfg'), journal_options={'sync': sync, 'compact_size': 1 << 30})
+        started: float = perf_counter()
+        for i in range(ROUNDS):
+            journaled.set('token.access.request_time', float(i))
+        journal_time: float = (perf_counter() - started) / ROUNDS
+        record_bytes: float = (journaled.journal.journalSize - 12) / ROUNDS
+        journaled.close()
+        print(f'{entries:>6} entries sync={sync!s:>5}: rewrite {rewrite_time * 1e6:9.1f} us ({rewrite_bytes:>8} B) | '
+              f'journal {journal_time * 1e6:9.1f} us ({record_bytes:5.0f} B per set)')
+
+
+if __name__ == '__main__':
+    for entries in (0, 100, 10_000):
+        for sync in (False, True):
+            bench(entries=entries, sync=sync)
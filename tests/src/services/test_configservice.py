@@ -0,0 +1,141 @@
+import threading
+import pathlib
+import pytest
+from multiprocessing import Pipe
+
+from aocc.src.services.configservice import ConfigService
+from aocc.src.services.routerservice import RouterService
+from aocc.src.service import Service
+
+
+def connect(router: RouterService, name: str) -> tuple:
+    service_in, router_out = Pipe(duplex=False)
+    router_in, service_out = Pipe(duplex=False)
+    assert router.add_connection_pair(name=name, conn_in=router_in, conn_out=router_out)
+    return service_in, service_out
+
+
+@pytest.fixture
+def bus(tmp_path: pathlib.Path):
+    router = RouterService(name='RouterService')
+    router.start()
+    conn_in, conn_out = connect(router=router, name='ConfigService')
+    config = ConfigService(conn_in=conn_in, conn_out=conn_out, config_file=str(tmp_path / 'client_config.cfg'), block=False)
+    with config._lock:
+        config._config.set_many({'language.default': 'en', 'language.selected': 'en', 'sync.interval': 5})
+    yield router, config
+    config.stop()
+    router.stop()
+
+
+def wait_for(condition: callable, timeout: float = 5.0) -> bool:
+    event = threading.Event()
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return True
+        event.wait(0.01)
+    return condition()
+
+
+def test_watching_service_receives_only_changed_keys(bus):
+    router, config = bus
+    diffs = []
+    conn_in, conn_out = connect(router=router, name='Watcher')
+    watcher = Service(name='Watcher', conn_in=conn_in, conn_out=conn_out, config_watch=['language.*'], config_callback=diffs.append)
+    conn_in, conn_out = connect(router=router, name='Admin')
+    admin = Service(name='Admin', conn_in=conn_in, conn_out=conn_out, config_required=False)
+    watcher.start()
+    admin.start()
+    try:
+        assert watcher._config.get('language.default') == 'en'
+        assert wait_for(lambda: diffs[:1] == [{'changed': {'language.default': 'en', 'language.selected': 'en'}, 'removed': []}])
+        response = admin.request(recipient='ConfigService', subject='set_config', payload={'values': {'language.selected': 'de', 'sync.interval': 10}}, timeout=5.0).result()
+        assert response.StatusCode == 200
+        assert wait_for(lambda: len(diffs) == 2)
+        assert diffs[1] == {'changed': {'language.selected': 'de'}, 'removed': []}
+        assert watcher._config.get('language.selected') == 'de'
+        # not watched, so not pushed
+        assert watcher._config.get('sync.interval') == 5
+        admin.request(recipient='ConfigService', subject='set_config', payload={'removed': ['language.default']}, timeout=5.0).result()
+        assert wait_for(lambda: len(diffs) == 3)
+        assert diffs[2] == {'changed': {}, 'removed': ['language.default']}
+        assert watcher._config.get('language') == {'selected': 'de'}
+        assert admin.request(recipient='ConfigService', subject='get_config', timeout=5.0).result().Payload == {'language': {'selected': 'de'}, 'sync': {'interval': 10}}
+    finally:
+        watcher.stop()
+        admin.stop()
+
+
+def test_pushes_keep_their_order(bus):
+    router, config = bus
+    conn_in, conn_out = connect(router=router, name='Watcher')
+    watcher = Service(name='Watcher', conn_in=conn_in, conn_out=conn_out, config_watch=['sync'])
+    watcher.start()
+    try:
+        for i in range(200):
+            with config._lock:
+                config._config.set('sync.interval', i)
+        assert wait_for(lambda: watcher._config.get('sync.interval') == 199)
+    finally:
+        watcher.stop()
+
+
+def test_broken_config_changed_is_dropped(bus):
+    router, config = bus
+    conn_in, conn_out = connect(router=router, name='Watcher')
+    watcher = Service(name='Watcher', conn_in=conn_in, conn_out=conn_out, config_watch=['sync'])
+    watcher.start()
+    try:
+        config._push(name='Watcher', diff=None)
+        config._push(name='Watcher', diff={'changed': 'not a dict'})
+        with config._lock:
+            config._config.set('sync.interval', 42)
+        assert wait_for(lambda: watcher._config.get('sync.interval') == 42)
+        assert all(thread.is_alive() for thread in watcher._connection_handler._threads)
+    finally:
+        watcher.stop()
+
+
+def test_unwatch_and_vanished_subscriber(bus):
+    router, config = bus
+    conn_in, conn_out = connect(router=router, name='Watcher')
+    watcher = Service(name='Watcher', conn_in=conn_in, conn_out=conn_out, config_watch=['*'])
+    watcher.start()
+    assert list(config._subscribers) == ['Watcher']
+    assert watcher.request(recipient='ConfigService', subject='unwatch_config', timeout=5.0).result().Payload == {'removed': True}
+    assert config._subscribers == {}
+    assert watcher.request(recipient='ConfigService', subject='watch_config', payload={'prefixes': ['sync']}, timeout=5.0).result().Payload == {'prefixes': ['sync'], 'keys': 1}
+    watcher.stop()
+    router.del_connection_pair(name='Watcher')
+    with config._lock:
+        config._config.set('sync.interval', 1)
+    # the router answers unknown_receipent, the subscription is dropped
+    assert wait_for(lambda: config._subscribers == {})
+
+
+def test_wrong_payloads(bus):
+    router, config = bus
+    conn_in, conn_out = connect(router=router, name='Admin')
+    admin = Service(name='Admin', conn_in=conn_in, conn_out=conn_out, config_required=False)
+    admin.start()
+    try:
+        assert admin.request(recipient='ConfigService', subject='set_config', timeout=5.0).result().StatusCode == 501
+        assert admin.request(recipient='ConfigService', subject='set_config', payload=['x'], timeout=5.0).result().StatusCode == 502
+        assert admin.request(recipient='ConfigService', subject='watch_config', payload={'prefixes': [1]}, timeout=5.0).result().StatusCode == 502
+        assert admin.request(recipient='ConfigService', subject='set_config', payload={'values': {'bad': object()}}, timeout=5.0).result().StatusCode == 500
+    finally:
+        admin.stop()
+
+
+def test_config_survives_restart(tmp_path: pathlib.Path):
+    config_file = str(tmp_path / 'client_config.cfg')
+    conn_in, _ = Pipe(duplex=False)
+    _, conn_out = Pipe(duplex=False)
+    config = ConfigService(conn_in=conn_in, conn_out=conn_out, config_file=config_file, block=False)
+    config._config.set('language.default', 'de')
+    config.stop()
+    conn_in, _ = Pipe(duplex=False)
+    _, conn_out = Pipe(duplex=False)
+    config = ConfigService(conn_in=conn_in, conn_out=conn_out, config_file=config_file, block=False)
+    assert config._config.get('language.default') == 'de'
+    config.stop()
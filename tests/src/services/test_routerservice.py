@@ -0,0 +1,132 @@
+import threading
+import pytest
+from multiprocessing import Pipe
+
+from aocc.src.services.routerservice import RouterService
+from aocc.src.package import Package
+
+
+class ServiceEnd:
+    '''Gegenstück eines Service: schreibt zum Router und liest vom Router'''
+
+    def __init__(self, router: RouterService, name: str) -> None:
+        router_in, self.writer = Pipe(duplex=False)
+        self.reader, router_out = Pipe(duplex=False)
+        assert router.add_connection_pair(name=name, conn_in=router_in, conn_out=router_out)
+        self.name = name
+
+    def send(self, recipent: str, subject: str = 'ping') -> None:
+        self.writer.send_bytes(Package(sender=self.name, recipent=recipent, package_type='request', package_id=subject, subject=subject).to_bytes())
+
+    def recv(self, timeout: float = 1.0) -> Package:
+        assert self.reader.poll(timeout)
+        return Package.from_bytes(self.reader.recv_bytes())
+
+
+@pytest.fixture
+def router():
+    router = RouterService(name='RouterService')
+    router.start()
+    yield router
+    router.stop()
+
+
+def test_routes_package_to_receipent(router):
+    a = ServiceEnd(router, 'A')
+    b = ServiceEnd(router, 'B')
+    a.send(recipent='B')
+    package = b.recv()
+    assert package.Sender == 'A'
+    assert package.Subject == 'ping'
+
+
+def test_unknown_receipent_answers_sender(router):
+    a = ServiceEnd(router, 'A')
+    a.send(recipent='Nobody', subject='lost')
+    package = a.recv()
+    assert package.Subject == 'unknown_receipent'
+    assert package.StatusCode == 404
+    assert package.PackageID == 'lost'
+    assert package.Payload.Receipent == 'Nobody'
+
+
+def test_connection_added_while_running(router):
+    a = ServiceEnd(router, 'A')
+    a.send(recipent='A', subject='first')
+    assert a.recv().Subject == 'first'
+    late = ServiceEnd(router, 'Late')
+    late.send(recipent='A', subject='late')
+    assert a.recv().Subject == 'late'
+
+
+def test_duplicate_and_missing_names(router):
+    # Referenz halten, sonst schließt die Garbage Collection die Pipe und der Router entfernt 'A'
+    a = ServiceEnd(router, 'A')
+    conn_in, conn_out = Pipe(duplex=False)
+    assert not router.add_connection_pair(name='A', conn_in=conn_in, conn_out=conn_out)
+    assert router.del_connection_pair(name='A')
+    assert not router.del_connection_pair(name='A')
+
+
+def test_closed_service_is_removed(router):
+    a = ServiceEnd(router, 'A')
+    a.writer.close()
+    for _ in range(100):
+        if 'A' not in router._get_services_names():
+            break
+        threading.Event().wait(0.01)
+    assert 'A' not in router._get_services_names()
+
+
+def test_many_services_single_thread(router):
+    ends = [ServiceEnd(router, f'S{i}') for i in range(40)]
+    before = threading.active_count()
+    for i, end in enumerate(ends):
+        end.send(recipent=f'S{(i + 1) % len(ends)}', subject=f'm{i}')
+    for i, end in enumerate(ends):
+        assert end.recv().Subject == f'm{(i - 1) % len(ends)}'
+    assert threading.active_count() == before
+
+
+def test_stop_is_idempotent():
+    router = RouterService(name='RouterService')
+    router.start()
+    assert router.isRunning
+    router.stop()
+    router.stop()
+    assert not router.isRunning
+
+
+def test_batch_is_regrouped_per_receipent(router):
+    a = ServiceEnd(router, 'A')
+    b = ServiceEnd(router, 'B')
+    c = ServiceEnd(router, 'C')
+    frames = [Package(sender='A', recipent=recipent, package_type='request', package_id=str(i), subject=str(i)).to_bytes()
+              for i, recipent in enumerate(['B', 'C', 'B', 'Nobody', 'C'])]
+    a.writer.send_bytes(Package.pack_batch(frames))
+    assert b.reader.poll(1.0)
+    assert [Package.from_bytes(f).Subject for f in Package.split_frame(b.reader.recv_bytes())] == ['0', '2']
+    assert c.reader.poll(1.0)
+    assert [Package.from_bytes(f).Subject for f in Package.split_frame(c.reader.recv_bytes())] == ['1', '4']
+    assert a.recv().Subject == 'unknown_receipent'
+
+
+def test_stalled_receiver_does_not_block_routing(router):
+    a = ServiceEnd(router, 'A')
+    b = ServiceEnd(router, 'B')
+    stuck = ServiceEnd(router, 'Stuck')
+    # Stuck liest nie, der Pipe-Puffer ist nach wenigen Frames voll
+    for i in range(20):
+        a.writer.send_bytes(Package(sender='A', recipent='Stuck', package_type='response', package_id=str(i), subject='get_file_data', payload=b'x' * 65536).to_bytes())
+    a.send(recipent='B', subject='after')
+    assert b.recv(timeout=2.0).Subject == 'after'
+    received = [Package.from_bytes(stuck.reader.recv_bytes()).PackageID for _ in range(20)]
+    assert received == [str(i) for i in range(20)]
+
+
+def test_routing_errors_are_logged(router, caplog):
+    a = ServiceEnd(router, 'A')
+    a.writer.send_bytes(b'garbage')
+    a.send(recipent='A', subject='after')
+    assert a.recv().Subject == 'after'
+    assert 'can\'t be routed' in caplog.text
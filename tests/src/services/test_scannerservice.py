@@ -0,0 +1,45 @@
+import os
+import pathlib
+import threading
+from multiprocessing import Pipe
+
+from aocc.src.services.scannerservice import ScannerService
+from aocc.src.service import Service
+from aocc.src.package import Package
+
+
+def test_scan_directory_sends_change_batches(tmp_path: pathlib.Path):
+    root = tmp_path / 'root'
+    root.mkdir()
+    for i in range(25):
+        (root / f'{i}.txt').write_bytes(b'x')
+    batches = list()
+    received = threading.Event()
+
+    def on_request(package: Package) -> None:
+        if package.Subject == 'directory_changes':
+            batches.append(package)
+            if sum(len(batch.Payload['changes']) for batch in batches) == 25:
+                received.set()
+
+    client_in, scanner_out = Pipe(duplex=False)
+    scanner_in, client_out = Pipe(duplex=False)
+    scanner = ScannerService(conn_in=scanner_in, conn_out=scanner_out, index_path=str(tmp_path / 'file_index.db'), block=False, batch_size=10)
+    client = Service(name='Client', conn_in=client_in, conn_out=client_out, request_callback=on_request, config_required=False)
+    client.start()
+    try:
+        response = client.request(recipient='ScannerService', subject='scan_directory', payload={'root': str(root)}, timeout=5.0).result()
+        assert response.StatusCode == 200
+        assert response.Payload['added'] == 25
+        assert received.wait(timeout=5.0)
+        assert [len(batch.Payload['changes']) for batch in batches] == [10, 10, 5]
+        assert all(batch.Payload['scan'] == response.PackageID and batch.Priority == response.Priority == Package.PRIORITY_NORMAL for batch in batches)
+        again = client.request(recipient='ScannerService', subject='scan_directory', payload={'root': str(root)}, timeout=5.0).result()
+        assert again.Payload['files'] == 25 and again.Payload['added'] == 0
+        assert client.request(recipient='ScannerService', subject='scan_directory', payload={}, timeout=5.0).result().StatusCode == 502
+        missing = client.request(recipient='ScannerService', subject='scan_directory', payload={'root': str(tmp_path / 'missing')}, timeout=5.0).result()
+        assert missing.StatusCode == 500
+        assert scanner._index.count(prefix=str(root) + os.sep) == 25
+    finally:
+        client.stop()
+        scanner.stop()
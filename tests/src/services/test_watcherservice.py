@@ -0,0 +1,108 @@
+import sys
+import pathlib
+import threading
+import pytest
+from multiprocessing import Pipe
+
+from aocc.src.services.watcherservice import WatcherService
+from aocc.src.service import Service
+from aocc.src.package import Package
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith('linux'), reason='inotify is only available on Linux')
+
+
+@pytest.fixture
+def services(tmp_path: pathlib.Path):
+    received = list()
+    event = threading.Event()
+
+    def on_request(package: Package) -> None:
+        if package.Subject == 'directory_changes':
+            received.append(package)
+            event.set()
+
+    client_in, watcher_out = Pipe(duplex=False)
+    watcher_in, client_out = Pipe(duplex=False)
+    watcher = WatcherService(conn_in=watcher_in, conn_out=watcher_out, index_path=str(tmp_path / 'file_index.db'), block=False, debounce=0.1)
+    client = Service(name='Client', conn_in=client_in, conn_out=client_out, request_callback=on_request, config_required=False)
+    client.start()
+    yield client, watcher, received, event
+    client.stop()
+    watcher.stop()
+
+
+def request(client: Service, subject: str, payload: dict) -> Package:
+    return client.request(recipient='WatcherService', subject=subject, payload=payload, timeout=5.0).result()
+
+
+def test_watch_directory_forwards_changes(services, tmp_path: pathlib.Path):
+    client, watcher, received, event = services
+    root = tmp_path / 'root'
+    root.mkdir()
+    response = request(client, 'watch_directory', {'root': str(root)})
+    assert response.StatusCode == 200 and response.Payload['watches'] == 1
+    (root / 'a.txt').write_bytes(b'a')
+    assert event.wait(timeout=5.0)
+    assert [change['type'] for change in received[0].Payload['changes']] == ['added']
+    assert received[0].Payload['root'] == str(root)
+    assert watcher._index.get(str(root / 'a.txt')).size == 1
+    assert request(client, 'unwatch_directory', {'root': str(root)}).Payload['was_watching'] is True
+    assert request(client, 'watch_directory', {'root': str(tmp_path / 'missing')}).StatusCode == 500
+
+
+def test_overflow_is_resolved_by_scan(services, tmp_path: pathlib.Path):
+    client, watcher, received, event = services
+    root = tmp_path / 'root'
+    root.mkdir()
+    request(client, 'watch_directory', {'root': str(root)})
+    (root / 'lost.txt').write_bytes(b'lost')
+    watcher._forward_changes(root=str(root), changes=[{'type': 'rescan', 'path': str(root)}])
+    assert event.wait(timeout=5.0)
+    changes = [change for package in received for change in package.Payload['changes']]
+    assert {'rescan'} != {change['type'] for change in changes}
+    assert ('added', str(root / 'lost.txt')) in {(change['type'], change['path']) for change in changes}
+
+
+def test_rescan_of_missing_directory_is_forwarded(services, tmp_path: pathlib.Path):
+    client, watcher, received, event = services
+    root = tmp_path / 'root'
+    root.mkdir()
+    (root / 'kept.txt').write_bytes(b'kept')
+    request(client, 'watch_directory', {'root': str(root)})
+    watcher._forward_changes(root=str(root), changes=[{'type': 'rescan', 'path': str(root)}])
+    assert event.wait(timeout=5.0)
+    event.clear()
+    received.clear()
+    watcher._forward_changes(root=str(root), changes=[{'type': 'rescan', 'path': str(tmp_path / 'missing')}])
+    assert event.wait(timeout=5.0)
+    assert received[0].Payload['changes'] == [{'type': 'rescan', 'path': str(tmp_path / 'missing')}]
+    assert watcher._index.get(str(root / 'kept.txt')) is not None
+
+
+def test_every_subscriber_gets_changes(services, tmp_path: pathlib.Path, monkeypatch):
+    client, watcher, received, event = services
+    root = tmp_path / 'root'
+    root.mkdir()
+    sent = list()
+    send_package = watcher.send_package
+
+    def record(package: Package) -> None:
+        if package.Subject == 'directory_changes':
+            sent.append(package.Receipent)
+        send_package(package=package)
+
+    monkeypatch.setattr(watcher, 'send_package', record)
+    request(client, 'watch_directory', {'root': str(root)})
+    watcher._watch(root=str(root), subscriber='Other')
+    watcher._forward_changes(root=str(root), changes=[{'type': 'added', 'path': str(root / 'a.txt')}])
+    assert sorted(sent) == ['Client', 'Other']
+    assert event.wait(timeout=5.0)
+    # der andere Abonnent bleibt, wenn Client sich abmeldet
+    assert request(client, 'unwatch_directory', {'root': str(root)}).Payload['was_watching'] is True
+    assert str(root) in watcher._watchers
+    sent.clear()
+    watcher._forward_changes(root=str(root), changes=[{'type': 'added', 'path': str(root / 'b.txt')}])
+    assert sent == ['Other']
+    assert request(client, 'unwatch_directory', {'root': str(root)}).Payload['was_watching'] is False
+    assert watcher._unwatch(root=str(root), subscriber='Other') is True
+    assert str(root) not in watcher._watchers
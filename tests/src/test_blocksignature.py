@@ -0,0 +1,83 @@
+import os
+import zlib
+import pathlib
+import pytest
+
+from aocc.src.blocksignature import roll_checksum, compute_signature, compute_delta, compute_delta_bytes, apply_delta, delta_size
+
+
+BLOCK_SIZE = 1024
+
+
+def test_roll_checksum_matches_adler32():
+    data = os.urandom(4000)
+    checksum = zlib.adler32(data[:BLOCK_SIZE])
+    for position in range(len(data) - BLOCK_SIZE):
+        checksum = roll_checksum(checksum, data[position], data[position + BLOCK_SIZE], BLOCK_SIZE)
+        assert checksum == zlib.adler32(data[position + 1:position + 1 + BLOCK_SIZE])
+
+
+def test_signature_layout(tmp_path: pathlib.Path):
+    path = tmp_path / 'basis.bin'
+    path.write_bytes(os.urandom(3 * BLOCK_SIZE + 10))
+    signature = compute_signature(path=str(path), block_size=BLOCK_SIZE)
+    assert signature['block_size'] == BLOCK_SIZE
+    assert signature['size'] == 3 * BLOCK_SIZE + 10
+    assert len(signature['weak']) == 4 * 4
+    assert len(signature['strong']) == 4 * 16
+
+
+def edit(content: bytes) -> bytes:
+    return content[:50_000] + b'changed' + content[50_007:]
+
+
+def insert(content: bytes) -> bytes:
+    return content[:30_000] + b'inserted bytes' + content[30_000:]
+
+
+def append(content: bytes) -> bytes:
+    return content + b'appended'
+
+
+def truncate(content: bytes) -> bytes:
+    return content[:-100]
+
+
+@pytest.mark.parametrize('change', [edit, insert, append, truncate])
+def test_small_change_gives_small_delta(tmp_path: pathlib.Path, change):
+    content = os.urandom(200_000 + 123)
+    basis = tmp_path / 'basis.bin'
+    basis.write_bytes(content)
+    changed = tmp_path / 'changed.bin'
+    changed.write_bytes(change(content))
+    delta = compute_delta(path=str(changed), signature=compute_signature(path=str(basis), block_size=BLOCK_SIZE))
+    assert delta_size(delta) <= 2 * BLOCK_SIZE + 20
+    target = tmp_path / 'target.bin'
+    assert apply_delta(basis=str(basis), delta=delta, target=str(target)) == len(change(content))
+    assert target.read_bytes() == change(content)
+
+
+@pytest.mark.parametrize('basis_size,new_size', [(0, 0), (0, 5000), (5000, 0), (BLOCK_SIZE, BLOCK_SIZE)])
+def test_edge_sizes(tmp_path: pathlib.Path, basis_size: int, new_size: int):
+    basis = tmp_path / 'basis.bin'
+    basis.write_bytes(os.urandom(basis_size))
+    content = os.urandom(new_size)
+    delta = compute_delta_bytes(data=content, signature=compute_signature(path=str(basis), block_size=BLOCK_SIZE))
+    target = tmp_path / 'target.bin'
+    apply_delta(basis=str(basis), delta=delta, target=str(target))
+    assert target.read_bytes() == content
+
+
+def test_identical_file_is_single_copy(tmp_path: pathlib.Path):
+    basis = tmp_path / 'basis.bin'
+    basis.write_bytes(os.urandom(10 * BLOCK_SIZE + 1))
+    delta = compute_delta(path=str(basis), signature=compute_signature(path=str(basis), block_size=BLOCK_SIZE))
+    assert delta['instructions'] == [('copy', 0, 11)]
+
+
+def test_apply_rejects_blocks_outside_basis(tmp_path: pathlib.Path):
+    basis = tmp_path / 'basis.bin'
+    basis.write_bytes(b'x' * BLOCK_SIZE)
+    delta = {'block_size': BLOCK_SIZE, 'size': 2 * BLOCK_SIZE, 'instructions': [('copy', 1, 1)]}
+    with pytest.raises(Exception):
+        apply_delta(basis=str(basis), delta=delta, target=str(tmp_path / 'target.bin'))
@@ -0,0 +1,76 @@
+import asyncio
+import threading
+import time
+import pytest
+
+from aocc.src.boxhandler import BoxHandler
+from aocc.src.package import Package
+
+
+def make_package(i: int = 0) -> Package:
+    return Package(sender='a', recipent='b', package_type='request', package_id=str(i), subject='test')
+
+
+@pytest.fixture
+def handler() -> BoxHandler:
+    handler = BoxHandler(direction='in')
+    handler.addBox(name='inbox')
+    return handler
+
+
+def test_add_and_get(handler):
+    assert handler.add_package_to_box(name='inbox', package=make_package(1))
+    assert handler.get_package_from_box(name='inbox').PackageID == '1'
+
+
+def test_unknown_box_raises(handler):
+    with pytest.raises(Exception, match='not found'):
+        handler.add_package_to_box(name='missing', package=make_package())
+    with pytest.raises(Exception, match='not found'):
+        handler.get_package_from_box(name='missing')
+
+
+def test_del_box(handler):
+    assert handler.delBox(name='inbox')
+    with pytest.raises(Exception):
+        handler.get_package_from_box(name='inbox')
+
+
+def test_get_with_timeout(handler):
+    start = time.perf_counter()
+    with pytest.raises(Exception):
+        handler.get_package_from_box(name='inbox', block=True, timeout=0.05)
+    assert time.perf_counter() - start >= 0.04
+
+
+def test_operations_start_no_threads(handler):
+    before = threading.active_count()
+    for i in range(100):
+        handler.add_package_to_box(name='inbox', package=make_package(i))
+        handler.get_package_from_box(name='inbox')
+    assert threading.active_count() == before
+
+
+def test_async_get_waits_for_other_thread(handler):
+    async def consume():
+        threading.Timer(0.05, handler.add_package_to_box, kwargs={'name': 'inbox', 'package': make_package(5)}).start()
+        return await handler.get_package_from_box_async(name='inbox', timeout=1.0)
+    assert asyncio.run(consume()).PackageID == '5'
+
+
+def test_async_get_timeout(handler):
+    async def consume():
+        return await handler.get_package_from_box_async(name='inbox', timeout=0.05)
+    with pytest.raises(Exception, match='No Data'):
+        asyncio.run(consume())
+    assert len(handler._get_box(name='inbox')._async_waiters) == 0
+
+
+def test_async_many_consumers(handler):
+    async def consume_all():
+        consumers = [handler.get_package_from_box_async(name='inbox', timeout=1.0) for _ in range(10)]
+        for i in range(10):
+            handler.add_package_to_box(name='inbox', package=make_package(i))
+        return await asyncio.gather(*consumers)
+    packages = asyncio.run(consume_all())
+    assert sorted(int(p.PackageID) for p in packages) == list(range(10))
@@ -0,0 +1,120 @@
+import os
+import sys
+import pathlib
+import threading
+import pytest
+
+from aocc.src.changewatcher import ChangeWatcher
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith('linux'), reason='inotify is only available on Linux')
+
+
+class Collector:
+
+    def __init__(self) -> None:
+        self.batches = list()
+        self.event = threading.Event()
+
+    def __call__(self, changes: list) -> None:
+        self.batches.append(changes)
+        self.event.set()
+
+    def wait(self, timeout: float = 5.0) -> list:
+        assert self.event.wait(timeout=timeout)
+        self.event.clear()
+        return self.batches[-1]
+
+
+@pytest.fixture
+def watched(tmp_path: pathlib.Path):
+    root = tmp_path / 'root'
+    (root / 'sub').mkdir(parents=True)
+    (root / 'sub' / 'existing.txt').write_bytes(b'existing')
+    collector = Collector()
+    watcher = ChangeWatcher(root=str(root), emit=collector, debounce=0.1, max_delay=1.0)
+    watcher.start()
+    yield root, collector, watcher
+    watcher.stop()
+
+
+def kinds(changes: list, root: pathlib.Path) -> set:
+    return {(change['type'], os.path.relpath(change['path'], root)) for change in changes}
+
+
+def test_watches_existing_tree(watched):
+    _, _, watcher = watched
+    assert watcher.watchCount == 2
+
+
+def test_editor_save_collapses_to_one_modified(watched):
+    root, collector, _ = watched
+    target = root / 'sub' / 'existing.txt'
+    # vim: Original wegschieben, neu schreiben, Backup löschen
+    target.rename(root / 'sub' / 'existing.txt~')
+    target.write_bytes(b'new content')
+    (root / 'sub' / 'existing.txt~').unlink()
+    changes = collector.wait()
+    assert kinds(changes, root) == {('modified', 'sub/existing.txt')}
+    assert changes[0]['size'] == len(b'new content')
+
+
+def test_atomic_replace_and_temp_files(watched):
+    root, collector, _ = watched
+    temp = root / '.new.tmp'
+    temp.write_bytes(b'data')
+    temp.rename(root / 'new.txt')
+    scratch = root / 'scratch'
+    scratch.write_bytes(b'x')
+    scratch.unlink()
+    assert kinds(collector.wait(), root) == {('added', 'new.txt')}
+
+
+def test_move_and_delete(watched):
+    root, collector, _ = watched
+    (root / 'sub' / 'existing.txt').rename(root / 'moved.txt')
+    changes = collector.wait()
+    assert kinds(changes, root) == {('moved', 'moved.txt')}
+    assert changes[0]['from'] == str(root / 'sub' / 'existing.txt')
+    (root / 'moved.txt').unlink()
+    assert kinds(collector.wait(), root) == {('deleted', 'moved.txt')}
+
+
+def test_new_directory_tree_is_watched(watched):
+    root, collector, watcher = watched
+    nested = root / 'a' / 'b'
+    nested.mkdir(parents=True)
+    (nested / 'file.txt').write_bytes(b'x')
+    assert ('added', 'a/b/file.txt') in kinds(collector.wait(), root)
+    assert watcher.watchCount == 4
+    (nested / 'late.txt').write_bytes(b'y')
+    assert kinds(collector.wait(), root) == {('added', 'a/b/late.txt')}
+
+
+def test_directory_moved_out_and_renamed(watched, tmp_path: pathlib.Path):
+    root, collector, watcher = watched
+    (root / 'sub').rename(root / 'renamed')
+    assert kinds(collector.wait(), root) == {('moved', 'renamed')}
+    (root / 'renamed' / 'after.txt').write_bytes(b'z')
+    assert kinds(collector.wait(), root) == {('added', 'renamed/after.txt')}
+    (root / 'renamed').rename(tmp_path / 'outside')
+    assert kinds(collector.wait(), root) == {('deleted', 'renamed')}
+    assert watcher.watchCount == 1
+
+
+def test_burst_is_one_batch(watched):
+    root, collector, _ = watched
+    for i in range(200):
+        (root / f'{i}.txt').write_bytes(b'x')
+    for i in range(100):
+        (root / f'{i}.txt').unlink()
+    changes = collector.wait()
+    assert len(collector.batches) == 1
+    assert len(changes) == 100 and all(change['type'] == 'added' for change in changes)
+
+
+def test_overflow_requests_rescan(watched):
+    root, collector, watcher = watched
+    watcher._overflow = True
+    (root / 'trigger.txt').write_bytes(b'x')
+    changes = collector.wait()
+    assert changes[0] == {'type': 'rescan', 'path': str(root)}
@@ -0,0 +1,258 @@
+import time
+import pytest
+from multiprocessing import Pipe
+from threading import Thread, Event
+
+from aocc.src.connectionhandler import ConnectionHandler
+from aocc.src.package import Package
+from aocc.src.sharedpayload import SharedBuffer
+
+
+def make_package(subject: str = 'ping') -> Package:
+    return Package(sender='a', recipent='b', package_type='request', package_id='1', subject=subject)
+
+
+@pytest.fixture
+def handler_pair():
+    a_in, b_out = Pipe(duplex=False)
+    b_in, a_out = Pipe(duplex=False)
+    received = []
+    event = Event()
+
+    def callback(package):
+        received.append(package)
+        event.set()
+
+    handler_a = ConnectionHandler(conn_in=a_in, conn_out=a_out)
+    handler_b = ConnectionHandler(conn_in=b_in, conn_out=b_out, package_callback=callback)
+    handler_a.start()
+    handler_b.start()
+    yield handler_a, handler_b, received, event
+    handler_a.stop()
+    handler_b.stop()
+
+
+def test_package_reaches_callback(handler_pair):
+    handler_a, _, received, event = handler_pair
+    handler_a.send_package(package=make_package())
+    assert event.wait(timeout=1.0)
+    assert received[0].Subject == 'ping'
+
+
+def test_get_package_blocks_until_arrival(handler_pair):
+    handler_a, handler_b, _, _ = handler_pair
+    assert handler_a.get_package() is None
+    handler_b.send_package(package=make_package(subject='pong'))
+    package = handler_a.get_package(block=True, timeout=1.0)
+    assert package.Subject == 'pong'
+
+
+def test_get_package_timeout_returns_none(handler_pair):
+    handler_a, _, _, _ = handler_pair
+    start = time.perf_counter()
+    assert handler_a.get_package(block=True, timeout=0.05) is None
+    assert time.perf_counter() - start >= 0.04
+
+
+def test_stop_joins_threads_quickly():
+    conn_in, conn_out = Pipe(duplex=False)
+    handler = ConnectionHandler(conn_in=conn_in, conn_out=conn_out, package_callback=lambda package: None, auto_start=True)
+    threads = list(handler._threads)
+    start = time.perf_counter()
+    handler.stop()
+    assert time.perf_counter() - start < 0.5
+    assert not handler.isRunning
+    assert all(not thread.is_alive() for thread in threads)
+
+
+def test_restart_after_stop():
+    conn_in, conn_out = Pipe(duplex=False)
+    received = Event()
+    handler = ConnectionHandler(conn_in=conn_in, conn_out=conn_out, package_callback=lambda package: received.set())
+    handler.start()
+    handler.stop()
+    handler.start()
+    handler.send_package(package=make_package())
+    assert received.wait(timeout=1.0)
+    handler.stop()
+
+
+def test_closed_peer_ends_receiver():
+    conn_in, peer = Pipe(duplex=False)
+    _, conn_out = Pipe(duplex=False)
+    handler = ConnectionHandler(conn_in=conn_in, conn_out=conn_out, auto_start=True)
+    peer.close()
+    handler._threads[0].join(timeout=1.0)
+    assert not handler._threads[0].is_alive()
+    handler.stop()
+
+
+def test_send_packages_is_one_frame():
+    conn_in, conn_out = Pipe(duplex=False)
+    handler = ConnectionHandler(conn_in=Pipe(duplex=False)[0], conn_out=conn_out, auto_start=True)
+    handler.send_packages(packages=[make_package(subject=str(i)) for i in range(5)])
+    assert conn_in.poll(1.0)
+    frames = Package.split_frame(conn_in.recv_bytes())
+    assert [Package.from_bytes(frame).Subject for frame in frames] == ['0', '1', '2', '3', '4']
+    assert not conn_in.poll(0.05)
+    handler.stop()
+
+
+def test_batched_frames_are_split_on_receive():
+    conn_in, conn_out = Pipe(duplex=False)
+    received = []
+    done = Event()
+
+    def callback(package):
+        received.append(package.Subject)
+        if len(received) == 3:
+            done.set()
+
+    handler = ConnectionHandler(conn_in=conn_in, conn_out=Pipe(duplex=False)[1], package_callback=callback, auto_start=True)
+    conn_out.send_bytes(Package.pack_batch([make_package(subject=s).to_bytes() for s in ('a', 'b', 'c')]))
+    assert done.wait(timeout=1.0)
+    assert received == ['a', 'b', 'c']
+    handler.stop()
+
+
+@pytest.mark.parametrize('batch_window', [0.0, 0.05], ids=['adaptive', 'window'])
+def test_batch_mode_coalesces_queued_packages(batch_window):
+    conn_in, conn_out = Pipe(duplex=False)
+    handler = ConnectionHandler(conn_in=Pipe(duplex=False)[0], conn_out=conn_out, batch=True, batch_window=batch_window, batch_max_packages=10)
+    for i in range(25):
+        handler.send_package(package=make_package(subject=str(i)))
+    handler.start()
+    sizes = []
+    subjects = []
+    while len(subjects) < 25:
+        assert conn_in.poll(1.0)
+        frames = Package.split_frame(conn_in.recv_bytes())
+        sizes.append(len(frames))
+        subjects.extend(Package.from_bytes(frame).Subject for frame in frames)
+    assert subjects == [str(i) for i in range(25)]
+    assert sizes == [10, 10, 5]
+    handler.stop()
+
+
+def test_batch_mode_flushes_on_stop():
+    conn_in, conn_out = Pipe(duplex=False)
+    handler = ConnectionHandler(conn_in=Pipe(duplex=False)[0], conn_out=conn_out, batch=True, batch_window=10.0, auto_start=True)
+    handler.send_package(package=make_package(subject='last'))
+    time.sleep(0.02)
+    handler.stop()
+    assert conn_in.poll(0.5)
+    frames = Package.split_frame(conn_in.recv_bytes())
+    assert Package.from_bytes(frames[0]).Subject == 'last'
+
+
+def test_control_package_overtakes_queued_bulk():
+    conn_in, conn_out = Pipe(duplex=False)
+    handler = ConnectionHandler(conn_in=Pipe(duplex=False)[0], conn_out=conn_out)
+    for i in range(50):
+        handler.send_package(package=Package(sender='a', recipent='b', package_type='response', package_id=str(i), subject='get_file_data', payload=b'x' * 65536, priority=Package.PRIORITY_BULK))
+    handler.send_package(package=make_package(subject='stop'))
+    handler.start()
+    assert conn_in.poll(1.0)
+    assert Package.from_bytes(conn_in.recv_bytes()).Subject == 'stop'
+    # niemand liest den restlichen Bulk-Verkehr, ohne Leser bricht der Sendethread beim Stoppen ab
+    conn_in.close()
+    handler.stop()
+
+
+def test_stop_sends_queued_packages():
+    conn_in, conn_out = Pipe(duplex=False)
+    handler = ConnectionHandler(conn_in=Pipe(duplex=False)[0], conn_out=conn_out, auto_start=True)
+    subjects = []
+
+    def read():
+        while len(subjects) < 2000 and conn_in.poll(2.0):
+            subjects.extend(Package.from_bytes(frame).Subject for frame in Package.split_frame(conn_in.recv_bytes()))
+
+    reader = Thread(target=read)
+    reader.start()
+    for i in range(2000):
+        handler.send_package(package=make_package(subject=str(i)))
+    handler.stop(timeout=5.0, flush_timeout=5.0)
+    reader.join(timeout=5.0)
+    assert subjects == [str(i) for i in range(2000)]
+
+
+def test_stop_does_not_wait_for_queued_bulk():
+    conn_in, conn_out = Pipe(duplex=False)
+    handler = ConnectionHandler(conn_in=Pipe(duplex=False)[0], conn_out=conn_out, auto_start=True)
+    received = []
+
+    def read():
+        while conn_in.poll(0.5):
+            received.append(conn_in.recv_bytes())
+
+    reader = Thread(target=read)
+    reader.start()
+    for i in range(2000):
+        handler.send_package(package=Package(sender='a', recipent='b', package_type='response', package_id=str(i), subject='get_file_data', payload=b'x' * 65536, priority=Package.PRIORITY_BULK))
+    start = time.perf_counter()
+    handler.stop(flush_timeout=0.05)
+    assert time.perf_counter() - start < 0.5
+    assert handler.packagesOutEmpty
+    reader.join(timeout=5.0)
+    assert len(received) < 2000
+
+
+def test_restart_waits_for_blocked_sender():
+    conn_in, conn_out = Pipe(duplex=False)
+    handler = ConnectionHandler(conn_in=Pipe(duplex=False)[0], conn_out=conn_out, auto_start=True)
+    # ohne Leser blockiert der Sendethread, sobald der Pipe-Puffer voll ist
+    for i in range(10):
+        handler.send_package(package=Package(sender='a', recipent='b', package_type='response', package_id=str(i), subject='get_file_data', payload=b'x' * 65536, priority=Package.PRIORITY_BULK))
+    time.sleep(0.05)
+    handler.stop(timeout=0.05)
+    with pytest.raises(Exception, match='still stopping'):
+        handler.start()
+    conn_in.close()
+    for thread in list(handler._threads):
+        thread.join(timeout=1.0)
+    handler.start()
+    handler.stop()
+
+
+def test_undecodable_frames_are_dropped():
+    conn_in, writer = Pipe(duplex=False)
+    _, conn_out = Pipe(duplex=False)
+    received = []
+    event = Event()
+
+    def callback(package):
+        received.append(package)
+        event.set()
+
+    handler = ConnectionHandler(conn_in=conn_in, conn_out=conn_out, package_callback=callback)
+    handler.start()
+    try:
+        writer.send_bytes(b'garbage')
+        writer.send_bytes(b'AP\x63' + b'\x00' * 40)
+        writer.send_bytes(Package.pack_batch([b'broken', make_package(subject='in batch').to_bytes()]))
+        # Shared-Memory-Segment ist beim Entpacken schon weg
+        buffer = SharedBuffer.create(data=b'x' * 100)
+        frame = Package(sender='a', recipent='b', package_type='request', package_id='1', subject='gone', payload=buffer).to_bytes()
+        buffer.release()
+        writer.send_bytes(frame)
+        writer.send_bytes(make_package(subject='after').to_bytes())
+        deadline = time.perf_counter() + 2.0
+        while len(received) < 2 and time.perf_counter() < deadline:
+            time.sleep(0.005)
+        assert [package.Subject for package in received] == ['in batch', 'after']
+        assert handler._threads[0].is_alive()
+    finally:
+        handler.stop()
+
+
+def test_unencodable_package_is_dropped(handler_pair):
+    handler_a, _, received, event = handler_pair
+    unencodable = Package(sender='a', recipent='b', package_type='request', package_id='1', subject='bad', payload={'f': lambda: None})
+    handler_a.send_packages(packages=[unencodable, make_package(subject='same frame')])
+    handler_a.send_package(package=unencodable)
+    handler_a.send_package(package=make_package(subject='next'))
+    deadline = time.perf_counter() + 2.0
+    while len(received) < 2 and time.perf_counter() < deadline:
+        time.sleep(0.005)
+    assert [package.Subject for package in received] == ['same frame', 'next']
@@ -4,6 +4,7 @@ import string
 
 from cryptography.fernet import InvalidToken
 from aocc.src.cryptoobject import CryptoObject
+from aocc.src.objectcodec import encode_object
 
 
 def test_encrypt_decrypt_simple_objects():
@@ -13,13 +14,23 @@ def test_encrypt_decrypt_simple_objects():
     for obj in [123, "string", [1, 2, 3], {"a": 1, "b": [2, 3]}]:
         encrypted = co.encrypt_object(obj)
         assert isinstance(encrypted, bytes)
-        # encrypted should not contain plaintext pickle bytes
-        assert pickle.dumps(obj) not in encrypted
+        # encrypted should not contain the plaintext encoding
+        assert encode_object(obj) not in encrypted
 
         decrypted = co.decrypt_object(encrypted)
         assert decrypted == obj
 
 
+def test_decrypt_object_reads_legacy_pickle():
+    co = CryptoObject(salt="testsalt", password="testpass")
+    obj = {"token": {"access": {"data": "abc", "request_time": 1.5}}}
+    legacy = co._fernet_object.encrypt(pickle.dumps(obj))
+    assert co.decrypt_object(legacy) == obj
+    # pickled classes are refused instead of being executed
+    with pytest.raises(pickle.UnpicklingError):
+        co.decrypt_object(co._fernet_object.encrypt(pickle.dumps(CryptoObject)))
+
+
 def test_decrypt_with_wrong_key_raises():
     salt = "testsalt"
     co1 = CryptoObject(salt=salt, password="pass1")
@@ -87,3 +98,124 @@ def test_shuffle_string_time_sleep_monkeypatched(monkeypatch):
     # Expect sleep called for i=0,1,2
     assert sleep_calls == [0.0, 1/100000, 2/100000]
     assert sorted(result) == sorted("xyz")
+
+
+@pytest.fixture
+def counted_derivations(monkeypatch):
+    CryptoObject.clear_key_cache()
+    calls = []
+    original = CryptoObject._derive_key
+
+    def derive_key(salt: bytes, password: bytes) -> bytes:
+        calls.append((salt, password))
+        return original(salt=salt, password=password)
+
+    monkeypatch.setattr(CryptoObject, '_derive_key', staticmethod(derive_key))
+    yield calls
+    CryptoObject.clear_key_cache()
+
+
+def test_key_derivation_is_cached(counted_derivations):
+    enc = CryptoObject(salt="cachesalt", password="pw").encrypt_object({"a": 1})
+    assert CryptoObject(salt="cachesalt", password="pw").decrypt_object(enc) == {"a": 1}
+    assert len(counted_derivations) == 1
+    CryptoObject(salt="cachesalt", password="other")
+    CryptoObject(salt="cachesalt", password="pw", cache=False)
+    assert len(counted_derivations) == 3
+
+
+def test_evict_cached_key(counted_derivations):
+    CryptoObject(salt="evictsalt", password="pw")
+    assert CryptoObject.evict_cached_key(salt="evictsalt", password="pw") is True
+    assert CryptoObject.evict_cached_key(salt="evictsalt", password="pw") is False
+    CryptoObject(salt="evictsalt", password="pw")
+    assert len(counted_derivations) == 2
+
+
+def test_cache_ttl_lru_and_zeroing(monkeypatch):
+    from aocc.src import cryptoobject
+    now = [100.0]
+    monkeypatch.setattr(cryptoobject, 'monotonic', lambda: now[0])
+    cache = cryptoobject.DerivedKeyCache(ttl=10.0, max_entries=2)
+    keys = {}
+
+    def derive(name: bytes):
+        def run() -> bytes:
+            return name * 4
+        return run
+
+    assert cache.get_or_derive(b's', b'a', 1, derive(b'a')) == b'aaaa'
+    keys['a'] = cache._entries[cache.fingerprint(b's', b'a', 1)][0]
+    cache.get_or_derive(b's', b'b', 1, derive(b'b'))
+    cache.get_or_derive(b's', b'a', 1, lambda: pytest.fail('cached key derived again'))
+    cache.get_or_derive(b's', b'c', 1, derive(b'c'))
+    # b war am längsten unbenutzt
+    assert cache.length == 2
+    assert cache.fingerprint(b's', b'b', 1) not in cache._entries
+    now[0] += 11.0
+    cache.get_or_derive(b's', b'd', 1, derive(b'd'))
+    assert cache.length == 1
+    assert keys['a'] == bytearray(4)
+    assert cache.fingerprint(b's', b'a', 1) != cache.fingerprint(b's', b'a', 2)
+
+
+@pytest.mark.parametrize('size', [0, 1, 100, 4096, 4096 * 3, 4096 * 3 + 7], ids=['empty', 'one', 'small', 'one_chunk', 'exact_chunks', 'partial_chunk'])
+def test_stream_round_trip(size: int):
+    import io
+    import os
+    co = CryptoObject(salt="streamsalt", password="pw")
+    plain = os.urandom(size)
+    encrypted = io.BytesIO()
+    written = co.encrypt_stream(io.BytesIO(plain), encrypted, chunk_size=4096)
+    chunks = max(1, -(-size // 4096))
+    assert written == len(encrypted.getvalue()) == 16 + size + 16 * chunks
+    assert size < 16 or plain[:64] not in encrypted.getvalue()
+    decrypted = io.BytesIO()
+    assert co.decrypt_stream(io.BytesIO(encrypted.getvalue()), decrypted) == size
+    assert decrypted.getvalue() == plain
+
+
+def test_stream_detects_tampering():
+    import io
+    import os
+    from cryptography.exceptions import InvalidTag
+    co = CryptoObject(salt="streamsalt", password="pw")
+    encrypted = io.BytesIO()
+    co.encrypt_stream(io.BytesIO(os.urandom(3 * 1024)), encrypted, chunk_size=1024)
+    data = encrypted.getvalue()
+    chunk = 1024 + 16
+    flipped = bytearray(data)
+    flipped[20] ^= 1
+    truncated = data[:16 + 2 * chunk]
+    reordered = data[:16] + data[16 + chunk:16 + 2 * chunk] + data[16:16 + chunk] + data[16 + 2 * chunk:]
+    for broken in (bytes(flipped), truncated, reordered, data[:16]):
+        with pytest.raises((InvalidTag, Exception)):
+            co.decrypt_stream(io.BytesIO(broken), io.BytesIO())
+    with pytest.raises(InvalidTag):
+        co.decrypt_stream(io.BytesIO(truncated), io.BytesIO())
+    with pytest.raises(InvalidTag):
+        CryptoObject(salt="streamsalt", password="other").decrypt_stream(io.BytesIO(data), io.BytesIO())
+    with pytest.raises(Exception, match='not an encrypted stream'):
+        co.decrypt_stream(io.BytesIO(b'x' * 32), io.BytesIO())
+    with pytest.raises(Exception):
+        co.encrypt_stream(io.BytesIO(b''), io.BytesIO(), chunk_size=0)
+
+
+def test_stream_reads_short_reads():
+    import io
+
+    class Trickle(io.RawIOBase):
+        def __init__(self, data: bytes) -> None:
+            self.data = data
+
+        def read(self, size: int = -1) -> bytes:
+            step = min(7, size)
+            part, self.data = self.data[:step], self.data[step:]
+            return part
+
+    co = CryptoObject(salt="streamsalt", password="pw")
+    encrypted = io.BytesIO()
+    co.encrypt_stream(Trickle(b'a' * 1000), encrypted, chunk_size=64)
+    decrypted = io.BytesIO()
+    co.decrypt_stream(Trickle(encrypted.getvalue()), decrypted)
+    assert decrypted.getvalue() == b'a' * 1000
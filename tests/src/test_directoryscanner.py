@@ -0,0 +1,111 @@
+import os
+import pathlib
+import pytest
+
+from aocc.src.directoryscanner import DirectoryScanner
+from aocc.src.fileindex import FileIndex
+
+
+@pytest.fixture
+def index(tmp_path: pathlib.Path):
+    file_index = FileIndex(path=str(tmp_path / 'file_index.db'))
+    yield file_index
+    file_index.close()
+
+
+@pytest.fixture
+def root(tmp_path: pathlib.Path) -> pathlib.Path:
+    root = tmp_path / 'root'
+    for directory in range(5):
+        for file in range(20):
+            path = root / f'dir_{directory}' / 'sub' / f'file_{file}.txt'
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(f'{directory}/{file}'.encode())
+    return root
+
+
+def scan(scanner: DirectoryScanner, root: pathlib.Path) -> tuple:
+    batches = list()
+    summary = scanner.scan(root=str(root), emit=batches.append)
+    changes = {(change['type'], change['path']): change for batch in batches for change in batch}
+    return summary, changes, batches
+
+
+def test_first_scan_adds_everything(index: FileIndex, root: pathlib.Path):
+    summary, changes, batches = scan(DirectoryScanner(index=index, max_workers=4, batch_size=30), root)
+    assert summary['files'] == summary['added'] == len(changes) == 100
+    assert all(len(batch) <= 30 for batch in batches)
+    assert index.count(prefix=str(root) + os.sep) == 100
+
+
+def test_unchanged_tree_has_no_changes(index: FileIndex, root: pathlib.Path):
+    scanner = DirectoryScanner(index=index)
+    scan(scanner, root)
+    summary, changes, batches = scan(scanner, root)
+    assert summary['files'] == 100
+    assert changes == {} and batches == []
+
+
+def test_change_set(index: FileIndex, root: pathlib.Path):
+    scanner = DirectoryScanner(index=index)
+    scan(scanner, root)
+    (root / 'dir_0' / 'sub' / 'file_0.txt').write_bytes(b'modified content')
+    (root / 'dir_1' / 'sub' / 'file_0.txt').unlink()
+    (root / 'dir_2' / 'sub' / 'file_0.txt').rename(root / 'dir_3' / 'moved.txt')
+    (root / 'new.txt').write_bytes(b'new')
+    summary, changes, _ = scan(scanner, root)
+    assert set(changes) == {
+        ('modified', str(root / 'dir_0' / 'sub' / 'file_0.txt')),
+        ('deleted', str(root / 'dir_1' / 'sub' / 'file_0.txt')),
+        ('moved', str(root / 'dir_3' / 'moved.txt')),
+        ('added', str(root / 'new.txt')),
+    }
+    assert changes[('moved', str(root / 'dir_3' / 'moved.txt'))]['from'] == str(root / 'dir_2' / 'sub' / 'file_0.txt')
+    assert (summary['added'], summary['modified'], summary['deleted'], summary['moved']) == (1, 1, 1, 1)
+    assert scan(scanner, root)[1] == {}
+
+
+def test_without_index_update(index: FileIndex, root: pathlib.Path):
+    scanner = DirectoryScanner(index=index)
+    assert scanner.scan(root=str(root), emit=lambda changes: None, update_index=False)['added'] == 100
+    assert index.count() == 0
+
+
+def test_unreadable_directory_is_not_deleted(index: FileIndex, root: pathlib.Path, monkeypatch):
+    scanner = DirectoryScanner(index=index)
+    scan(scanner, root)
+    scandir = os.scandir
+
+    def locked_scandir(path):
+        if path == str(root / 'dir_4'):
+            raise PermissionError(path)
+        return scandir(path)
+
+    monkeypatch.setattr(os, 'scandir', locked_scandir)
+    summary, changes, _ = scan(scanner, root)
+    assert summary['files'] == 80
+    assert summary['deleted'] == 0 and changes == {}
+    assert index.count() == 100
+
+
+@pytest.mark.parametrize('missing', ['gone', 'file'])
+def test_missing_root_keeps_index(index: FileIndex, root: pathlib.Path, tmp_path: pathlib.Path, missing: str):
+    scanner = DirectoryScanner(index=index)
+    scan(scanner, root)
+    moved = tmp_path / 'moved'
+    root.rename(moved)
+    if missing == 'file':
+        root.write_bytes(b'no directory')
+    batches = list()
+    with pytest.raises(Exception, match='is not a directory'):
+        scanner.scan(root=str(root), emit=batches.append)
+    assert batches == []
+    assert index.count(prefix=str(root) + os.sep) == 100
+    # ein fehlendes Unterverzeichnis gilt weiterhin als gelöscht
+    if missing == 'gone':
+        moved.rename(root)
+        for path in (root / 'dir_0' / 'sub').iterdir():
+            path.unlink()
+        (root / 'dir_0' / 'sub').rmdir()
+        summary, _, _ = scan(scanner, root)
+        assert summary['deleted'] == 20
@@ -136,3 +136,201 @@ def test_modified_flag_on_setitem_and_set():
     ds.reset_modified()
     ds['b.c'] = 2
     assert ds.modified
+
+
+def test_get_many_and_set_many():
+    ds = DottedStorage()
+    ds.set_many({'a.b': 1, 'a.c': 2, 'd': 3})
+    ds.set_many([('e.f', 4)])
+    assert ds.get_many(['a.b', 'a.c', 'd', 'e.f', 'x.y'], default=0) == {'a.b': 1, 'a.c': 2, 'd': 3, 'e.f': 4, 'x.y': 0}
+    assert ds.modified
+
+
+def test_compiled_paths_are_cached_and_bounded(monkeypatch):
+    monkeypatch.setattr(DottedStorage, '_paths', dict())
+    monkeypatch.setattr(DottedStorage, '_paths_limit', 3)
+    ds = DottedStorage()
+    ds.set('a.b.c', 1)
+    assert DottedStorage._paths == {'a.b.c': (('a', 'b'), 'c')}
+    for key in ('k1', 'k2', 'k3', 'k4'):
+        ds.get(key)
+    assert len(DottedStorage._paths) <= 3
+    assert ds.get('a.b.c') == 1
+
+
+def test_index_follows_load_and_set():
+    ds = DottedStorage({'language': {'default': 'de', 'list': ['de', 'en']}, 'dotted.key': 1}, index=True)
+    assert ds.indexed
+    assert ds.get('language.default') == 'de'
+    assert ds.get('language') == {'default': 'de', 'list': ['de', 'en']}
+    # unreachable by dotted key, in the index as well as without it
+    assert ds.get('dotted.key') is None
+    ds.set('language', {'fallback': 'en'})
+    assert ds.get('language.default') is None
+    assert ds.get('language.fallback') == 'en'
+    ds.set('language.fallback.x', 1)
+    assert ds.get('language.fallback') == {'x': 1}
+    assert ds.get('language.fallback.x') == 1
+    # direct changes need a rebuild
+    ds.get_data()['new'] = True
+    assert ds.get('new') is None
+    ds.rebuild_index()
+    assert ds.get('new') is True
+
+
+def test_index_matches_plain_storage():
+    import random
+    rng = random.Random(7)
+    plain = DottedStorage()
+    indexed = DottedStorage(index=True)
+    names = ['a', 'b', 'c', '']
+    keys = ['.'.join(rng.choice(names) for _ in range(rng.randint(1, 4))) for _ in range(60)]
+    for _ in range(2000):
+        key = rng.choice(keys)
+        value = rng.choice([1, 'x', None, {}, {'a': {'b': 2}}, {'c': 3, 'x.y': 4}])
+        if isinstance(value, dict):
+            # deep copies, otherwise both storages share the same nested dicts
+            value = pickle.loads(pickle.dumps(value))
+            plain.set(key, value)
+            indexed.set(key, pickle.loads(pickle.dumps(value)))
+        else:
+            plain.set(key, value)
+            indexed.set(key, value)
+        assert plain.get_data() == indexed.get_data()
+    for key in keys + ['a.b.c.a.b', 'missing']:
+        assert indexed.get(key, 'default') == plain.get(key, 'default'), key
+    expected = dict(DottedStorage._flatten(data=indexed.get_data()))
+    assert indexed._index == expected
+
+
+def test_dump_to_file_and_reopen(tmp_path):
+    path = str(tmp_path / 'config.cfg')
+    ds = DottedStorage({'language': {'default': 'en'}})
+    ds.dump_to_file(path)
+    ds.set('language.selected', 'de')
+    ds.set_many({'token.access.data': 'abc', 'token.access.request_time': 1.5})
+    assert ds.journal.recordCount == 2
+    ds.close()
+    reopened = DottedStorage(file=path, index=True)
+    assert reopened.loaded
+    assert reopened.get_many(['language.default', 'language.selected', 'token.access.request_time']) == {
+        'language.default': 'en', 'language.selected': 'de', 'token.access.request_time': 1.5
+    }
+    # dumping to the same file compacts the journal
+    reopened.dump_to_file(path)
+    assert reopened.journal.recordCount == 0
+    reopened.close()
+    assert DottedStorage(file=path).get('token.access.data') == 'abc'
+
+
+def test_set_with_unencodable_value_changes_nothing(tmp_path):
+    path = str(tmp_path / 'config.cfg')
+    ds = DottedStorage(file=path)
+    ds.set('a', 1)
+    with pytest.raises(Exception, match="can't be encoded"):
+        ds.set('a', object())
+    assert ds.get('a') == 1
+    ds.close()
+    assert DottedStorage(file=path).get('a') == 1
+
+
+def test_open_file_keeps_loaded_data(tmp_path):
+    path = str(tmp_path / 'config.cfg')
+    DottedStorage({'old': 1}).dump_to_file(path)
+    ds = DottedStorage({'new': 2}, file=path)
+    assert ds.get_data() == {'new': 2}
+    ds.close()
+    assert DottedStorage(file=path).get_data() == {'new': 2}
+
+
+def test_background_compaction(tmp_path):
+    path = str(tmp_path / 'config.cfg')
+    ds = DottedStorage(file=path, journal_options={'sync': False, 'compact_size': 512})
+    for i in range(200):
+        ds.set(f'counter.{i % 7}', i)
+    ds.close()
+    assert ds.journal is None
+    reopened = DottedStorage(file=path)
+    assert reopened.get('counter') == {str(i % 7): i for i in range(193, 200)}
+    assert reopened.journal.journalSize < 512 + 64
+    reopened.close()
+
+
+def test_watch_delivers_minimal_diff():
+    ds = DottedStorage({'language': {'default': 'en', 'selected': 'en'}, 'sync': {'interval': 5}})
+    diffs = []
+    other = []
+    ds.watch('language.*', diffs.append)
+    ds.watch(['sync', 'missing'], other.append)
+    ds.set('language.selected', 'de')
+    assert diffs == [{'changed': {'language.selected': 'de'}, 'removed': []}]
+    # unchanged values and other prefixes are not delivered
+    ds.set('language', {'default': 'en', 'selected': 'de', 'fallback': 'en'})
+    assert diffs[-1] == {'changed': {'language.fallback': 'en'}, 'removed': []}
+    ds.set('language', {'default': 'fr'})
+    assert diffs[-1] == {'changed': {'language.default': 'fr'}, 'removed': ['language.selected', 'language.fallback']}
+    ds.set('language.default', 'fr')
+    assert len(diffs) == 3
+    assert other == []
+    ds.set_many({'sync.interval': 10, 'sync.retries': 3, 'language.default': 'it'})
+    assert other == [{'changed': {'sync.interval': 10, 'sync.retries': 3}, 'removed': []}]
+    assert diffs[-1] == {'changed': {'language.default': 'it'}, 'removed': []}
+
+
+def test_watch_replacing_scalars_and_subtrees():
+    ds = DottedStorage({'x': 5, 'y': {'a': 1}})
+    diffs = []
+    ds.watch('*', diffs.append)
+    ds.set('x.y', 1)
+    assert diffs[-1] == {'changed': {'x.y': 1}, 'removed': ['x']}
+    ds.set('y', 2)
+    assert diffs[-1] == {'changed': {'y': 2}, 'removed': ['y.a']}
+    ds.set('y', 2.0)
+    assert diffs[-1] == {'changed': {'y': 2.0}, 'removed': []}
+    assert ds.delete('x.y')
+    assert diffs[-1] == {'changed': {}, 'removed': ['x.y']}
+    assert ds.get('x') == {}
+    assert not ds.delete('x.y')
+    assert len(diffs) == 4
+
+
+def test_apply_diff_reproduces_changes():
+    source = DottedStorage({'a': {'b': 1, 'c': {'d': 2}}, 'e': 3})
+    mirror = DottedStorage(pickle.loads(pickle.dumps(source.get_data())), index=True)
+    source.watch('*', mirror.apply_diff)
+    source.set('a.c', 7)
+    source.set('e.f.g', [1, 2])
+    source.set_many({'a.b': None, 'h': {'i': {}}})
+    source.delete('a.b')
+    source.set('a', {'x': {'y': 1}})
+    assert mirror.get_data() == source.get_data()
+    assert mirror.get('a.x.y') == 1 and mirror.get('a.c') is None
+
+
+def test_unwatch_and_failing_watcher():
+    ds = DottedStorage()
+    diffs = []
+
+    def broken(diff):
+        raise RuntimeError('broken watcher')
+
+    ds.watch('a', broken)
+    watch_id = ds.watch('a', diffs.append)
+    ds.set('a', 1)
+    assert diffs == [{'changed': {'a': 1}, 'removed': []}]
+    assert ds.unwatch(watch_id)
+    assert not ds.unwatch(watch_id)
+    ds.set('a', 2)
+    assert len(diffs) == 1
+    assert ds.leaves(['a', 'missing']) == {'a': 2}
+
+
+def test_delete_is_journaled(tmp_path):
+    path = str(tmp_path / 'config.cfg')
+    ds = DottedStorage({'a': {'b': 1, 'c': 2}}, index=True)
+    ds.dump_to_file(path)
+    assert ds.delete('a.b')
+    assert ds.get('a.b') is None and ds.get('a') == {'c': 2}
+    ds.apply_diff({'changed': {'d': 4}, 'removed': ['a.c']})
+    ds.close()
+    assert DottedStorage(file=path).get_data() == {'a': {}, 'd': 4}
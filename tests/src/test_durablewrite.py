@@ -0,0 +1,99 @@
+import os
+import stat
+import pathlib
+import threading
+import pytest
+
+from aocc.src import durablewrite
+from aocc.src.durablewrite import atomic_write, GroupCommitWriter
+
+
+def temp_files(directory: pathlib.Path) -> list:
+    return [path.name for path in directory.iterdir() if path.name.endswith('.tmp')]
+
+
+def test_atomic_write_replaces_and_keeps_mode(tmp_path: pathlib.Path):
+    path = tmp_path / 'data.bin'
+    path.write_bytes(b'old content')
+    path.chmod(0o640)
+    assert atomic_write(path=str(path), data=memoryview(b'new')) == 3
+    assert path.read_bytes() == b'new'
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+    assert temp_files(tmp_path) == []
+
+
+def test_atomic_write_failure_keeps_old_file(tmp_path: pathlib.Path):
+    target = tmp_path / 'dir'
+    target.mkdir()
+    with pytest.raises(OSError):
+        atomic_write(path=str(target), data=b'data')
+    with pytest.raises(TypeError):
+        atomic_write(path=str(tmp_path / 'file'), data='text')
+    assert temp_files(tmp_path) == []
+    assert not (tmp_path / 'file').exists()
+
+
+@pytest.fixture
+def writer():
+    group_writer = GroupCommitWriter(max_batch=64)
+    group_writer.start()
+    yield group_writer
+    group_writer.stop()
+
+
+def test_group_commit_batches_concurrent_writes(writer: GroupCommitWriter, tmp_path: pathlib.Path):
+    barrier = threading.Barrier(16)
+    errors = list()
+
+    def write(index: int) -> None:
+        barrier.wait()
+        try:
+            for round in range(10):
+                assert writer.write(path=str(tmp_path / f'{index}.bin'), data=f'{index}-{round}'.encode()) == len(f'{index}-{round}')
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert all((tmp_path / f'{i}.bin').read_bytes() == f'{i}-9'.encode() for i in range(16))
+    assert writer.commitCount < 160
+    assert temp_files(tmp_path) == []
+
+
+def test_group_commit_errors(writer: GroupCommitWriter, tmp_path: pathlib.Path):
+    with pytest.raises(FileNotFoundError):
+        writer.write(path=str(tmp_path / 'missing' / 'file'), data=b'x')
+    (tmp_path / 'dir').mkdir()
+    with pytest.raises(OSError):
+        writer.write(path=str(tmp_path / 'dir'), data=b'x')
+    assert temp_files(tmp_path) == []
+
+
+def test_stop_commits_pending_writes(tmp_path: pathlib.Path):
+    group_writer = GroupCommitWriter()
+    group_writer.start()
+    futures = [group_writer.submit(path=str(tmp_path / f'{i}.bin'), data=b'x') for i in range(20)]
+    group_writer.stop()
+    assert [future.result(timeout=1.0) for future in futures] == [1] * 20
+    with pytest.raises(Exception):
+        group_writer.submit(path=str(tmp_path / 'late.bin'), data=b'x')
+
+
+def test_stop_during_submit_fails_instead_of_hanging(tmp_path: pathlib.Path, monkeypatch):
+    group_writer = GroupCommitWriter()
+    group_writer.start()
+    write_all = durablewrite._write_all
+
+    def stop_while_writing(fd: int, data: bytes) -> int:
+        group_writer.stop()
+        return write_all(fd=fd, data=data)
+
+    monkeypatch.setattr(durablewrite, '_write_all', stop_while_writing)
+    with pytest.raises(Exception, match='not running'):
+        group_writer.submit(path=str(tmp_path / 'late.bin'), data=b'x')
+    assert temp_files(tmp_path) == []
+    assert not (tmp_path / 'late.bin').exists()
@@ -0,0 +1,69 @@
+import os
+import pathlib
+import pytest
+
+from aocc.src.fileindex import FileIndex, IndexEntry
+
+
+@pytest.fixture
+def index(tmp_path: pathlib.Path):
+    file_index = FileIndex(path=str(tmp_path / 'config' / 'file_index.db'))
+    yield file_index
+    file_index.close()
+
+
+def entry(path: str, size: int = 1) -> IndexEntry:
+    return IndexEntry(path, size, 1, 2, 0o100644, None)
+
+
+def test_upsert_and_get(index: FileIndex):
+    assert index.get('/a') is None
+    index.upsert(entry('/a'))
+    assert index.get('/a') == entry('/a')
+    index.upsert_many([entry('/a', size=5), entry('/b')])
+    assert index.get('/a').size == 5
+    assert index.count() == 2
+
+
+def test_prefix_queries(index: FileIndex, monkeypatch):
+    monkeypatch.setattr(FileIndex, '_fetch_size', 3)
+    paths = ['/data/a', '/data/b/c', '/data/b/d', '/data0', '/datb', '/dat', '/data/z', '/data/ä']
+    index.upsert_many([entry(path) for path in paths])
+    assert [e.path for e in index.iter_prefix('/data/')] == sorted(['/data/a', '/data/b/c', '/data/b/d', '/data/z', '/data/ä'])
+    assert index.count('/data/b/') == 2
+    assert len(list(index.iter_prefix())) == len(paths)
+    assert index.delete_prefix('/data/b/') == 2
+    assert index.count('/data/') == 3
+    assert index.delete_many(['/data0', '/missing']) == 1
+
+
+def test_persists_across_instances(tmp_path: pathlib.Path):
+    path = str(tmp_path / 'file_index.db')
+    with FileIndex(path=path) as index:
+        index.upsert(entry('/a'))
+    with FileIndex(path=path) as index:
+        assert index.get('/a') == entry('/a')
+
+
+def test_refresh_skips_unchanged_files(index: FileIndex, tmp_path: pathlib.Path, monkeypatch):
+    first = tmp_path / 'first.txt'
+    first.write_bytes(b'first')
+    second = tmp_path / 'second.txt'
+    second.write_bytes(b'second')
+    entries = index.refresh_many([str(first), str(second)])
+    assert entries[0].hash == FileIndex.hash_file(str(first))
+    assert index.is_unchanged(str(first))
+
+    hashed = list()
+    original = FileIndex.hash_file
+    monkeypatch.setattr(FileIndex, 'hash_file', staticmethod(lambda path, chunk_size=1 << 20: hashed.append(path) or original(path)))
+    second.write_bytes(b'changed second')
+    first_stat = os.stat(first)
+    index.refresh_many([str(first), str(second)])
+    assert hashed == [str(second)]
+    assert index.get(str(first)).mtime_ns == first_stat.st_mtime_ns
+
+    second.unlink()
+    assert index.refresh_many([str(first), str(second)])[0].path == str(first)
+    assert index.get(str(second)) is None
+    assert not index.is_unchanged(str(second))
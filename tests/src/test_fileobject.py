@@ -6,6 +6,7 @@ import pytest
 import pathlib
 from typing import Any, Dict, List, Optional, Tuple
 from aocc.src.fileobject import FileObject
+from aocc.src.objectcodec import decode_object, is_encoded
 
 
 def test_exists_and_is_file(tmp_path: pathlib.Path) -> None:
@@ -142,11 +143,12 @@ def test_write_and_read_object_param(tmp_path: pathlib.Path) -> None:
         assert fo.read_object() == expected
 
 
-def test_write_object_unpicklable_handles_attribute_error(tmp_path: pathlib.Path) -> None:
+def test_write_object_unencodable_raises(tmp_path: pathlib.Path) -> None:
     fo: FileObject = FileObject(str(tmp_path / "bad.pkl"))
-    # AttributeError from pickle.dumps on local functions
-    with pytest.raises((pickle.PicklingError, AttributeError)):
+    # the object codec only knows plain data types
+    with pytest.raises(Exception, match="can't be encoded"):
         fo.write_object(lambda z: z)
+    assert not fo.exists()
 
 
 def test_write_object_to_directory(tmp_path: pathlib.Path) -> None:
@@ -167,6 +169,34 @@ def test_read_object_with_extra_bytes_returns_obj(tmp_path: pathlib.Path) -> Non
     assert fo.read_object() == obj
 
 
+def test_read_object_migrates_pickle_once(tmp_path: pathlib.Path) -> None:
+    path: pathlib.Path = tmp_path / "legacy.pkl"
+    obj: Dict[str, Any] = {"language": {"default": "de"}, "blob": b"\x00\x01", "ids": [1, 2.5, None]}
+    path.write_bytes(pickle.dumps(obj))
+    fo: FileObject = FileObject(str(path))
+    assert fo.read_object() == obj
+    # the file has been rewritten in the new format
+    assert is_encoded(path.read_bytes())
+    assert decode_object(path.read_bytes()) == obj
+    assert fo.read_object() == obj
+
+
+def test_read_object_without_migration_keeps_pickle(tmp_path: pathlib.Path) -> None:
+    path: pathlib.Path = tmp_path / "legacy.pkl"
+    data: bytes = pickle.dumps([1, 2])
+    path.write_bytes(data)
+    assert FileObject(str(path)).read_object(migrate=False) == [1, 2]
+    assert path.read_bytes() == data
+
+
+def test_read_object_rejects_pickled_classes(tmp_path: pathlib.Path) -> None:
+    path: pathlib.Path = tmp_path / "evil.pkl"
+    data: bytes = pickle.dumps(pathlib.PurePosixPath("/etc"))
+    path.write_bytes(data)
+    assert FileObject(str(path)).read_object() is None
+    assert path.read_bytes() == data
+
+
 def test_read_bytes_large_file(tmp_path: pathlib.Path) -> None:
     path: pathlib.Path = tmp_path / "large.bin"
     content: bytes = os.urandom(2_000_000)
@@ -206,3 +236,51 @@ def test_unicode_filename(tmp_path: pathlib.Path) -> None:
     data: bytes = "hällo".encode('utf-8')
     fo.write_bytes(data)
     assert fo.read_bytes() == data
+
+
+@pytest.mark.parametrize(
+    "offset, length",
+    [(0, 10), (0, 0), (5, 100), (65536 - 3, 10), (70000, 1), (199_999, 5), (200_000, 5), (-1, 5)],
+    ids=["start", "zero_length", "short", "across_granularity", "after_granularity", "last_byte", "at_end", "negative"]
+)
+def test_read_range(tmp_path: pathlib.Path, offset: int, length: int) -> None:
+    path: pathlib.Path = tmp_path / "range.bin"
+    content: bytes = os.urandom(200_000)
+    path.write_bytes(content)
+    fo: FileObject = FileObject(str(path))
+    expected: bytes = content[offset:offset + length] if offset >= 0 and length > 0 else b""
+    assert fo.read_range(offset, length) == expected
+
+
+def test_read_range_missing_and_empty(tmp_path: pathlib.Path) -> None:
+    assert FileObject(str(tmp_path / "missing")).read_range(0, 10) == b""
+    empty: pathlib.Path = tmp_path / "empty"
+    empty.write_bytes(b"")
+    assert FileObject(str(empty)).read_range(0, 10) == b""
+
+
+@pytest.mark.parametrize("chunk_size", [1, 1000, 4096, 10_000], ids=["1", "1000", "4096", "larger_than_file"])
+def test_iter_chunks(tmp_path: pathlib.Path, chunk_size: int) -> None:
+    path: pathlib.Path = tmp_path / "chunks.bin"
+    content: bytes = os.urandom(5000)
+    path.write_bytes(content)
+    chunks: List[bytes] = list(FileObject(str(path)).iter_chunks(chunk_size))
+    assert b"".join(chunks) == content
+    assert all(len(chunk) <= chunk_size for chunk in chunks)
+
+
+def test_iter_chunks_edge_cases(tmp_path: pathlib.Path) -> None:
+    assert list(FileObject(str(tmp_path / "missing")).iter_chunks(10)) == []
+    empty: pathlib.Path = tmp_path / "empty"
+    empty.write_bytes(b"")
+    assert list(FileObject(str(empty)).iter_chunks(10)) == []
+    with pytest.raises(ValueError):
+        list(FileObject(str(empty)).iter_chunks(0))
+
+
+def test_size(tmp_path: pathlib.Path) -> None:
+    path: pathlib.Path = tmp_path / "sized.bin"
+    fo: FileObject = FileObject(str(path))
+    assert fo.size() == 0
+    path.write_bytes(b"12345")
+    assert fo.size() == 5
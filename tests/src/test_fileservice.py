@@ -0,0 +1,339 @@
+import os
+import pathlib
+import threading
+import time
+import pytest
+from multiprocessing import Pipe
+
+from aocc.src.fileservice import FileService
+from aocc.src.fileobject import FileObject
+from aocc.src.filestream import FileStream, FileStreams, download_file, upload_file
+from aocc.src.service import Service
+from aocc.src.package import Package
+
+
+@pytest.fixture
+def chunks():
+    return list()
+
+
+@pytest.fixture
+def services(chunks):
+    client_in, file_out = Pipe(duplex=False)
+    file_in, client_out = Pipe(duplex=False)
+    file_service = FileService(conn_in=file_in, conn_out=file_out, block=False)
+    client = Service(name='Client', conn_in=client_in, conn_out=client_out, request_callback=chunks.append, config_required=False)
+    client.start()
+    yield client, file_service
+    client.stop()
+    file_service.stop()
+
+
+def request(client: Service, subject: str, payload: dict) -> Package:
+    return client.request(recipient='FileService', subject=subject, payload=payload, timeout=5.0).result()
+
+
+def test_file_exists(services, tmp_path: pathlib.Path):
+    client, _ = services
+    path = tmp_path / 'a.txt'
+    path.write_bytes(b'a')
+    assert request(client, 'file_exists', {'file': str(path)}).Payload['exists'] is True
+    assert request(client, 'file_exists', {'file': str(tmp_path / 'b.txt')}).Payload['exists'] is False
+
+
+@pytest.mark.parametrize('size', [0, 1, 1000, 256 * 1024 + 17], ids=['empty', 'one_byte', 'small', 'many_chunks'])
+@pytest.mark.parametrize('window', [1, 4], ids=['window_1', 'window_4'])
+def test_download_stream(services, tmp_path: pathlib.Path, size: int, window: int):
+    client, _ = services
+    source = tmp_path / 'source.bin'
+    content = os.urandom(size)
+    source.write_bytes(content)
+    target = tmp_path / 'target.bin'
+    received = download_file(service=client, source=str(source), target=str(target), chunk_size=64 * 1024, window=window)
+    assert received == size
+    assert target.read_bytes() == content
+
+
+@pytest.mark.parametrize('size', [0, 300 * 1024 + 5], ids=['empty', 'many_chunks'])
+def test_upload_stream(services, tmp_path: pathlib.Path, size: int):
+    client, _ = services
+    source = tmp_path / 'source.bin'
+    content = os.urandom(size)
+    source.write_bytes(content)
+    target = tmp_path / 'uploaded.bin'
+    assert upload_file(service=client, source=str(source), target=str(target), chunk_size=64 * 1024, window=3) == size
+    assert target.read_bytes() == content
+
+
+def test_chunk_size_is_capped(services, tmp_path: pathlib.Path):
+    client, file_service = services
+    source = tmp_path / 'source.bin'
+    source.write_bytes(b'x' * 10)
+    opened = request(client, 'open_read_stream', {'file': str(source), 'chunk_size': 1 << 40})
+    assert opened.Payload['chunk_size'] == file_service._stream_max_chunk_size
+    assert opened.Payload['size'] == 10
+    closed = request(client, 'close_stream', {'stream': opened.Payload['stream']})
+    assert closed.Payload['closed'] is True
+
+
+def test_stream_errors(services, tmp_path: pathlib.Path):
+    client, _ = services
+    assert request(client, 'open_read_stream', {'file': str(tmp_path / 'missing')}).StatusCode == 500
+    assert request(client, 'read_chunk', {'stream': 'unknown', 'offset': 0, 'length': 1}).StatusCode == 500
+    assert request(client, 'close_stream', {'stream': 'unknown'}).StatusCode == 500
+    assert request(client, 'read_chunk', {'offset': 0}).StatusCode == 502
+    with pytest.raises(Exception, match='open_read_stream failed'):
+        download_file(service=client, source=str(tmp_path / 'missing'), target=str(tmp_path / 'out'))
+
+
+def test_discarded_write_stream_keeps_target(services, tmp_path: pathlib.Path):
+    client, _ = services
+    target = tmp_path / 'partial.bin'
+    opened = request(client, 'open_write_stream', {'file': str(target)})
+    request(client, 'write_chunk', {'stream': opened.Payload['stream'], 'offset': 0, 'data': b'abc'})
+    request(client, 'close_stream', {'stream': opened.Payload['stream'], 'discard': True})
+    assert not target.exists()
+    existing = tmp_path / 'existing.bin'
+    existing.write_bytes(b'original')
+    opened = request(client, 'open_write_stream', {'file': str(existing)})
+    request(client, 'write_chunk', {'stream': opened.Payload['stream'], 'offset': 0, 'data': b'abc'})
+    # bis zum Abschluss bleibt das Ziel unverändert
+    assert existing.read_bytes() == b'original'
+    request(client, 'close_stream', {'stream': opened.Payload['stream'], 'discard': True})
+    assert existing.read_bytes() == b'original'
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['existing.bin']
+
+
+def test_write_stream_replaces_target_on_close(services, tmp_path: pathlib.Path):
+    client, _ = services
+    target = tmp_path / 'target.bin'
+    target.write_bytes(b'an old and longer content')
+    os.chmod(target, 0o640)
+    opened = request(client, 'open_write_stream', {'file': str(target)})
+    request(client, 'write_chunk', {'stream': opened.Payload['stream'], 'offset': 0, 'data': b'new'})
+    closed = request(client, 'close_stream', {'stream': opened.Payload['stream']})
+    assert closed.Payload['written'] == 3
+    assert target.read_bytes() == b'new'
+    assert target.stat().st_mode & 0o777 == 0o640
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['target.bin']
+
+
+def test_read_chunk_rejects_empty_length(services, tmp_path: pathlib.Path):
+    client, _ = services
+    source = tmp_path / 'source.bin'
+    source.write_bytes(b'x' * 10)
+    opened = request(client, 'open_read_stream', {'file': str(source)})
+    assert request(client, 'read_chunk', {'stream': opened.Payload['stream'], 'offset': 0, 'length': -1}).StatusCode == 500
+    assert request(client, 'read_chunk', {'stream': opened.Payload['stream'], 'offset': 0, 'length': 0}).StatusCode == 500
+    assert request(client, 'read_chunk', {'stream': opened.Payload['stream'], 'offset': 0, 'length': 4}).Payload['data'] == b'xxxx'
+    request(client, 'close_stream', {'stream': opened.Payload['stream']})
+
+
+def test_idle_streams_expire(tmp_path: pathlib.Path):
+    streams = FileStreams(idle_timeout=0.2)
+    target = tmp_path / 'abandoned.bin'
+    target.write_bytes(b'original')
+    stream = streams.open(path=str(target), mode='write')
+    stream.write_chunk(offset=0, data=b'abc')
+    deadline = time.monotonic() + 5
+    while streams.count > 0 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert streams.count == 0
+    with pytest.raises(Exception, match='not found'):
+        streams.get(stream_id=stream.id)
+    assert target.read_bytes() == b'original'
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['abandoned.bin']
+    streams.close_all()
+
+
+def test_get_file_range(services, tmp_path: pathlib.Path):
+    client, _ = services
+    path = tmp_path / 'range.bin'
+    content = os.urandom(100_000)
+    path.write_bytes(content)
+    response = request(client, 'get_file_range', {'file': str(path), 'offset': 70_000, 'length': 50_000})
+    assert response.StatusCode == 200
+    assert response.Payload['data'] == content[70_000:]
+    assert response.Payload['length'] == 30_000
+    assert response.Payload['size'] == 100_000
+    assert response.Priority == Package.PRIORITY_BULK
+    missing = request(client, 'get_file_range', {'file': str(tmp_path / 'missing'), 'offset': 0, 'length': 1})
+    assert missing.Payload['exists'] is False
+    assert missing.Payload['data'] == b''
+
+
+def test_get_file_range_errors(services, tmp_path: pathlib.Path, monkeypatch):
+    client, _ = services
+    path = tmp_path / 'locked.bin'
+    path.write_bytes(b'locked')
+
+    def read_range(self, offset: int, length: int) -> bytes:
+        raise PermissionError('Permission denied')
+
+    monkeypatch.setattr(FileObject, 'read_range', read_range)
+    response = request(client, 'get_file_range', {'file': str(path), 'offset': 0, 'length': 6})
+    assert response.StatusCode == 500
+    assert 'Permission denied' in response.Payload['data']
+    assert request(client, 'get_file_range', {'file': str(path), 'offset': 'x', 'length': 6}).StatusCode == 502
+
+
+def test_delta_sync(services, tmp_path: pathlib.Path):
+    client, _ = services
+    content = os.urandom(1 << 20)
+    local = tmp_path / 'local.bin'
+    local.write_bytes(content)
+    os.chmod(local, 0o640)
+    remote = tmp_path / 'remote.bin'
+    remote.write_bytes(content[:400_000] + b'edit' + content[400_004:])
+    signature = request(client, 'get_file_signature', {'file': str(local), 'block_size': 4096}).Payload['signature']
+    delta = request(client, 'get_file_delta', {'file': str(remote), 'signature': signature}).Payload['delta']
+    assert sum(len(instruction[1]) for instruction in delta['instructions'] if instruction[0] == 'data') <= 4096
+    response = request(client, 'apply_file_delta', {'file': str(local), 'delta': delta})
+    assert response.StatusCode == 200
+    assert response.Payload['size'] == 1 << 20
+    assert local.read_bytes() == remote.read_bytes()
+    assert local.stat().st_mode & 0o777 == 0o640
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['local.bin', 'remote.bin']
+
+
+def test_delta_errors(services, tmp_path: pathlib.Path):
+    client, _ = services
+    # eine fehlende Basis hat eine leere Signatur, das Delta besteht dann nur aus Daten
+    signature = request(client, 'get_file_signature', {'file': str(tmp_path / 'missing')}).Payload['signature']
+    assert signature['size'] == 0
+    assert request(client, 'get_file_delta', {'file': str(tmp_path / 'missing'), 'signature': signature}).StatusCode == 500
+    assert request(client, 'get_file_delta', {'file': str(tmp_path / 'missing')}).StatusCode == 502
+    path = tmp_path / 'basis.bin'
+    path.write_bytes(b'basis')
+    broken = {'block_size': 4096, 'size': 8192, 'instructions': [('copy', 1, 1)]}
+    assert request(client, 'apply_file_delta', {'file': str(path), 'delta': broken}).StatusCode == 500
+    assert path.read_bytes() == b'basis'
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['basis.bin']
+
+
+def test_put_file_data_is_atomic(services, tmp_path: pathlib.Path):
+    client, _ = services
+    paths = [tmp_path / f'{i}.bin' for i in range(20)]
+    for path in paths:
+        path.write_bytes(b'old')
+    futures = [client.request(recipient='FileService', subject='put_file_data', payload={'file': str(path), 'data': str(path).encode()}, timeout=5.0) for path in paths]
+    assert all(future.result().Payload['written'] for future in futures)
+    assert all(path.read_bytes() == str(path).encode() for path in paths)
+    assert sorted(os.listdir(tmp_path)) == sorted(path.name for path in paths)
+    # nur bestehende Dateien werden überschrieben
+    assert request(client, 'put_file_data', {'file': str(tmp_path / 'new.bin'), 'data': b'x'}).Payload['written'] is False
+
+
+def test_stat_many(services, tmp_path: pathlib.Path):
+    client, _ = services
+    files = list()
+    for i in range(25):
+        path = tmp_path / f'{i}.bin'
+        path.write_bytes(b'x' * i)
+        files.append(str(path))
+    files.insert(3, str(tmp_path / 'missing'))
+    response = request(client, 'stat_many', {'files': files, 'chunk_size': 4})
+    assert response.Payload['count'] == 26
+    results = response.Payload['results']
+    assert results[3] is None
+    assert [result[0] for result in results[:3] + results[4:]] == list(range(25))
+    assert results[4][1] == os.stat(files[4]).st_mtime_ns
+    exists = request(client, 'exists_many', {'files': files}).Payload['results']
+    assert exists == [True] * 3 + [False] + [True] * 22
+    assert request(client, 'stat_many', {'files': files, 'chunk_size': -1}).StatusCode == 502
+    assert request(client, 'stat_many', {'file': files[0]}).StatusCode == 502
+
+
+def test_stat_many_stream(services, chunks, tmp_path: pathlib.Path):
+    client, _ = services
+    files = [str(tmp_path / f'{i}') for i in range(10)]
+    for file in files[::2]:
+        pathlib.Path(file).write_bytes(b'')
+    response = request(client, 'exists_many', {'files': files, 'chunk_size': 3, 'stream': True})
+    assert response.Payload == {'count': 10, 'chunks': 4}
+    # die Antwort kann vor den Chunks verarbeitet werden
+    deadline = time.monotonic() + 5
+    while len(chunks) < response.Payload['chunks'] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [chunk.Subject for chunk in chunks] == ['exists_many_chunk'] * 4
+    assert all(chunk.Payload['request'] == response.PackageID for chunk in chunks)
+    results = [None] * 10
+    for chunk in chunks:
+        offset = chunk.Payload['offset']
+        results[offset:offset + len(chunk.Payload['results'])] = chunk.Payload['results']
+    assert results == [True, False] * 5
+
+
+def test_slow_path_does_not_block_other_paths(services, tmp_path: pathlib.Path, monkeypatch):
+    client, file_service = services
+    slow = tmp_path / 'slow.bin'
+    fast = tmp_path / 'fast.bin'
+    for path in (slow, fast):
+        path.write_bytes(b'data')
+    release = threading.Event()
+    original = FileService._read_file_bytes
+
+    def read_file_bytes(self, file: str) -> bytes:
+        if file == str(slow):
+            release.wait(timeout=5.0)
+        return original(self, file=file)
+
+    monkeypatch.setattr(FileService, '_read_file_bytes', read_file_bytes)
+    slow_future = client.request(recipient='FileService', subject='get_file_data', payload={'file': str(slow)}, timeout=5.0)
+    queued = client.request(recipient='FileService', subject='get_file_data', payload={'file': str(slow)}, timeout=5.0)
+    assert request(client, 'get_file_data', {'file': str(fast)}).Payload['data'] == b'data'
+    assert not slow_future.done() and not queued.done()
+    release.set()
+    assert slow_future.result().Payload['data'] == queued.result().Payload['data'] == b'data'
+    # die Dauer wird erst nach dem Senden der Antwort eingetragen
+    for _ in range(100):
+        stats = request(client, 'get_io_stats', {}).Payload
+        if stats['timings']['get_file_data']['count'] == 3:
+            break
+    assert stats['workers'] == 8
+    assert stats['timings']['get_file_data']['count'] == 3
+    assert stats['timings']['get_file_data']['max'] >= stats['timings']['get_file_data']['mean']
+
+
+def test_chunks_of_one_stream_run_in_parallel(services, tmp_path: pathlib.Path, monkeypatch):
+    client, _ = services
+    source = tmp_path / 'source.bin'
+    source.write_bytes(b'ab' * 8)
+    opened = request(client, 'open_read_stream', {'file': str(source), 'chunk_size': 8})
+    # beide Chunks müssen gleichzeitig laufen, sonst wartet der erste vergeblich auf den zweiten
+    barrier = threading.Barrier(2, timeout=2.0)
+    original = FileStream.read_chunk
+
+    def read_chunk(self, offset: int, length: int) -> bytes:
+        barrier.wait()
+        return original(self, offset=offset, length=length)
+
+    monkeypatch.setattr(FileStream, 'read_chunk', read_chunk)
+    futures = [client.request(recipient='FileService', subject='read_chunk', payload={'stream': opened.Payload['stream'], 'offset': offset, 'length': 8}, timeout=5.0) for offset in (0, 8)]
+    assert [future.result().Payload['data'] for future in futures] == [b'ab' * 4] * 2
+    request(client, 'close_stream', {'stream': opened.Payload['stream']})
+
+
+def test_parallel_chunk_writes(tmp_path: pathlib.Path):
+    target = tmp_path / 'target.bin'
+    stream = FileStreams().open(path=str(target), mode='write', chunk_size=1024)
+    content = os.urandom(64 * 1024)
+    threads = [threading.Thread(target=stream.write_chunk, kwargs={'offset': offset, 'data': content[offset:offset + 1024]}) for offset in range(0, len(content), 1024)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stream.close()
+    assert stream.written == len(content)
+    assert target.read_bytes() == content
+    with pytest.raises(Exception, match='is closed'):
+        stream.write_chunk(offset=0, data=b'late')
+
+
+def test_writes_to_same_file_keep_order(services, tmp_path: pathlib.Path):
+    client, _ = services
+    path = tmp_path / 'ordered.bin'
+    path.write_bytes(b'')
+    futures = [client.request(recipient='FileService', subject='put_file_data', payload={'file': str(path), 'data': str(i).encode()}, timeout=5.0) for i in range(30)]
+    assert all(future.result().Payload['written'] for future in futures)
+    assert path.read_bytes() == b'29'
@@ -0,0 +1,39 @@
+import threading
+import pytest
+from queue import Empty
+
+from aocc.src.lanequeue import LaneQueue
+from aocc.src.package import Package
+
+
+def test_fifo_within_lane_and_priority_across_lanes():
+    queue = LaneQueue()
+    queue.put('bulk', priority=Package.PRIORITY_BULK)
+    queue.put('n1')
+    queue.put('control', priority=Package.PRIORITY_CONTROL)
+    queue.put('n2')
+    assert [queue.get() for _ in range(4)] == ['control', 'n1', 'n2', 'bulk']
+    assert queue.empty()
+
+
+def test_out_of_range_priority_is_clamped():
+    queue = LaneQueue()
+    queue.put('low', priority=99)
+    queue.put('high', priority=-5)
+    assert queue.get() == 'high'
+    assert queue.get() == 'low'
+
+
+def test_get_raises_empty():
+    queue = LaneQueue()
+    with pytest.raises(Empty):
+        queue.get(block=False)
+    with pytest.raises(Empty):
+        queue.get(timeout=0.01)
+
+
+def test_blocking_get_wakes_up():
+    queue = LaneQueue()
+    threading.Timer(0.02, queue.put, args=('late',)).start()
+    assert queue.get(timeout=1.0) == 'late'
+    assert queue.qsize() == 0
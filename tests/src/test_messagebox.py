@@ -0,0 +1,100 @@
+import time
+import pytest
+from threading import Thread
+
+from aocc.src.messagebox import MessageBox
+from aocc.src.package import Package
+
+
+def make_package(i: int = 0) -> Package:
+    return Package(sender='a', recipent='b', package_type='request', package_id=str(i), subject='test')
+
+
+@pytest.fixture
+def box() -> MessageBox:
+    return MessageBox(name='box', direction='in')
+
+
+def test_fifo_order(box):
+    for i in range(5):
+        box.add_package(make_package(i))
+    assert [box.get_package().PackageID for _ in range(5)] == ['0', '1', '2', '3', '4']
+    assert box.empty()
+
+
+def test_non_blocking_get_on_empty_raises(box):
+    with pytest.raises(Exception):
+        box.get_package(block=False)
+
+
+def test_blocking_get_timeout_raises(box):
+    start = time.perf_counter()
+    with pytest.raises(Exception):
+        box.get_package(block=True, timeout=0.05)
+    assert time.perf_counter() - start >= 0.04
+
+
+def test_blocking_get_wakes_on_add(box):
+    result = []
+    consumer = Thread(target=lambda: result.append(box.get_package(timeout=2.0)))
+    consumer.start()
+    time.sleep(0.05)
+    box.add_package(make_package(7))
+    consumer.join(timeout=1.0)
+    assert result[0].PackageID == '7'
+
+
+def test_add_packages_filters_non_packages(box):
+    assert box.add_packages([make_package(1), 'no package', make_package(2)])
+    assert box.length() == 2
+
+
+def test_get_many(box):
+    box.add_packages([make_package(i) for i in range(10)])
+    assert [p.PackageID for p in box.get_many(4)] == ['0', '1', '2', '3']
+    assert len(box.get_many(100)) == 6
+    assert box.get_many(3, timeout=0.01) == []
+    assert box.get_many(3, block=False) == []
+
+
+def test_get_all_packages_returns_drained_copy(box):
+    box.add_packages([make_package(i) for i in range(3)])
+    packages = box.get_all_packages()
+    assert [p.PackageID for p in packages] == ['0', '1', '2']
+    assert box.empty()
+    assert box.get_all_packages() == []
+
+
+def test_many_consumers_get_every_package_once(box):
+    count = 20_000
+    results = []
+    def consume():
+        while True:
+            try:
+                results.append(box.get_package(timeout=0.2).PackageID)
+            except Exception:
+                return
+    consumers = [Thread(target=consume) for _ in range(4)]
+    for consumer in consumers:
+        consumer.start()
+    for i in range(count):
+        box.add_package(make_package(i))
+    for consumer in consumers:
+        consumer.join()
+    assert sorted(results, key=int) == [str(i) for i in range(count)]
+
+
+def test_priority_lanes(box):
+    bulk = Package(sender='a', recipent='b', package_type='response', package_id='bulk', subject='get_file_data', priority=Package.PRIORITY_BULK)
+    normal = make_package(1)
+    stop = Package(sender='a', recipent='b', package_type='request', package_id='stop', subject='stop')
+    box.add_packages([bulk, normal, stop])
+    assert [box.get_package().PackageID for _ in range(3)] == ['stop', '1', 'bulk']
+
+
+def test_get_all_packages_in_priority_order(box):
+    bulk = Package(sender='a', recipent='b', package_type='response', package_id='bulk', subject='x', priority=Package.PRIORITY_BULK)
+    box.add_package(bulk)
+    box.add_package(make_package(1))
+    assert [p.PackageID for p in box.get_all_packages()] == ['1', 'bulk']
+    assert box.length() == 0
@@ -0,0 +1,121 @@
+import pickle
+import pytest
+
+from aocc.src.objectcodec import encode_object, decode_object, is_encoded
+
+
+@pytest.mark.parametrize(
+    "obj",
+    [
+        None, True, False, 0, -1, 127, -128, 128, 2 ** 40, -(2 ** 63), 2 ** 63, -(2 ** 100),
+        0.0, -1.5, float("inf"), "", "umlaut äöü €", b"", b"\x00\xff" * 10,
+        [], [1, [2, [3]]], (), (1, "a", None), {}, {"a": {"b": {"c": [1, 2.5, b"x", None]}}},
+        {1: "int key", (1, 2): "tuple key", None: False},
+    ]
+)
+def test_round_trip(obj):
+    decoded = decode_object(encode_object(obj))
+    assert decoded == obj
+    assert type(decoded) is type(obj)
+
+
+def test_bool_stays_bool_and_subclasses_are_flattened():
+    from collections import OrderedDict
+    from enum import IntEnum
+
+    class Level(IntEnum):
+        HIGH = 3
+
+    assert decode_object(encode_object([True, 1])) == [True, 1]
+    assert type(decode_object(encode_object(True))) is bool
+    decoded = decode_object(encode_object(OrderedDict(level=Level.HIGH)))
+    assert type(decoded) is dict and type(decoded["level"]) is int and decoded["level"] == 3
+
+
+def test_bytearray_and_memoryview_decode_as_bytes():
+    assert decode_object(encode_object(bytearray(b"ab"))) == b"ab"
+    assert decode_object(encode_object(memoryview(b"cd"))) == b"cd"
+    assert decode_object(memoryview(encode_object("x"))) == "x"
+
+
+def test_smaller_than_pickle_for_config_trees():
+    from aocc.templates.config import data
+    assert len(encode_object(data)) < len(pickle.dumps(data))
+
+
+def test_repeated_keys_are_stored_once():
+    rows = [{"path": f"/sync/{i}", "size": i, "nested": {"path": i}} for i in range(100)]
+    encoded = encode_object(rows)
+    assert encoded.count(b"path") == 1
+    assert encoded.count(b"nested") == 1
+    assert decode_object(encoded) == rows
+
+
+def test_str_subclass_keys_keep_key_references_in_sync():
+    from enum import Enum
+
+    class K(str, Enum):
+        A = "alpha"
+
+    class Name(str):
+        pass
+
+    obj = {K.A: 1, "b": 2, "c": {"b": 3, "alpha": 4}, Name("n"): {"n": 5, "b": 6}}
+    decoded = decode_object(encode_object(obj))
+    assert decoded == {"alpha": 1, "b": 2, "c": {"b": 3, "alpha": 4}, "n": {"n": 5, "b": 6}}
+    assert all(type(key) is str for key in decoded)
+    assert decode_object(encode_object([K.A])) == ["alpha"]
+
+
+def test_unsupported_type_raises():
+    with pytest.raises(Exception, match="can't be encoded"):
+        encode_object({"a": {1, 2}})
+    with pytest.raises(Exception, match="can't be encoded"):
+        encode_object(object())
+
+
+def test_too_deep_nesting_raises():
+    obj = []
+    for _ in range(200):
+        obj = [obj]
+    with pytest.raises(Exception, match="nested deeper"):
+        encode_object(obj)
+
+
+@pytest.mark.parametrize(
+    "data, message",
+    [
+        (b"AOC\x02\x00", "Unknown object codec version"),
+        (b"AOC\x01\x07\x05ab", "truncated"),
+        (b"AOC\x01\x04\x00", "truncated or corrupt"),
+        (b"AOC\x01\x09\xff\xff\xff\x7f", "truncated"),
+        (b"AOC\x01\x00\x00", "wrong length"),
+        (b"AOC\x01\x7f", "Unknown object codec tag"),
+        (b"AOC\x01\x0b\x01\x09\x00\x00", "Unhashable"),
+        (b"AOC\x01\x07\x01\xff", "truncated or corrupt"),
+        (b"AOC\x01\x0b\x01\x0c\x00\x00", "Unknown key reference"),
+        (b"AOC\x01\x0c\x00", "Unknown object codec tag"),
+    ]
+)
+def test_corrupt_data_raises(data, message):
+    with pytest.raises(Exception, match=message):
+        decode_object(data)
+
+
+def test_legacy_pickle_only_when_allowed():
+    obj = {"a": [1, 2.0, "x", b"y", None, True, (1, 2)]}
+    for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+        data = pickle.dumps(obj, protocol=protocol)
+        assert not is_encoded(data)
+        assert decode_object(data, legacy=True) == obj
+    with pytest.raises(Exception, match="not encoded"):
+        decode_object(pickle.dumps(obj))
+
+
+def test_legacy_pickle_refuses_globals():
+    import os
+    from datetime import datetime
+    with pytest.raises(pickle.UnpicklingError, match="not allowed"):
+        decode_object(pickle.dumps(os.system), legacy=True)
+    with pytest.raises(pickle.UnpicklingError, match="not allowed"):
+        decode_object(pickle.dumps({"at": datetime(2024, 1, 1)}), legacy=True)
@@ -0,0 +1,135 @@
+import pickle
+import pytest
+
+from aocc.src.package import Package
+
+
+def make_package(payload=None, **kwargs) -> Package:
+    values = dict(sender='FileService', recipent='ConfigService', package_type='request', package_id='abc123', subject='get_file_data', code=200)
+    values.update(kwargs)
+    return Package(payload=payload, **values)
+
+
+@pytest.mark.parametrize('payload', [
+    None,
+    b'',
+    b'\x00raw bytes\xff',
+    {'file': '/tmp/x', 'data': b'1234', 'exists': True},
+    [1, 2.5, 'drei'],
+    'text',
+], ids=['none', 'empty_bytes', 'raw_bytes', 'dict', 'list', 'str'])
+def test_roundtrip_keeps_all_properties(payload):
+    package = make_package(payload=payload)
+    decoded = Package.from_bytes(package.to_bytes())
+    assert decoded.Created == package.Created
+    assert decoded.Sender == package.Sender
+    assert decoded.Receipent == package.Receipent
+    assert decoded.PackageType == package.PackageType
+    assert decoded.PackageID == package.PackageID
+    assert decoded.Subject == package.Subject
+    assert decoded.StatusCode == package.StatusCode
+    assert decoded.Payload == payload
+
+
+def test_nested_package_payload():
+    inner = make_package(payload={'a': 1})
+    outer = make_package(payload=inner, package_type='response', code=500, subject='wrong_receipent')
+    decoded = Package.from_bytes(outer.to_bytes())
+    assert decoded.Payload.Subject == 'get_file_data'
+    assert decoded.Payload.Payload == {'a': 1}
+
+
+def test_unicode_and_negative_code():
+    package = make_package(sender='Dienst-ä', recipent='受信者', subject='ümlaut', code=-1)
+    decoded = Package.from_bytes(package.to_bytes())
+    assert decoded.Sender == 'Dienst-ä'
+    assert decoded.Receipent == '受信者'
+    assert decoded.StatusCode == -1
+
+
+def test_peek_receipent():
+    package = make_package(payload=b'x' * 1000, recipent='RouterTarget')
+    assert Package.peek_receipent(package.to_bytes()) == 'RouterTarget'
+
+
+def test_binary_smaller_than_pickle():
+    package = make_package(payload={'file': '/tmp/x', 'exists': True})
+    assert len(package.to_bytes()) < len(pickle.dumps(package))
+
+
+def test_still_picklable():
+    package = make_package(payload={'k': 'v'})
+    decoded = pickle.loads(pickle.dumps(package))
+    assert decoded.Payload == {'k': 'v'}
+    assert decoded.Subject == package.Subject
+
+
+def test_slots_prevent_new_attributes():
+    package = make_package()
+    with pytest.raises(AttributeError):
+        package.extra = 1
+
+
+@pytest.mark.parametrize('data', [
+    b'',
+    b'AP',
+    b'XX' + make_package().to_bytes()[2:],
+    make_package(payload=b'abc').to_bytes()[:-1],
+    make_package(payload=b'abc').to_bytes() + b'!',
+], ids=['empty', 'truncated_header', 'wrong_magic', 'short_payload', 'trailing_data'])
+def test_invalid_data_raises(data):
+    with pytest.raises(Exception):
+        Package.from_bytes(data)
+
+
+def test_wrong_version_raises():
+    data = bytearray(make_package().to_bytes())
+    data[2] = 99
+    with pytest.raises(Exception, match='version'):
+        Package.from_bytes(bytes(data))
+
+
+def test_invalid_package_type():
+    with pytest.raises(Exception):
+        make_package(package_type='event')
+
+
+def test_batch_roundtrip():
+    frames = [make_package(subject=str(i), payload=b'x' * i).to_bytes() for i in range(4)]
+    split = Package.split_frame(Package.pack_batch(frames))
+    assert [bytes(frame) for frame in split] == frames
+
+
+def test_split_single_frame_is_unchanged():
+    data = make_package().to_bytes()
+    assert Package.split_frame(data) == [data]
+
+
+@pytest.mark.parametrize('cut', [1, 5, 10], ids=['cut_1', 'cut_5', 'cut_10'])
+def test_truncated_batch_raises(cut):
+    data = Package.pack_batch([make_package().to_bytes(), make_package().to_bytes()])
+    with pytest.raises(Exception):
+        Package.split_frame(data[:-cut])
+
+
+def test_default_priority_by_subject():
+    assert make_package(subject='stop').Priority == Package.PRIORITY_CONTROL
+    assert make_package(subject='get_config').Priority == Package.PRIORITY_CONTROL
+    assert make_package(subject='file_exists').Priority == Package.PRIORITY_NORMAL
+    assert make_package(priority=Package.PRIORITY_BULK).Priority == Package.PRIORITY_BULK
+
+
+def test_priority_survives_roundtrip():
+    package = make_package(priority=Package.PRIORITY_BULK)
+    assert Package.from_bytes(package.to_bytes()).Priority == Package.PRIORITY_BULK
+
+
+def test_decodes_version_1_frames():
+    package = make_package(subject='stop', payload=b'abc')
+    header = Package._wire_headers[1].pack(b'AP', 1, 0, Package._payload_bytes, package.StatusCode, package.Created, 6, 11, 13, 4, 3)
+    data = header + b'abc123' + b'FileService' + b'ConfigService' + b'stop' + b'abc'
+    decoded = Package.from_bytes(data)
+    assert decoded.Subject == 'stop'
+    assert decoded.Payload == b'abc'
+    assert decoded.Priority == Package.PRIORITY_CONTROL
+    assert Package.peek_receipent(data) == 'ConfigService'
@@ -0,0 +1,163 @@
+import threading
+import time
+import pytest
+
+from aocc.src.packageexecutor import PackageExecutor
+from aocc.src.package import Package
+
+
+def make_package(i: int = 0, sender: str = 'a', subject: str = 'test') -> Package:
+    return Package(sender=sender, recipent='b', package_type='request', package_id=str(i), subject=subject)
+
+
+def wait_until(predicate, timeout: float = 2.0) -> bool:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.005)
+    return predicate()
+
+
+def test_fixed_number_of_threads():
+    executor = PackageExecutor(max_workers=3)
+    before = threading.active_count()
+    executor.start()
+    done = []
+    for i in range(500):
+        executor.submit(package=make_package(i), handler=lambda package: done.append(package))
+    assert threading.active_count() == before + 3
+    assert wait_until(lambda: len(done) == 500)
+    executor.shutdown()
+    assert threading.active_count() == before
+
+
+def test_submit_before_start_is_rejected():
+    executor = PackageExecutor()
+    assert not executor.submit(package=make_package(), handler=lambda package: None)
+
+
+def test_queue_depth_applies_backpressure():
+    executor = PackageExecutor(max_workers=1, queue_depth=2)
+    executor.start()
+    release = threading.Event()
+    assert executor.submit(package=make_package(0), handler=lambda package: release.wait())
+    assert executor.submit(package=make_package(1), handler=lambda package: None)
+    assert not executor.submit(package=make_package(2), handler=lambda package: None, block=False)
+    assert not executor.submit(package=make_package(3), handler=lambda package: None, timeout=0.02)
+    release.set()
+    assert executor.submit(package=make_package(4), handler=lambda package: None, timeout=1.0)
+    executor.shutdown()
+
+
+def test_subject_limit():
+    executor = PackageExecutor(max_workers=8, subject_limits={'slow': 2})
+    executor.start()
+    lock = threading.Lock()
+    state = {'active': 0, 'peak': 0, 'done': 0}
+
+    def handler(package):
+        with lock:
+            state['active'] += 1
+            state['peak'] = max(state['peak'], state['active'])
+        time.sleep(0.01)
+        with lock:
+            state['active'] -= 1
+            state['done'] += 1
+
+    for i in range(20):
+        executor.submit(package=make_package(i, subject='slow'), handler=handler)
+    fast = threading.Event()
+    executor.submit(package=make_package(99, subject='fast'), handler=lambda package: fast.set())
+    assert fast.wait(timeout=0.05)
+    assert wait_until(lambda: state['done'] == 20)
+    assert state['peak'] == 2
+    executor.shutdown()
+
+
+@pytest.mark.parametrize('ordered_senders', [True, ['ordered']], ids=['all', 'list'])
+def test_ordered_sender(ordered_senders):
+    executor = PackageExecutor(max_workers=8, ordered_senders=ordered_senders)
+    executor.start()
+    seen = []
+
+    def handler(package):
+        time.sleep(0.001 * (5 - int(package.PackageID) % 5))
+        seen.append(int(package.PackageID))
+
+    for i in range(30):
+        executor.submit(package=make_package(i, sender='ordered'), handler=handler)
+    assert wait_until(lambda: len(seen) == 30)
+    assert seen == list(range(30))
+    executor.shutdown()
+
+
+def test_ordered_sender_combined_with_subject_limit():
+    executor = PackageExecutor(max_workers=4, subject_limits={'x': 1}, ordered_senders=True)
+    executor.start()
+    seen = []
+    for i in range(20):
+        sender = 'a' if i % 2 else 'b'
+        executor.submit(package=make_package(i, sender=sender, subject='x'), handler=lambda package: seen.append(package))
+    assert wait_until(lambda: len(seen) == 20)
+    for sender in ('a', 'b'):
+        ids = [int(p.PackageID) for p in seen if p.Sender == sender]
+        assert ids == sorted(ids)
+    assert executor._key_busy == set()
+    assert executor._subject_active == {}
+    executor.shutdown()
+
+
+def test_handler_exception_does_not_kill_worker(capsys):
+    executor = PackageExecutor(max_workers=1)
+    executor.start()
+    done = threading.Event()
+
+    def failing(package):
+        raise ValueError('boom')
+
+    executor.submit(package=make_package(0), handler=failing)
+    executor.submit(package=make_package(1), handler=lambda package: done.set())
+    assert done.wait(timeout=1.0)
+    executor.shutdown()
+    assert 'boom' in capsys.readouterr().err
+
+
+def test_order_key_serializes_same_key_only():
+    executor = PackageExecutor(max_workers=4, order_key=lambda package: package.Subject if package.Subject != 'free' else None)
+    executor.start()
+    running = {'a': 0, 'b': 0, 'free': 0}
+    peak = {'a': 0, 'b': 0, 'free': 0}
+    seen = []
+    lock = threading.Lock()
+
+    def handler(package):
+        with lock:
+            running[package.Subject] += 1
+            peak[package.Subject] = max(peak[package.Subject], running[package.Subject])
+        time.sleep(0.005)
+        with lock:
+            running[package.Subject] -= 1
+            seen.append(package)
+
+    for i in range(30):
+        executor.submit(package=make_package(i, subject=('a', 'b', 'free')[i % 3]), handler=handler)
+    assert wait_until(lambda: len(seen) == 30)
+    assert peak['a'] == peak['b'] == 1
+    assert peak['free'] > 1
+    assert [int(p.PackageID) for p in seen if p.Subject == 'a'] == list(range(0, 30, 3))
+    executor.shutdown()
+
+
+def test_timings_per_subject():
+    executor = PackageExecutor(max_workers=2)
+    executor.start()
+    done = []
+    for i in range(4):
+        executor.submit(package=make_package(i, subject='slow' if i < 2 else 'fast'), handler=lambda package: (time.sleep(0.02 if package.Subject == 'slow' else 0), done.append(package)))
+    assert wait_until(lambda: len(done) == 4)
+    assert wait_until(lambda: sum(timing['count'] for timing in executor.timings.values()) == 4)
+    timings = executor.timings
+    assert timings['slow']['count'] == 2 and timings['slow']['max'] >= 0.02
+    assert timings['fast']['mean'] < timings['slow']['mean']
+    executor.shutdown()
@@ -0,0 +1,154 @@
+import asyncio
+import threading
+import time
+import pytest
+from concurrent.futures import CancelledError
+from multiprocessing import Pipe
+
+from aocc.src.service import Service
+from aocc.src.packageexecutor import PackageExecutor
+from aocc.src.package import Package
+
+
+class EchoService(Service):
+
+    def __init__(self, conn_in, conn_out, delay: float = 0.0) -> None:
+        super(EchoService, self).__init__(name='Echo', conn_in=conn_in, conn_out=conn_out, request_callback=self._echo, config_required=False)
+        self.delay = delay
+
+    def _echo(self, package: Package) -> None:
+        if package.Subject == 'silent':
+            return None
+        time.sleep(self.delay)
+        self.send_package(package=Package(
+            sender=self._name,
+            recipent=package.Sender,
+            package_type='response',
+            package_id=package.PackageID,
+            subject=package.Subject,
+            code=200,
+            payload=package.Payload
+        ))
+
+
+@pytest.fixture
+def services():
+    client_in, echo_out = Pipe(duplex=False)
+    echo_in, client_out = Pipe(duplex=False)
+    responses = []
+    client = Service(name='Client', conn_in=client_in, conn_out=client_out, response_callback=responses.append, config_required=False)
+    echo = EchoService(conn_in=echo_in, conn_out=echo_out)
+    client.start()
+    echo.start()
+    yield client, echo, responses
+    client.stop()
+    echo.stop()
+
+
+def test_request_resolves_future(services):
+    client, _, responses = services
+    future = client.request(recipient='Echo', subject='ping', payload={'n': 1}, timeout=1.0)
+    package = future.result(timeout=1.0)
+    assert package.StatusCode == 200
+    assert package.Payload == {'n': 1}
+    # korrelierte Antworten gehen nicht zusätzlich an den response_callback
+    assert responses == []
+    assert client._requests.pendingCount == 0
+
+
+def test_many_concurrent_requests(services):
+    client, _, _ = services
+    futures = [client.request(recipient='Echo', subject='ping', payload=i) for i in range(200)]
+    assert [future.result(timeout=2.0).Payload for future in futures] == list(range(200))
+
+
+def test_request_timeout(services):
+    client, _, _ = services
+    future = client.request(recipient='Echo', subject='silent', timeout=0.05)
+    with pytest.raises(TimeoutError):
+        future.result(timeout=1.0)
+    assert client._requests.pendingCount == 0
+
+
+def test_request_cancel(services):
+    client, echo, _ = services
+    echo.delay = 0.1
+    future = client.request(recipient='Echo', subject='ping')
+    assert future.cancel()
+    assert client._requests.pendingCount == 0
+    with pytest.raises(CancelledError):
+        future.result()
+
+
+def test_request_async(services):
+    client, _, _ = services
+
+    async def run():
+        return await asyncio.gather(*[client.request_async(recipient='Echo', subject='ping', payload=i, timeout=1.0) for i in range(10)])
+
+    assert [package.Payload for package in asyncio.run(run())] == list(range(10))
+
+
+def test_request_async_timeout(services):
+    client, _, _ = services
+
+    async def run():
+        return await client.request_async(recipient='Echo', subject='silent', timeout=0.05)
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(run())
+
+
+def test_stop_cancels_pending_requests(services):
+    client, _, _ = services
+    future = client.request(recipient='Echo', subject='silent')
+    client.stop()
+    assert future.cancelled()
+
+
+def test_handler_can_wait_for_request_with_one_worker():
+    proxy_in, echo_out = Pipe(duplex=False)
+    echo_in, proxy_out = Pipe(duplex=False)
+    results = []
+    done = threading.Event()
+
+    def forward(package: Package) -> None:
+        # belegt den einzigen Worker, bis die Antwort da ist
+        results.append(proxy.request(recipient='Echo', subject='ping', payload=package.Payload).result(timeout=2.0).Payload)
+        done.set()
+
+    proxy = Service(name='Proxy', conn_in=proxy_in, conn_out=proxy_out, request_callback=forward, config_required=False, executor=PackageExecutor(max_workers=1))
+    echo = EchoService(conn_in=echo_in, conn_out=echo_out)
+    proxy.start()
+    echo.start()
+    try:
+        proxy._package_callback(Package(sender='Echo', recipent='Proxy', package_type='request', package_id='outer', subject='forward', payload='inner'))
+        assert done.wait(timeout=3.0)
+        assert results == ['inner']
+    finally:
+        proxy.stop()
+        echo.stop()
+
+
+def test_uncorrelated_response_goes_to_callback(services):
+    client, echo, responses = services
+    echo.send_package(package=Package(sender='Echo', recipent='Client', package_type='response', package_id='unknown', subject='push'))
+    deadline = time.perf_counter() + 1.0
+    while not responses and time.perf_counter() < deadline:
+        time.sleep(0.005)
+    assert responses[0].Subject == 'push'
+
+
+def test_config_request_uses_future():
+    service_in, config_out = Pipe(duplex=False)
+    config_in, service_out = Pipe(duplex=False)
+
+    def answer_config():
+        request = Package.from_bytes(config_in.recv_bytes())
+        config_out.send_bytes(Package(sender='ConfigService', recipent=request.Sender, package_type='response', package_id=request.PackageID, subject='get_config', code=200, payload={'language': {'default': 'de'}}).to_bytes())
+
+    threading.Thread(target=answer_config, daemon=True).start()
+    service = Service(name='Needy', conn_in=service_in, conn_out=service_out)
+    service.start()
+    assert service._config.get('language.default') == 'de'
+    service.stop()
@@ -0,0 +1,106 @@
+import os
+import pickle
+import pathlib
+import pytest
+from multiprocessing import Pipe
+from multiprocessing.shared_memory import SharedMemory
+
+from aocc.src.sharedpayload import SharedBuffer, share_large_payload, payload_data
+from aocc.src.connectionhandler import ConnectionHandler
+from aocc.src.fileservice import FileService
+from aocc.src.filestream import download_file, upload_file
+from aocc.src.service import Service
+from aocc.src.package import Package
+
+
+def segment_exists(name: str) -> bool:
+    try:
+        segment = SharedMemory(name=name)
+    except FileNotFoundError:
+        return False
+    segment.close()
+    return True
+
+
+def test_pickle_transfers_only_the_handle():
+    data = os.urandom(256 * 1024)
+    buffer = SharedBuffer.create(data=data)
+    pickled = pickle.dumps(buffer)
+    assert len(pickled) < 200
+    buffer.detach()
+    received = pickle.loads(pickled)
+    assert len(received) == len(data)
+    assert received.tobytes() == data
+    name = received.name
+    received.release()
+    assert received.released
+    assert not segment_exists(name)
+
+
+def test_reference_counting():
+    buffer = SharedBuffer.create(data=b'abc')
+    buffer.acquire()
+    buffer.release()
+    assert not buffer.released
+    assert buffer.tobytes() == b'abc'
+    buffer.release()
+    assert buffer.released
+    with pytest.raises(Exception):
+        buffer.buffer
+    with pytest.raises(Exception):
+        buffer.acquire()
+
+
+def test_context_manager_releases():
+    with SharedBuffer.create(data=b'') as buffer:
+        assert len(buffer) == 0
+        assert buffer.tobytes() == b''
+    assert buffer.released
+
+
+def test_share_large_payload():
+    payload, shared = share_large_payload(payload={'file': 'x', 'data': b'y' * 100, 'small': b'z'}, threshold=50)
+    assert isinstance(payload['data'], SharedBuffer)
+    assert payload['small'] == b'z'
+    assert payload_data(payload['data']) == b'y' * 100
+    assert len(shared) == 1
+    shared[0].release()
+    assert share_large_payload(payload=b'tiny', threshold=50) == (b'tiny', [])
+    assert share_large_payload(payload={'k': 'v'}, threshold=1) == ({'k': 'v'}, [])
+
+
+def test_connection_handler_sends_large_payload_through_shared_memory():
+    conn_in, conn_out = Pipe(duplex=False)
+    sender = ConnectionHandler(conn_in=Pipe(duplex=False)[0], conn_out=conn_out, shared_memory_threshold=1024, auto_start=True)
+    receiver = ConnectionHandler(conn_in=conn_in, conn_out=Pipe(duplex=False)[1], auto_start=True)
+    data = os.urandom(1 << 20)
+    sender.send_package(package=Package(sender='a', recipent='b', package_type='request', package_id='1', subject='put_file_data', payload={'file': 'f', 'data': data}))
+    package = receiver.get_package(block=True, timeout=1.0)
+    shared = package.Payload['data']
+    assert isinstance(shared, SharedBuffer)
+    assert shared.tobytes() == data
+    name = shared.name
+    shared.release()
+    assert not segment_exists(name)
+    sender.stop()
+    receiver.stop()
+
+
+def test_file_transfers_with_shared_memory(tmp_path: pathlib.Path):
+    options = {'shared_memory_threshold': 4096}
+    client_in, file_out = Pipe(duplex=False)
+    file_in, client_out = Pipe(duplex=False)
+    file_service = FileService(conn_in=file_in, conn_out=file_out, block=False, connection_options=options)
+    client = Service(name='Client', conn_in=client_in, conn_out=client_out, config_required=False, connection_options=options)
+    client.start()
+    try:
+        content = os.urandom(200 * 1024 + 3)
+        source = tmp_path / 'source.bin'
+        source.write_bytes(content)
+        assert upload_file(service=client, source=str(source), target=str(tmp_path / 'up.bin'), chunk_size=32 * 1024) == len(content)
+        assert (tmp_path / 'up.bin').read_bytes() == content
+        assert download_file(service=client, source=str(source), target=str(tmp_path / 'down.bin'), chunk_size=32 * 1024) == len(content)
+        assert (tmp_path / 'down.bin').read_bytes() == content
+    finally:
+        client.stop()
+        file_service.stop()
@@ -0,0 +1,133 @@
+import os
+import pickle
+import pytest
+
+from aocc.src.storagejournal import StorageJournal
+from aocc.src.objectcodec import decode_object
+
+
+def test_load_missing_file_creates_snapshot_and_journal(tmp_path):
+    journal = StorageJournal(path=str(tmp_path / "config.cfg"))
+    assert journal.load() == {}
+    assert os.path.isfile(journal.path)
+    assert os.path.getsize(journal.journalPath) == StorageJournal._journal_header.size
+    journal.close()
+
+
+def test_append_and_replay(tmp_path):
+    path = str(tmp_path / "config.cfg")
+    journal = StorageJournal(path=path)
+    journal.load()
+    snapshot = open(path, "rb").read()
+    journal.append(pairs=[("token.access.request_time", 1.5)])
+    journal.append(pairs=[("a", 1), ("b.c", "x")])
+    journal.append(pairs=[("a", 2)])
+    assert journal.recordCount == 3
+    journal.close()
+    # only the journal grows
+    assert open(path, "rb").read() == snapshot
+    reopened = StorageJournal(path=path)
+    assert reopened.load() == {"token": {"access": {"request_time": 1.5}}, "a": 2, "b": {"c": "x"}}
+    assert reopened.recordCount == 3
+    reopened.close()
+
+
+def test_torn_record_is_cut_off(tmp_path):
+    path = str(tmp_path / "config.cfg")
+    journal = StorageJournal(path=path)
+    journal.load()
+    journal.append(pairs=[("a", 1)])
+    good_size = journal.journalSize
+    journal.append(pairs=[("b", 2)])
+    journal.close()
+    with open(path + ".journal", "r+b") as writer:
+        writer.truncate(good_size + 5)
+    reopened = StorageJournal(path=path)
+    assert reopened.load() == {"a": 1}
+    assert os.path.getsize(path + ".journal") == good_size
+    # new records after the cut are readable again
+    reopened.append(pairs=[("c", 3)])
+    reopened.close()
+    again = StorageJournal(path=path)
+    assert again.load() == {"a": 1, "c": 3}
+    again.close()
+
+
+def test_corrupt_record_stops_replay(tmp_path):
+    path = str(tmp_path / "config.cfg")
+    journal = StorageJournal(path=path)
+    journal.load()
+    journal.append(pairs=[("a", 1)])
+    offset = journal.journalSize
+    journal.append(pairs=[("b", 2)])
+    journal.append(pairs=[("c", 3)])
+    journal.close()
+    with open(path + ".journal", "r+b") as writer:
+        writer.seek(offset + StorageJournal._record_header.size + 6)
+        writer.write(b"\xff")
+    reopened = StorageJournal(path=path)
+    assert reopened.load() == {"a": 1}
+    reopened.close()
+
+
+def test_compact_writes_snapshot_and_empty_journal(tmp_path):
+    path = str(tmp_path / "config.cfg")
+    journal = StorageJournal(path=path)
+    data = journal.load()
+    for i in range(10):
+        journal.append(pairs=[("counter", i)])
+        StorageJournal.apply(data=data, key="counter", value=i)
+    journal.compact(data=data)
+    assert journal.compactionCount == 1
+    assert journal.recordCount == 0
+    assert journal.journalSize == StorageJournal._journal_header.size
+    marker, generation, snapshot = decode_object(open(path, "rb").read())
+    assert marker == "dotted_snapshot" and snapshot == {"counter": 9}
+    journal.close()
+
+
+def test_stale_journal_after_crash_in_compact_is_ignored(tmp_path):
+    path = str(tmp_path / "config.cfg")
+    journal = StorageJournal(path=path)
+    journal.load()
+    journal.append(pairs=[("a", 1)])
+    journal.close()
+    old_journal = open(path + ".journal", "rb").read()
+    # compact() finished the snapshot but crashed before the new journal was written
+    compacting = StorageJournal(path=path)
+    data = compacting.load()
+    data["a"] = 5
+    compacting.compact(data=data)
+    compacting.close()
+    with open(path + ".journal", "wb") as writer:
+        writer.write(old_journal)
+    reopened = StorageJournal(path=path)
+    assert reopened.load() == {"a": 5}
+    reopened.close()
+
+
+@pytest.mark.parametrize("legacy", [True, False])
+def test_plain_dict_file_is_taken_over(tmp_path, legacy):
+    from aocc.src.fileobject import FileObject
+    path = tmp_path / "config.cfg"
+    config = {"language": {"default": "en"}}
+    if legacy:
+        path.write_bytes(pickle.dumps(config))
+    else:
+        FileObject(str(path)).write_object(config)
+    journal = StorageJournal(path=str(path))
+    assert journal.load() == config
+    assert decode_object(path.read_bytes())[0] == "dotted_snapshot"
+    journal.close()
+
+
+def test_unknown_snapshot_raises(tmp_path):
+    path = tmp_path / "config.cfg"
+    path.write_bytes(b"garbage")
+    with pytest.raises(Exception, match="not a storage snapshot"):
+        StorageJournal(path=str(path)).load()
+
+
+def test_append_without_load_raises(tmp_path):
+    with pytest.raises(Exception, match="not loaded"):
+        StorageJournal(path=str(tmp_path / "config.cfg")).append(pairs=[("a", 1)])